@@ -1,5 +1,10 @@
 from flask import Blueprint, jsonify
 from backend.services.connected_agent_service import connected_agent_service
+from backend.services.catalog_service import catalog_service
+from backend.services.genie_agent_service import genie_agent_service
+from backend.services.http_transport import http_transport
+from backend.services.token_provider import token_provider
+from backend.services.tracing import exporter
 from backend.config.settings import settings
 
 health_bp = Blueprint('health', __name__, url_prefix='/api')
@@ -9,9 +14,23 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'connected_agent_service': connected_agent_service.get_health_status(),
+        'caches': {
+            'catalog_search': catalog_service.cache.stats(),
+            'genie_answers': genie_agent_service.answers.stats(),
+            'genie_conversations': genie_agent_service.conversations.stats()
+        },
+        'credentials': token_provider.get_stats(),
+        'http_pools': http_transport.get_stats(),
+        'trace_export': exporter.get_stats() if exporter else None,
         'configuration': settings.validate()
     })
 
+@health_bp.route('/ready')
+def readiness_check():
+    """Readiness probe: 200 once agents are provisioned, 503 while warming up"""
+    readiness = connected_agent_service.get_readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
 @health_bp.route('/config')
 def get_config():
     genie_configured = all([settings.DATABRICKS_INSTANCE, settings.GENIE_SPACE_ID, settings.DATABRICKS_AUTH_TOKEN])
@@ -1,7 +1,9 @@
 import json
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from backend.services.batch_service import AGENT_MAPPING, ndjson, parse_batch_request, run_batch
 from backend.services.connected_agent_service import connected_agent_service
-from backend.services.genie_agent_service import genie_agent_service
+from backend.services.genie_agent_service import direct_genie_response, genie_agent_service, job_wait_seconds
+from backend.services.request_context import turn_context
 
 query_bp = Blueprint('query', __name__, url_prefix='/api')
 
@@ -15,17 +17,30 @@ def analyze_query():
 def route_query():
     """Route query to appropriate agent using Connected Agent Service"""
     data = request.get_json()
-    return jsonify(connected_agent_service.process_query(data['query'].strip(), data.get('thread_id')))
+    query, thread_id = data['query'].strip(), data.get('thread_id')
+    with turn_context(query, thread_id):
+        return jsonify(connected_agent_service.process_query(query, thread_id))
 
 @query_bp.route('/process', methods=['POST'])
 def process_query():
-    """Process query end-to-end (single call, not duplicate processing)"""
+    """Process query end-to-end (single call, not duplicate processing)
+
+    The purview analysis reuses the catalog results of the routing run. With
+    ``combined: true`` the analysis search runs first and the routing agent's
+    catalog lookups are served from it, so the turn costs one Purview search.
+    """
     data = request.get_json()
     query = data['query'].strip()
     thread_id = data.get('thread_id')
+    combined = bool(data.get('combined'))
     
-    processing_result = connected_agent_service.process_query(query, thread_id)
-    analysis_result = connected_agent_service.analyze_purview(query)
+    with turn_context(query, thread_id, combined=combined) as turn:
+        if combined:
+            analysis_result = connected_agent_service.analyze_purview(query)
+            processing_result = connected_agent_service.process_query(query, thread_id)
+        else:
+            processing_result = connected_agent_service.process_query(query, thread_id)
+            analysis_result = connected_agent_service.analyze_purview(query)
     
     return jsonify({
         'success': processing_result.get('success', False),
@@ -36,25 +51,127 @@ def process_query():
         'metadata': processing_result.get('metadata', {}),
         'analysis_metadata': {
             'catalog_results': analysis_result.get('catalog_results', {}),
-            'confidence': analysis_result.get('confidence', 0.0)
+            'confidence': analysis_result.get('confidence', 0.0),
+            'catalog_source': analysis_result.get('catalog_source'),
+            'catalog_searches': turn.catalog_searches,
+            'timings': analysis_result.get('metadata', {}).get('timings')
         }
     })
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@query_bp.route('/process/stream', methods=['POST'])
+def process_query_stream():
+    """Process query end-to-end, streaming routing events and answer deltas as Server-Sent Events"""
+    data = request.get_json()
+    query = data['query'].strip()
+    thread_id = data.get('thread_id')
+    
+    def generate():
+        yield _sse('start', {'query': query, 'thread_id': thread_id})
+        with turn_context(query, thread_id):
+            succeeded = False
+            for event, payload in connected_agent_service.stream_query(query, thread_id):
+                succeeded = succeeded or event == 'done'
+                yield _sse(event, payload)
+            
+            if succeeded:
+                analysis_result = connected_agent_service.analyze_purview(query)
+                yield _sse('analysis', {
+                    'purview_analysis': analysis_result.get('purview', ''),
+                    'catalog_results': analysis_result.get('catalog_results', {}),
+                    'confidence': analysis_result.get('confidence', 0.0),
+                    'catalog_source': analysis_result.get('catalog_source')
+                })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @query_bp.route('/process-direct', methods=['POST'])
 def process_query_direct():
     """Process query directly with a specific agent (manual mode)"""
     data = request.get_json()
     query, agent, thread_id = data['query'].strip(), data['agent'].strip(), data.get('thread_id')
     
+    if agent == 'genie' and data.get('async'):
+        job = genie_agent_service.start_job(query, thread_id)
+        return jsonify(job.to_dict()), 202
+    
     if agent == 'genie':
-        result_data = json.loads(genie_agent_service.handoff_genie_agent(query))
-        return jsonify({
-            'success': result_data.get('status') == 'success',
-            'response': result_data.get('response', ''),
-            'annotations': [],
-            'metadata': {'query': query, 'agent_used': 'genie', 'direct_call': True, 
-                        'thread_id': thread_id or 'genie-session', 'genie_details': result_data}
-        })
-    
-    agent_mapping = {'fabric': 'fabric_agent', 'rag': 'rag_agent', 'web': 'web_agent'}
-    return jsonify(connected_agent_service.process_query_direct(query, agent_mapping[agent], thread_id))
+        with turn_context(query, thread_id):
+            result_data = json.loads(genie_agent_service.handoff_genie_agent(query))
+        return jsonify(direct_genie_response(query, thread_id, result_data))
+    
+    return jsonify(connected_agent_service.process_query_direct(query, AGENT_MAPPING[agent], thread_id))
+
+@query_bp.route('/process/batch', methods=['POST'])
+def process_query_batch():
+    """Process many queries concurrently, streaming one NDJSON line per result as it completes
+
+    Body: ``{"queries": [...], "agent": optional default, "concurrency": optional}``; see
+    ``parse_batch_request``. The stream ends with a ``summary`` line.
+    """
+    try:
+        items, concurrency = parse_batch_request(request.get_json())
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def generate():
+        for line in run_batch(items, concurrency):
+            yield ndjson(line)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@query_bp.route('/genie/jobs', methods=['POST'])
+def start_genie_job():
+    """Submit a Genie question and return a job handle immediately"""
+    data = request.get_json()
+    return jsonify(genie_agent_service.start_job(data['query'].strip(), data.get('thread_id')).to_dict()), 202
+
+@query_bp.route('/genie/jobs/<job_id>', methods=['GET'])
+def get_genie_job(job_id):
+    """Get a Genie job; ?wait=<seconds> long-polls until it finishes"""
+    try:
+        wait = job_wait_seconds(request.args.get('wait'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    job = genie_agent_service.wait_for_job(job_id, wait) if wait > 0 else genie_agent_service.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown Genie job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+@query_bp.route('/genie/results/<cursor>', methods=['GET'])
+def get_genie_result_page(cursor):
+    """Page through a Genie query result with the cursor returned in result_page.next_cursor"""
+    try:
+        page = genie_agent_service.fetch_result_page(cursor, request.args.get('limit', type=int), request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify(page)
+
+@query_bp.route('/genie/jobs/<job_id>/events', methods=['GET'])
+def stream_genie_job(job_id):
+    """Push the Genie job result as a Server-Sent Event once it is ready"""
+    job = genie_agent_service.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown Genie job {job_id}'}), 404
+    
+    def generate():
+        yield _sse('status', job.to_dict())
+        while not job.done.wait(15):
+            yield ': keep-alive\n\n'
+        yield _sse('done', job.to_dict())
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,10 +1,25 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from backend.services.connected_agent_service import connected_agent_service
 
 thread_bp = Blueprint('thread', __name__, url_prefix='/api')
 
 @thread_bp.route('/thread/<thread_id>/messages', methods=['GET'])
 def get_thread_messages(thread_id):
-    """Get all messages from a specific thread"""
-    result = connected_agent_service.get_thread_messages(thread_id)
-    return jsonify(result)
+    """Get the messages of a specific thread, or one page of them (?limit=&before=&after=&since=)"""
+    try:
+        result = connected_agent_service.get_thread_messages(
+            thread_id,
+            limit=request.args.get('limit', type=int),
+            before=request.args.get('before'),
+            after=request.args.get('after'),
+            since=request.args.get('since', type=int),
+            if_none_match=request.headers.get('If-None-Match')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if result.get('not_modified'):
+        return '', 304, {'ETag': result['etag']}
+    response = jsonify(result)
+    response.headers['ETag'] = result['etag']
+    return response
@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory, send_file
+from flask import Flask, Response, jsonify, send_from_directory, send_file
 import os
 import atexit
 from backend.utils.logging_config import setup_logging
@@ -6,7 +6,11 @@ from backend.config.settings import settings
 from backend.api.health_routes import health_bp
 from backend.api.query_routes import query_bp
 from backend.api.thread_routes import thread_bp
-from backend.services.connected_agent_service import connected_agent_service
+from backend.services.admission import LimitExceededError
+from backend.services.connected_agent_service import ServiceNotReadyError, ThreadUnavailableError, connected_agent_service
+from backend.services.http_transport import http_transport
+from backend.services.metrics import CONTENT_TYPE, registry
+from backend.services.token_provider import token_provider
 
 # Setup logging
 setup_logging()
@@ -28,21 +32,58 @@ def index():
     """Serve the main index.html file"""
     return send_file(os.path.join(DIST_DIR, 'index.html'))
 
+@app.route('/metrics')
+def metrics():
+    """Per-stage latency histograms and delegation counters in the Prometheus text format"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 @app.route('/<path:filename>')
 def static_files(filename):
     """Serve static files (JS, CSS, images, etc.)"""
     return send_from_directory(DIST_DIR, filename)
 
+@app.errorhandler(ServiceNotReadyError)
+@app.errorhandler(ThreadUnavailableError)
+def service_not_ready(error):
+    """Requests that time out waiting for the warm-up or a thread lookup get a retryable 503"""
+    response = jsonify({'success': False, 'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+@app.errorhandler(LimitExceededError)
+def limit_exceeded(error):
+    """Requests beyond a backend's concurrency limit and queue are shed with a fast 429"""
+    response = jsonify({'success': False, 'error': str(error), 'limiter': error.name})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(int(error.retry_after))
+    return response
+
 @app.teardown_appcontext
 def cleanup_service(error):
     """Cleanup service resources on app teardown"""
     if error:
         app.logger.error(f"App context teardown due to error: {error}")
 
+def start_warmup():
+    """Provision agents in the background as soon as the app is created (set WARMUP_ON_START=false to skip)"""
+    if not settings.WARMUP_ON_START:
+        return
+    # Under the debug reloader only the child process that serves requests should provision
+    if settings.FLASK_DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    # Runs once per process: the service ignores the call while a warm-up is running or after one succeeded
+    connected_agent_service.start_warmup()
+
+# Every server (gunicorn, flask run, the __main__ block below) imports the app, so each worker warms up here
+start_warmup()
+
 def cleanup_on_exit():
     """Cleanup function called on app shutdown"""
     app.logger.info("Cleaning up Connected Agent Service...")
     connected_agent_service.cleanup()
+    token_provider.close()
+    http_transport.close()
 
 if __name__ == '__main__':
     # Register cleanup function
@@ -57,7 +98,7 @@ if __name__ == '__main__':
     print("🚀 Starting Purview Router server...")
     print(f"📁 Serving files from: {DIST_DIR}")
     print("🌐 Open http://localhost:5000 in your browser")
-    print("🤖 Connected Agent Service will initialize on first request")
+    print("🤖 Connected Agent Service is warming up in the background (see /api/ready)")
     
     try:
         app.run(
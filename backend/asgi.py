@@ -0,0 +1,282 @@
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from backend.utils.logging_config import setup_logging
+from backend.config.settings import settings
+from backend.services.admission import LimitExceededError
+from backend.services.aio.batch_service import run_batch
+from backend.services.aio.connected_agent_service import async_connected_agent_service
+from backend.services.aio.catalog_service import async_catalog_service
+from backend.services.aio.genie_agent_service import async_genie_agent_service
+from backend.services.batch_service import AGENT_MAPPING, ndjson, parse_batch_request
+from backend.services.connected_agent_service import ServiceNotReadyError, ThreadUnavailableError, connected_agent_service
+from backend.services.genie_agent_service import direct_genie_response, job_wait_seconds
+from backend.services.http_transport import http_transport
+from backend.services.metrics import CONTENT_TYPE, registry
+from backend.services.request_context import turn_context
+from backend.services.token_provider import token_provider
+from backend.services.tracing import exporter
+
+# Setup logging
+setup_logging()
+
+# Path to the built UI files
+DIST_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'frontend', 'dist')
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.WARMUP_ON_START:
+        connected_agent_service.start_warmup()
+    yield
+    await async_connected_agent_service.cleanup()
+    token_provider.close()
+    http_transport.close()
+
+app = FastAPI(title="Purview Router", lifespan=lifespan)
+
+@app.exception_handler(ServiceNotReadyError)
+@app.exception_handler(ThreadUnavailableError)
+async def service_not_ready(request: Request, error: RuntimeError):
+    return JSONResponse({'success': False, 'error': str(error)}, status_code=503, headers={'Retry-After': '5'})
+
+@app.exception_handler(LimitExceededError)
+async def limit_exceeded(request: Request, error: LimitExceededError):
+    return JSONResponse({'success': False, 'error': str(error), 'limiter': error.name},
+                        status_code=429, headers={'Retry-After': str(int(error.retry_after))})
+
+@app.get('/api/ready')
+async def readiness_check():
+    """Readiness probe: 200 once agents are provisioned, 503 while warming up"""
+    readiness = connected_agent_service.get_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness['ready'] else 503)
+
+@app.get('/api/health')
+async def health_check():
+    return {
+        'status': 'ok',
+        'connected_agent_service': async_connected_agent_service.get_health_status(),
+        'caches': {
+            'catalog_search': async_catalog_service.cache.stats(),
+            'genie_answers': async_genie_agent_service.answers.stats(),
+            'genie_conversations': async_genie_agent_service.conversations.stats()
+        },
+        'credentials': token_provider.get_stats(),
+        'http_pools': http_transport.get_stats(),
+        'trace_export': exporter.get_stats() if exporter else None,
+        'configuration': settings.validate()
+    }
+
+@app.get('/api/config')
+async def get_config():
+    genie_configured = all([settings.DATABRICKS_INSTANCE, settings.GENIE_SPACE_ID, settings.DATABRICKS_AUTH_TOKEN])
+    return {
+        'fabric_agent_enabled': settings.ENABLE_FABRIC_AGENT,
+        'genie_configured': genie_configured,
+        'features': {
+            'fabric_agent_enabled': settings.ENABLE_FABRIC_AGENT,
+            'genie_configured': genie_configured
+        }
+    }
+
+@app.post('/api/analyze')
+async def analyze_query(request: Request):
+    """Analyze query purview using the async Connected Agent Service"""
+    query = (await request.json())['query'].strip()
+    return await async_connected_agent_service.analyze_purview(query)
+
+@app.post('/api/route')
+async def route_query(request: Request):
+    """Route query to appropriate agent using the async Connected Agent Service"""
+    data = await request.json()
+    query, thread_id = data['query'].strip(), data.get('thread_id')
+    with turn_context(query, thread_id):
+        return await async_connected_agent_service.process_query(query, thread_id)
+
+@app.post('/api/process')
+async def process_query(request: Request):
+    """Process query end-to-end (single call, not duplicate processing)"""
+    data = await request.json()
+    query = data['query'].strip()
+    thread_id = data.get('thread_id')
+    combined = bool(data.get('combined'))
+
+    with turn_context(query, thread_id, combined=combined) as turn:
+        if combined:
+            analysis_result = await async_connected_agent_service.analyze_purview(query)
+            processing_result = await async_connected_agent_service.process_query(query, thread_id)
+        else:
+            processing_result = await async_connected_agent_service.process_query(query, thread_id)
+            analysis_result = await async_connected_agent_service.analyze_purview(query)
+
+    return {
+        'success': processing_result.get('success', False),
+        'query': query,
+        'purview_analysis': analysis_result.get('purview', ''),
+        'response': processing_result.get('response', ''),
+        'annotations': processing_result.get('annotations', []),
+        'metadata': processing_result.get('metadata', {}),
+        'analysis_metadata': {
+            'catalog_results': analysis_result.get('catalog_results', {}),
+            'confidence': analysis_result.get('confidence', 0.0),
+            'catalog_source': analysis_result.get('catalog_source'),
+            'catalog_searches': turn.catalog_searches,
+            'timings': analysis_result.get('metadata', {}).get('timings')
+        }
+    }
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post('/api/process/stream')
+async def process_query_stream(request: Request):
+    """Process query end-to-end, streaming routing events and answer deltas as Server-Sent Events"""
+    data = await request.json()
+    query = data['query'].strip()
+    thread_id = data.get('thread_id')
+
+    async def generate():
+        yield _sse('start', {'query': query, 'thread_id': thread_id})
+        with turn_context(query, thread_id):
+            succeeded = False
+            async for event, payload in async_connected_agent_service.stream_query(query, thread_id):
+                succeeded = succeeded or event == 'done'
+                yield _sse(event, payload)
+
+            if succeeded:
+                analysis_result = await async_connected_agent_service.analyze_purview(query)
+                yield _sse('analysis', {
+                    'purview_analysis': analysis_result.get('purview', ''),
+                    'catalog_results': analysis_result.get('catalog_results', {}),
+                    'confidence': analysis_result.get('confidence', 0.0),
+                    'catalog_source': analysis_result.get('catalog_source')
+                })
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.post('/api/process-direct')
+async def process_query_direct(request: Request):
+    """Process query directly with a specific agent (manual mode)"""
+    data = await request.json()
+    query, agent, thread_id = data['query'].strip(), data['agent'].strip(), data.get('thread_id')
+
+    if agent == 'genie' and data.get('async'):
+        job = await async_genie_agent_service.start_job(query, thread_id)
+        return JSONResponse(job.to_dict(), status_code=202)
+
+    if agent == 'genie':
+        with turn_context(query, thread_id):
+            result_data = json.loads(await async_genie_agent_service.handoff_genie_agent(query))
+        return direct_genie_response(query, thread_id, result_data)
+
+    return await async_connected_agent_service.process_query_direct(query, AGENT_MAPPING[agent], thread_id)
+
+@app.post('/api/process/batch')
+async def process_query_batch(request: Request):
+    """Process many queries concurrently, streaming one NDJSON line per result as it completes"""
+    try:
+        items, concurrency = parse_batch_request(await request.json())
+    except (TypeError, ValueError) as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+    async def generate():
+        async for line in run_batch(items, concurrency):
+            yield ndjson(line)
+
+    return StreamingResponse(
+        generate(),
+        media_type='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.post('/api/genie/jobs')
+async def start_genie_job(request: Request):
+    """Submit a Genie question and return a job handle immediately"""
+    data = await request.json()
+    job = await async_genie_agent_service.start_job(data['query'].strip(), data.get('thread_id'))
+    return JSONResponse(job.to_dict(), status_code=202)
+
+@app.get('/api/genie/jobs/{job_id}')
+async def get_genie_job(job_id: str, wait: Optional[str] = None):
+    """Get a Genie job; ?wait=<seconds> long-polls until it finishes"""
+    try:
+        wait = job_wait_seconds(wait)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+    job = await async_genie_agent_service.wait_for_job(job_id, wait) if wait > 0 else async_genie_agent_service.get_job(job_id)
+    if job is None:
+        return JSONResponse({'success': False, 'error': f'Unknown Genie job {job_id}'}, status_code=404)
+    return job.to_dict()
+
+@app.get('/api/genie/results/{cursor}')
+async def get_genie_result_page(cursor: str, limit: Optional[int] = None, format: Optional[str] = None):
+    """Page through a Genie query result with the cursor returned in result_page.next_cursor"""
+    try:
+        return await async_genie_agent_service.fetch_result_page(cursor, limit, format)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+@app.get('/api/genie/jobs/{job_id}/events')
+async def stream_genie_job(job_id: str):
+    """Push the Genie job result as a Server-Sent Event once it is ready"""
+    job = async_genie_agent_service.get_job(job_id)
+    if job is None:
+        return JSONResponse({'success': False, 'error': f'Unknown Genie job {job_id}'}, status_code=404)
+
+    async def generate():
+        yield _sse('status', job.to_dict())
+        while not job.done.is_set():
+            await async_genie_agent_service.wait_for_job(job_id, 15)
+            if not job.done.is_set():
+                yield ': keep-alive\n\n'
+        yield _sse('done', job.to_dict())
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.get('/api/thread/{thread_id}/messages')
+async def get_thread_messages(request: Request, thread_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                              after: Optional[str] = None, since: Optional[int] = None):
+    """Get the messages of a specific thread, or one page of them"""
+    try:
+        result = await async_connected_agent_service.get_thread_messages(
+            thread_id, limit, before, after, since, if_none_match=request.headers.get('if-none-match')
+        )
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+    if result.get('not_modified'):
+        return Response(status_code=304, headers={'ETag': result['etag']})
+    return JSONResponse(result, headers={'ETag': result['etag']})
+
+@app.get('/metrics')
+async def metrics():
+    """Per-stage latency histograms and delegation counters in the Prometheus text format"""
+    return Response(registry.render(), headers={'Content-Type': CONTENT_TYPE})
+
+@app.get('/')
+async def index():
+    """Serve the main index.html file"""
+    return FileResponse(os.path.join(DIST_DIR, 'index.html'))
+
+if os.path.exists(DIST_DIR):
+    app.mount('/', StaticFiles(directory=DIST_DIR), name='static')
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Starting Purview Router ASGI server...")
+    print(f"🌐 Open http://localhost:{settings.FLASK_PORT} in your browser")
+    uvicorn.run(app, host=settings.FLASK_HOST, port=settings.FLASK_PORT)
@@ -0,0 +1,3 @@
+"""
+Hot-path micro-benchmarks for Agent Router application.
+"""
@@ -0,0 +1,37 @@
+import argparse
+import sys
+from pathlib import Path
+from backend.benchmarks.runner import BASELINE_PATH, DEFAULT_TOLERANCE, compare, load_baseline, run_cases, save_baseline
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the router hot-path benchmarks and compare them to the baseline")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="fail when a case's fastest sample is this many times the baseline's")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.names)
+    baseline = load_baseline(args.baseline)
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name, {}).get("min_seconds")
+        vs = f"  ({result['min_seconds'] / reference:.2f}x baseline)" if reference else ""
+        print(f"{name:32} {result['min_seconds'] * 1000:10.3f} ms min "
+              f"{result['median_seconds'] * 1000:10.3f} ms median{vs}")
+
+    if args.update_baseline:
+        save_baseline({**baseline.get("results", {}), **results}, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']}: {regression['min_seconds'] * 1000:.3f} ms vs "
+              f"{regression['baseline_seconds'] * 1000:.3f} ms baseline ({regression['ratio']}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
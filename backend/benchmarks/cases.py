@@ -0,0 +1,184 @@
+"""Hot paths measured against fake clients with scripted latencies, so only this repo's Python is on the clock."""
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Azure SDK stand-ins shared with the unit tests; must load before the services import the SDK
+import backend.tests.conftest  # noqa: F401
+from backend.benchmarks.runner import benchmark
+from backend.services import connected_agent_service as connected_module
+from backend.services.catalog_service import CatalogService
+from backend.services.connected_agent_service import ConnectedAgentService
+from backend.services.genie_agent_service import GenieAgentService
+from backend.services.genie_results import build_result_page
+from backend.services.message_processor import MessageProcessor
+from backend.services.run_waiter import PollingRunWaiter
+
+# Scripted backend latencies, in seconds
+TOOL_LATENCY = 0.001
+FILE_LOOKUP_LATENCY = 0.001
+
+
+def scaled(size: int, scale: float) -> int:
+    return max(1, int(size * scale))
+
+
+class ScriptedRuns:
+    """Runs client that walks through ``rounds`` of required tool calls before completing."""
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.responses = []
+
+    def create(self, thread_id, agent_id):
+        self.responses = [
+            SimpleNamespace(id="run-bench", status="requires_action",
+                            required_action=SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls)))
+            for tool_calls in self.rounds
+        ] + [SimpleNamespace(id="run-bench", status="completed")]
+        return SimpleNamespace(id="run-bench", status="queued")
+
+    def get(self, thread_id, run_id):
+        return self.responses.pop(0)
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        pass
+
+
+class ScriptedFiles:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get(self, file_id):
+        time.sleep(self.latency)
+        return SimpleNamespace(filename=f"{file_id}.pdf")
+
+
+@benchmark("routing.tool_dispatch")
+def routing_tool_dispatch(scale: float):
+    """``_execute_routing_run`` over rounds of parallel catalog and Genie tool calls."""
+    rounds = [
+        [
+            SimpleNamespace(id=f"call-{round_index}-{call_index}", function=SimpleNamespace(
+                name="search_catalog" if call_index % 2 else "handoff_genie_agent",
+                arguments=json.dumps({"query": f"question {round_index} {call_index}"})
+            ))
+            for call_index in range(4)
+        ]
+        for round_index in range(scaled(20, scale))
+    ]
+    catalog_results = {"status": "success", "assets_found": 0, "results": []}
+
+    def search(query):
+        time.sleep(TOOL_LATENCY)
+        return catalog_results
+
+    def ask_genie(query):
+        time.sleep(TOOL_LATENCY)
+        return json.dumps({"status": "success", "text_response": "42"})
+
+    service = ConnectedAgentService()
+    service.main_agent = SimpleNamespace(id="router")
+    service._catalog_results = search
+    service.run_waiter = PollingRunWaiter(ScriptedRuns(rounds), initial_interval=0.0, max_interval=0.0)
+    genie = SimpleNamespace(handoff_genie_agent=ask_genie)
+
+    def run():
+        with patch.object(connected_module, "genie_agent_service", genie):
+            service._execute_routing_run("thread-bench")
+    return run
+
+
+@benchmark("messages.format_thread")
+def format_thread(scale: float):
+    """``format_thread_messages`` on a long thread citing many files, with a cold file-name cache."""
+    file_count = scaled(200, scale)
+
+    def message(index):
+        return SimpleNamespace(
+            id=f"msg-{index}",
+            role="assistant" if index % 2 else "user",
+            created_at=1700000000 + index,
+            content=[SimpleNamespace(text=SimpleNamespace(value=f"Answer {index} " * 20))],
+            file_citation_annotations=[
+                SimpleNamespace(text=f"【{index}:{n}†source】", start_index=n * 10, end_index=n * 10 + 8,
+                                file_citation=SimpleNamespace(file_id=f"file-{(index + n) % file_count}",
+                                                              quote="quoted passage"))
+                for n in range(4)
+            ],
+            url_citation_annotations=[
+                SimpleNamespace(text=f"[{n}]", start_index=n, end_index=n + 3,
+                                url_citation=SimpleNamespace(url=f"https://example.com/{index}/{n}", title="Example"))
+                for n in range(2)
+            ]
+        )
+
+    messages = [message(index) for index in range(scaled(2000, scale))]
+    processor = MessageProcessor(SimpleNamespace(agents=SimpleNamespace(files=ScriptedFiles(FILE_LOOKUP_LATENCY))))
+
+    def run():
+        processor.file_names.clear()
+        processor.format_thread_messages(messages, "thread-bench")
+    return run
+
+
+def genie_rows(count: int, columns: int = 8):
+    return [[f"r{row}c{column}" if column % 2 else row * column for column in range(columns)]
+            for row in range(count)]
+
+
+def genie_manifest(rows: int, columns: int = 8):
+    return {
+        "schema": {"columns": [{"name": f"col_{column}"} for column in range(columns)]},
+        "total_row_count": rows,
+        "chunks": [{"chunk_index": 0, "row_offset": 0, "row_count": rows}]
+    }
+
+
+@benchmark("genie.render_query_results", number=200)
+def genie_render_query_results(scale: float):
+    """Inline rendering of a large Genie result, which must stay bounded by the row and byte budget."""
+    rows = scaled(100000, scale)
+    query_results = {"statement_response": {
+        "statement_id": "stmt-bench",
+        "manifest": genie_manifest(rows),
+        "result": {"chunk_index": 0, "data_array": genie_rows(rows)}
+    }}
+    service = GenieAgentService()
+    state = {"conversation_id": "conv", "message_id": "msg", "attachment_id": "att"}
+    return lambda: service.render_query_results(query_results, rows, state)
+
+
+def genie_result_page(scale: float, fmt: str):
+    rows = genie_rows(scaled(1000, scale))
+    manifest = genie_manifest(len(rows) * 10)
+    state = {"conversation_id": "conv", "message_id": "msg", "attachment_id": "att", "offset": 0}
+    first_chunk = {"chunk_index": 0, "data_array": rows}
+    return lambda: build_result_page(state, manifest, first_chunk, rows, fmt)
+
+
+@benchmark("genie.result_page_markdown", number=5)
+def genie_result_page_markdown(scale: float):
+    return genie_result_page(scale, "markdown")
+
+
+@benchmark("genie.result_page_json", number=5)
+def genie_result_page_json(scale: float):
+    return genie_result_page(scale, "json")
+
+
+@benchmark("catalog.shape_results", number=5)
+def catalog_shape_results(scale: float):
+    """``CatalogService.shape_results`` on a large Purview search payload."""
+    payload = {"value": [
+        {
+            "id": f"asset-{index}",
+            "displayText": f"Dataset {index}",
+            "userDescription": f"Sales data for region {index}. agent: {'genie' if index % 2 else 'fabric'}",
+            "contact": [{"id": "c53c736b-8469-409c-9dcc-b3a61953d4dd"}] if index % 3 else []
+        }
+        for index in range(scaled(1000, scale))
+    ]}
+    service = CatalogService()
+    return lambda: service.shape_results(payload)
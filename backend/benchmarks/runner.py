@@ -0,0 +1,105 @@
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# A case regresses when its fastest sample is this many times slower than the baseline's
+DEFAULT_TOLERANCE = 2.0
+
+
+class BenchmarkCase:
+    def __init__(self, name: str, setup: Callable[[float], Callable[[], Any]], number: int, repeat: int):
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+
+
+CASES: Dict[str, BenchmarkCase] = {}
+
+
+def benchmark(name: str, number: int = 1, repeat: int = 15):
+    """Register ``setup(scale) -> run``; ``run`` is timed ``number`` times per sample, ``repeat`` samples."""
+    def register(setup: Callable[[float], Callable[[], Any]]):
+        CASES[name] = BenchmarkCase(name, setup, number, repeat)
+        return setup
+    return register
+
+
+def sample(run: Callable[[], Any], number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        run()
+    return (time.perf_counter() - started) / number
+
+
+def summarize(samples: List[float], number: int) -> Dict[str, Any]:
+    return {
+        "min_seconds": round(min(samples), 6),
+        "median_seconds": round(statistics.median(samples), 6),
+        "samples": len(samples),
+        "number": number
+    }
+
+
+def run_cases(names: Optional[Iterable[str]] = None, scale: float = 1.0,
+              repeat: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Time the cases round-robin, so a slow spell on a shared machine hits every case rather than one."""
+    # Importing the cases registers them
+    from backend.benchmarks import cases  # noqa: F401
+
+    selected = list(names) if names else sorted(CASES)
+    unknown = [name for name in selected if name not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}")
+    runs = {name: CASES[name].setup(scale) for name in selected}
+    for run in runs.values():
+        run()
+    counts = {name: repeat or CASES[name].repeat for name in selected}
+    samples: Dict[str, List[float]] = {name: [] for name in selected}
+    for round_index in range(max(counts.values(), default=0)):
+        for name in selected:
+            if round_index < counts[name]:
+                samples[name].append(sample(runs[name], CASES[name].number))
+    return {name: summarize(samples[name], CASES[name].number) for name in selected}
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"results": {}}
+
+
+def save_baseline(results: Dict[str, Dict[str, Any]], path: Path = BASELINE_PATH) -> None:
+    baseline = {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """Cases whose fastest sample exceeds ``tolerance`` times the baseline's; the minimum is the least noisy estimate."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference or not reference.get("min_seconds"):
+            continue
+        ratio = result["min_seconds"] / reference["min_seconds"]
+        if ratio > tolerance:
+            regressions.append({
+                "name": name,
+                "min_seconds": result["min_seconds"],
+                "baseline_seconds": reference["min_seconds"],
+                "ratio": round(ratio, 2)
+            })
+    return regressions
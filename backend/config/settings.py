@@ -1,9 +1,12 @@
 import os
+from pathlib import Path
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
 class Settings:
     def __init__(self):
         self.AZURE_AI_AGENT_ENDPOINT = os.getenv('AZURE_AI_AGENT_ENDPOINT')
@@ -19,7 +22,98 @@ class Settings:
         self.FLASK_HOST = os.getenv('FLASK_HOST', '0.0.0.0')
         self.FLASK_PORT = int(os.getenv('FLASK_PORT', '5000'))
         self.FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
-    
+        # Run waiting: 'auto' streams when the SDK supports it, otherwise polls
+        self.RUN_WAIT_STRATEGY = os.getenv('RUN_WAIT_STRATEGY', 'auto').lower()
+        self.RUN_POLL_INITIAL_INTERVAL = float(os.getenv('RUN_POLL_INITIAL_INTERVAL', '0.05'))
+        self.RUN_POLL_MAX_INTERVAL = float(os.getenv('RUN_POLL_MAX_INTERVAL', '1.0'))
+        self.RUN_TIMEOUT_SECONDS = float(os.getenv('RUN_TIMEOUT_SECONDS', '120'))
+        # A stream that sends nothing for this long is abandoned for polling
+        self.RUN_STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv('RUN_STREAM_IDLE_TIMEOUT_SECONDS', '30'))
+        # Tool calls within one requires_action step run concurrently, each timed from when it starts
+        self.SEARCH_CATALOG_TIMEOUT_SECONDS = float(os.getenv('SEARCH_CATALOG_TIMEOUT_SECONDS', '30'))
+        # Shared credential: 'default' (DefaultAzureCredential) or 'cli' (AzureCliCredential)
+        self.AZURE_CREDENTIAL = os.getenv('AZURE_CREDENTIAL', 'default').lower()
+        self.TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv('TOKEN_REFRESH_MARGIN_SECONDS', '300'))
+        # Pooled keep-alive HTTP transport, sized per backend
+        self.HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+        self.HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+        self.HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+        self.PURVIEW_POOL_SIZE = int(os.getenv('PURVIEW_POOL_SIZE', '10'))
+        self.GENIE_POOL_SIZE = int(os.getenv('GENIE_POOL_SIZE', '10'))
+        self.AGENTS_POOL_SIZE = int(os.getenv('AGENTS_POOL_SIZE', '20'))
+        self.AGENTS_READ_TIMEOUT = float(os.getenv('AGENTS_READ_TIMEOUT', '120'))
+        self.CATALOG_CACHE_TTL_SECONDS = float(os.getenv('CATALOG_CACHE_TTL_SECONDS', '300'))
+        self.CATALOG_CACHE_MAX_ENTRIES = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', '256'))
+        # Genie polling backs off per status; questions still running after the budget continue as background jobs
+        self.GENIE_POLL_INITIAL_INTERVAL = float(os.getenv('GENIE_POLL_INITIAL_INTERVAL', '0.25'))
+        self.GENIE_POLL_MAX_INTERVAL = float(os.getenv('GENIE_POLL_MAX_INTERVAL', '3.0'))
+        self.GENIE_POLL_TIMEOUT_SECONDS = float(os.getenv('GENIE_POLL_TIMEOUT_SECONDS', '45'))
+        self.GENIE_JOB_TIMEOUT_SECONDS = float(os.getenv('GENIE_JOB_TIMEOUT_SECONDS', '900'))
+        self.GENIE_JOB_WORKERS = int(os.getenv('GENIE_JOB_WORKERS', '4'))
+        self.GENIE_JOB_TTL_SECONDS = float(os.getenv('GENIE_JOB_TTL_SECONDS', '3600'))
+        self.GENIE_JOB_MAX_ENTRIES = int(os.getenv('GENIE_JOB_MAX_ENTRIES', '256'))
+        # Follow-up Genie questions in the same agent thread reuse its Genie conversation until it idles out
+        self.GENIE_CONVERSATION_IDLE_SECONDS = float(os.getenv('GENIE_CONVERSATION_IDLE_SECONDS', '1800'))
+        self.GENIE_CONVERSATION_MAX_ENTRIES = int(os.getenv('GENIE_CONVERSATION_MAX_ENTRIES', '1000'))
+        # Completed Genie answers, shared by identical questions and by questions that produce the same SQL
+        self.GENIE_ANSWER_CACHE_TTL_SECONDS = float(os.getenv('GENIE_ANSWER_CACHE_TTL_SECONDS', '600'))
+        self.GENIE_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('GENIE_ANSWER_CACHE_MAX_ENTRIES', '256'))
+        # Genie results: text handed to the routing agent stays within these budgets; the rest is paged via cursors
+        self.GENIE_RESULT_FORMAT = os.getenv('GENIE_RESULT_FORMAT', 'markdown').lower()
+        self.GENIE_RESULT_MAX_ROWS = int(os.getenv('GENIE_RESULT_MAX_ROWS', '10'))
+        self.GENIE_RESULT_MAX_BYTES = int(os.getenv('GENIE_RESULT_MAX_BYTES', '8000'))
+        self.GENIE_RESULT_PAGE_SIZE = int(os.getenv('GENIE_RESULT_PAGE_SIZE', '100'))
+        self.GENIE_RESULT_MAX_PAGE_SIZE = int(os.getenv('GENIE_RESULT_MAX_PAGE_SIZE', '1000'))
+        self.GENIE_RESULT_CACHE_ENTRIES = int(os.getenv('GENIE_RESULT_CACHE_ENTRIES', '64'))
+        # Provision agents in the background at process start; requests wait up to the timeout for it
+        self.WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'true').lower() == 'true'
+        self.READINESS_TIMEOUT_SECONDS = float(os.getenv('READINESS_TIMEOUT_SECONDS', '60'))
+        # Per-stage latency histograms served at /metrics
+        self.METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+        # Per-request spans are returned in metadata.timings; set an OTLP/HTTP endpoint to also export them
+        self.TRACE_EXPORT_ENDPOINT = os.getenv('TRACE_EXPORT_ENDPOINT', '')
+        self.TRACE_EXPORT_QUEUE_SIZE = int(os.getenv('TRACE_EXPORT_QUEUE_SIZE', '256'))
+        self.TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'agent-router')
+        # Admission control: concurrent calls per backend, callers allowed to queue, and how long they may wait
+        self.AGENT_RUN_CONCURRENCY = int(os.getenv('AGENT_RUN_CONCURRENCY', '16'))
+        self.AGENT_RUN_QUEUE_DEPTH = int(os.getenv('AGENT_RUN_QUEUE_DEPTH', '64'))
+        self.CATALOG_SEARCH_CONCURRENCY = int(os.getenv('CATALOG_SEARCH_CONCURRENCY', '8'))
+        self.CATALOG_SEARCH_QUEUE_DEPTH = int(os.getenv('CATALOG_SEARCH_QUEUE_DEPTH', '32'))
+        self.GENIE_CONCURRENCY = int(os.getenv('GENIE_CONCURRENCY', '4'))
+        self.GENIE_QUEUE_DEPTH = int(os.getenv('GENIE_QUEUE_DEPTH', '16'))
+        self.ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '30'))
+        self.ADMISSION_RETRY_AFTER_SECONDS = float(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', '5'))
+        # Process-wide tool-call threads: enough for every call the Genie and catalog limiters admit or queue
+        self.TOOL_CALL_MAX_WORKERS = int(os.getenv(
+            'TOOL_CALL_MAX_WORKERS',
+            self.GENIE_CONCURRENCY + self.GENIE_QUEUE_DEPTH + self.CATALOG_SEARCH_CONCURRENCY + self.CATALOG_SEARCH_QUEUE_DEPTH
+        ))
+        # Run-step fetches overlap one per finishing run, so the pool keeps pace with the admitted runs
+        self.RUN_DETAILS_MAX_WORKERS = int(os.getenv('RUN_DETAILS_MAX_WORKERS', self.AGENT_RUN_CONCURRENCY))
+        # A Genie tool call may queue for admission and then poll for the whole budget before returning a job handle
+        self.GENIE_TOOL_TIMEOUT_SECONDS = float(os.getenv(
+            'GENIE_TOOL_TIMEOUT_SECONDS', self.ADMISSION_QUEUE_TIMEOUT_SECONDS + self.GENIE_POLL_TIMEOUT_SECONDS + 15
+        ))
+        # Turns on one agent thread run one at a time; at most this many more may queue behind the active one
+        self.THREAD_TURN_QUEUE_DEPTH = int(os.getenv('THREAD_TURN_QUEUE_DEPTH', '4'))
+        # /api/process/batch fan-out
+        self.BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+        self.BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '16'))
+        self.BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+        # Agent threads created or verified recently are trusted without a threads.get call
+        self.KNOWN_THREAD_CACHE_TTL_SECONDS = float(os.getenv('KNOWN_THREAD_CACHE_TTL_SECONDS', '3600'))
+        self.KNOWN_THREAD_CACHE_MAX_ENTRIES = int(os.getenv('KNOWN_THREAD_CACHE_MAX_ENTRIES', '10000'))
+        # Thread history is returned whole unless paged; a page holds at most THREAD_MESSAGES_MAX_PAGE_SIZE messages
+        self.THREAD_MESSAGES_PAGE_SIZE = int(os.getenv('THREAD_MESSAGES_PAGE_SIZE', '100'))
+        self.THREAD_MESSAGES_MAX_PAGE_SIZE = int(os.getenv('THREAD_MESSAGES_MAX_PAGE_SIZE', '100'))
+        # Citation file names are looked up once per file id and cached
+        self.FILE_METADATA_CACHE_TTL_SECONDS = float(os.getenv('FILE_METADATA_CACHE_TTL_SECONDS', '3600'))
+        self.FILE_METADATA_CACHE_MAX_ENTRIES = int(os.getenv('FILE_METADATA_CACHE_MAX_ENTRIES', '1024'))
+        self.FILE_LOOKUP_MAX_WORKERS = int(os.getenv('FILE_LOOKUP_MAX_WORKERS', '8'))
+        # Agents and vector stores are kept across restarts and reused while their definition is unchanged
+        self.AGENT_REGISTRY_ENABLED = os.getenv('AGENT_REGISTRY_ENABLED', 'true').lower() == 'true'
+        self.AGENT_REGISTRY_PATH = os.getenv('AGENT_REGISTRY_PATH', str(DATA_DIR / 'agent_registry.json'))
+
     def get_required_vars(self) -> List[str]:
         required = ['AZURE_AI_AGENT_ENDPOINT', 'MODEL_DEPLOYMENT_NAME', 'BING_CONNECTION_ID', 'PURVIEW_ENDPOINT']
         if self.ENABLE_FABRIC_AGENT:
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator
+from backend.config.settings import settings
+from backend.services.request_context import current_turn
+from backend.services.tracing import record_span
+from backend.utils.logging_config import get_logger
+
+
+class LimitExceededError(RuntimeError):
+    """Raised when a backend's concurrency limit and wait queue are both full."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"{name} is busy ({reason}), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Caps concurrent calls to one backend, with a bounded queue for callers waiting on a slot.
+
+    Callers beyond ``queue_depth``, or still queued after ``queue_timeout``, are rejected with
+    ``LimitExceededError`` instead of piling more load on the backend. A ``limit`` of 0 disables it.
+    """
+
+    def __init__(self, name: str, limit: int, queue_depth: int, queue_timeout: float = None,
+                 retry_after: float = None):
+        self.logger = get_logger(__name__)
+        self.name = name
+        self.limit = limit
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        self.retry_after = retry_after if retry_after is not None else settings.ADMISSION_RETRY_AFTER_SECONDS
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._condition = threading.Condition()
+
+    def _reject(self, reason: str) -> LimitExceededError:
+        self.rejected += 1
+        self.logger.warning(f"Rejected {self.name} call: {reason}")
+        return LimitExceededError(self.name, reason, self.retry_after)
+
+    def _admit(self, started: float) -> float:
+        self.in_flight += 1
+        self.admitted += 1
+        waited = time.perf_counter() - started
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        turn = current_turn()
+        if turn:
+            turn.record_queue_wait(self.name, waited)
+        record_span(f"queue.{self.name}", started, waited)
+        return waited
+
+    @contextmanager
+    def acquire(self) -> Iterator[float]:
+        """Hold a slot for the duration of the block; yields the seconds spent queued."""
+        if self.limit <= 0:
+            yield 0.0
+            return
+        started = time.perf_counter()
+        with self._condition:
+            if self.in_flight >= self.limit:
+                if self.waiting >= self.queue_depth:
+                    raise self._reject("queue full")
+                self.waiting += 1
+                try:
+                    admitted = self._condition.wait_for(lambda: self.in_flight < self.limit, self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    raise self._reject(f"queued for {self.queue_timeout:.0f}s")
+            waited = self._admit(started)
+        try:
+            yield waited
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait_seconds, 3)
+        }
+
+
+class AsyncConcurrencyLimiter(ConcurrencyLimiter):
+    """Event-loop counterpart of ``ConcurrencyLimiter``; the condition is bound to the first loop that uses it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[float]:
+        if self.limit <= 0:
+            yield 0.0
+            return
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        started = time.perf_counter()
+        async with self._condition:
+            if self.in_flight >= self.limit:
+                if self.waiting >= self.queue_depth:
+                    raise self._reject("queue full")
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(lambda: self.in_flight < self.limit), self.queue_timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise self._reject(f"queued for {self.queue_timeout:.0f}s")
+                finally:
+                    self.waiting -= 1
+            waited = self._admit(started)
+        try:
+            yield waited
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+
+def build_limiters(limiter_class) -> Dict[str, ConcurrencyLimiter]:
+    return {
+        "agent_runs": limiter_class("agent_runs", settings.AGENT_RUN_CONCURRENCY, settings.AGENT_RUN_QUEUE_DEPTH),
+        "catalog_search": limiter_class(
+            "catalog_search", settings.CATALOG_SEARCH_CONCURRENCY, settings.CATALOG_SEARCH_QUEUE_DEPTH
+        ),
+        "genie": limiter_class("genie", settings.GENIE_CONCURRENCY, settings.GENIE_QUEUE_DEPTH)
+    }
+
+
+def queue_wait_report(name: str, waited: float) -> Dict[str, float]:
+    """Queue wait per backend for the current turn, or just ``name`` outside of one."""
+    turn = current_turn()
+    return turn.queue_wait_snapshot() if turn else {name: round(waited, 4)}
+
+
+limiters = build_limiters(ConcurrencyLimiter)
+async_limiters = build_limiters(AsyncConcurrencyLimiter)
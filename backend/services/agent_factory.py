@@ -1,25 +1,67 @@
 import os
-import requests
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 from azure.ai.agents.models import ConnectedAgentTool, FunctionTool, FabricTool, BingGroundingTool
 from azure.ai.agents.models import FileSearchTool, FilePurpose
 from azure.ai.projects import AIProjectClient
 from backend.utils.logging_config import get_logger
-from backend.config.settings import settings
+from backend.config.settings import DATA_DIR, settings
+from backend.services.agent_registry import AgentRegistry, definition_fingerprint, file_digest
+from backend.services.http_transport import http_transport
 
 class AgentFactory:
     
-    def __init__(self, project_client: AIProjectClient):
+    def __init__(self, project_client: AIProjectClient, registry: Optional[AgentRegistry] = None):
         self.logger = get_logger(__name__)
         self.project_client = project_client
+        self.registry = registry
+    
+    def _create_agent(self, **definition) -> Any:
+        if self.registry is None:
+            return self.project_client.agents.create_agent(**definition)
+        
+        agents = self.project_client.agents
+        agent, _ = self.registry.ensure(
+            definition["name"],
+            definition_fingerprint(definition),
+            fetch=lambda entry: agents.get_agent(entry["id"]),
+            create=lambda: (agents.create_agent(**definition), {}),
+            discard=lambda entry: agents.delete_agent(entry["id"])
+        )
+        return agent
+    
+    def _create_vector_store(self, file_path: Path) -> Tuple[Any, Optional[str]]:
+        agents = self.project_client.agents
+        
+        def create():
+            file = agents.files.upload_and_poll(file_path=str(file_path), purpose=FilePurpose.AGENTS)
+            vector_store = agents.vector_stores.create_and_poll(file_ids=[file.id], name="rag_vectorstore")
+            return vector_store, {"file_id": file.id}
+        
+        if self.registry is None:
+            vector_store, extra = create()
+            return vector_store, extra["file_id"]
+        
+        def discard(entry):
+            agents.vector_stores.delete(entry["id"])
+            if entry.get("file_id"):
+                agents.files.delete(entry["file_id"])
+        
+        vector_store, entry = self.registry.ensure(
+            "rag_vectorstore",
+            definition_fingerprint({"name": "rag_vectorstore", "files": [file_digest(file_path)]}),
+            fetch=lambda entry: agents.vector_stores.get(entry["id"]),
+            create=create,
+            discard=discard
+        )
+        return vector_store, entry.get("file_id")
     
     def create_fabric_agent(self) -> Any:
         if not settings.ENABLE_FABRIC_AGENT or not settings.FABRIC_CONNECTION_ID:
             return None
             
         fabric_tool = FabricTool(connection_id=settings.FABRIC_CONNECTION_ID)
-        return self.project_client.agents.create_agent(
+        return self._create_agent(
             model=settings.MODEL_DEPLOYMENT_NAME,
             name="fabric-agent",
             instructions="You are a data analysis agent with access to Microsoft Fabric data sources.",
@@ -28,7 +70,7 @@ class AgentFactory:
     
     def create_web_agent(self) -> Any:
         bing_tool = BingGroundingTool(connection_id=settings.BING_CONNECTION_ID)
-        return self.project_client.agents.create_agent(
+        return self._create_agent(
             model=settings.MODEL_DEPLOYMENT_NAME, 
             name="web-agent",
             instructions="You are a web search agent that finds current information from the internet using Bing Search.",
@@ -37,28 +79,19 @@ class AgentFactory:
     
     def create_rag_agent(self) -> Tuple[Any, Dict[str, Any]]:
         doc_url = "https://download.microsoft.com/documents/uk/athome/SM_Learn_5MinEncarta_F.pdf"
-        data_dir = Path(__file__).resolve().parent.parent / "data"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        file_path = data_dir / "encarta_guide.pdf"
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        file_path = DATA_DIR / "encarta_guide.pdf"
         
         if not file_path.exists():
-            response = requests.get(doc_url)
+            response = http_transport.session("downloads").get(doc_url)
+            response.raise_for_status()
             with open(file_path, 'wb') as f:
                 f.write(response.content)
         
-        file = self.project_client.agents.files.upload_and_poll(
-            file_path=str(file_path), 
-            purpose=FilePurpose.AGENTS
-        )
-        
-        vector_store = self.project_client.agents.vector_stores.create_and_poll(
-            file_ids=[file.id], 
-            name="rag_vectorstore"
-        )
-        
+        vector_store, file_id = self._create_vector_store(file_path)
         file_search = FileSearchTool(vector_store_ids=[vector_store.id])
         
-        rag_agent = self.project_client.agents.create_agent(
+        rag_agent = self._create_agent(
             model=settings.MODEL_DEPLOYMENT_NAME,
             name="rag-agent",
             instructions="You are a RAG agent that searches documents to answer questions.",
@@ -66,7 +99,7 @@ class AgentFactory:
             tool_resources=file_search.resources,
         )
         
-        return rag_agent, {"vector_store": vector_store, "file": file}
+        return rag_agent, {"vector_store": vector_store, "file_id": file_id}
     
     def create_routing_agent(self, connected_agents: Dict[str, Any], search_function, genie_function) -> Any:
         function_tool = FunctionTool(functions={search_function, genie_function})
@@ -82,7 +115,7 @@ class AgentFactory:
         
         all_tools = function_tool.definitions + [tool.definitions[0] for tool in connected_tools]
         
-        return self.project_client.agents.create_agent(
+        return self._create_agent(
             model=settings.MODEL_DEPLOYMENT_NAME,
             name="purview_routing_agent",
             instructions="""You are a routing agent for Microsoft Purview. 
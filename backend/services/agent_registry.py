@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from azure.core.exceptions import ResourceNotFoundError
+from backend.utils.logging_config import get_logger
+
+REGISTRY_VERSION = 1
+
+
+def _canonical(value: Any) -> Any:
+    if hasattr(value, "as_dict"):
+        value = value.as_dict()
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        value = vars(value)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_canonical(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def definition_fingerprint(definition: Dict[str, Any]) -> str:
+    """Stable hash of an agent or resource definition.
+
+    Tool lists are hashed order-independently, since ``FunctionTool`` builds its
+    definitions from a set.
+    """
+    canonical = _canonical(definition)
+    if isinstance(canonical.get("tools"), list):
+        canonical["tools"] = sorted(canonical["tools"], key=lambda tool: json.dumps(tool, sort_keys=True))
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AgentRegistry:
+    """Local record of provisioned agents and vector stores, keyed by definition hash.
+
+    Entries are scoped to one project endpoint and persisted as JSON, so a restart
+    reuses every resource whose definition is unchanged and only recreates the rest.
+    """
+
+    def __init__(self, path: Path, scope: str = ""):
+        self.logger = get_logger(__name__)
+        self.path = Path(path)
+        self.scope = scope or ""
+        self._lock = threading.Lock()
+        self._data = self._load()
+        self.reused = 0
+        self.created = 0
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == REGISTRY_VERSION:
+                return data
+            self.logger.warning(f"Ignoring agent registry {self.path} with unknown version")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable agent registry {self.path}: {e}")
+        return {"version": REGISTRY_VERSION, "scopes": {}}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        return self._data["scopes"].setdefault(self.scope, {})
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.entries[key] = entry
+            self._save()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def ensure(self, key: str, fingerprint: str,
+               fetch: Callable[[Dict[str, Any]], Any],
+               create: Callable[[], Tuple[Any, Dict[str, Any]]],
+               discard: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Return the registered resource for ``key`` if its fingerprint matches, else create it.
+
+        ``fetch`` confirms a registered resource still exists remotely; ``create`` returns the new
+        resource plus extra fields to record; ``discard`` removes a stale resource best-effort.
+        Only a 404 from ``fetch`` means the resource is gone; any other error propagates, so a
+        transient failure never replaces a resource that still exists.
+        """
+        entry = self.get(key)
+        if entry and entry.get("fingerprint") == fingerprint:
+            try:
+                resource = fetch(entry)
+                self.reused += 1
+                self.logger.info(f"Reusing registered {key} ({entry['id']})")
+                return resource, entry
+            except ResourceNotFoundError as e:
+                self.logger.warning(f"Registered {key} ({entry['id']}) is no longer available, recreating: {e}")
+        elif entry and discard:
+            self.logger.info(f"Definition of {key} changed, replacing {entry['id']}")
+            try:
+                discard(entry)
+            except Exception as e:
+                self.logger.warning(f"Could not delete stale {key} ({entry['id']}): {e}")
+
+        resource, extra = create()
+        entry = {"id": resource.id, "fingerprint": fingerprint, "created_at": int(time.time()), **extra}
+        self.put(key, entry)
+        self.created += 1
+        return resource, entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "entries": len(self.entries),
+            "reused": self.reused,
+            "created": self.created
+        }
@@ -0,0 +1,3 @@
+"""
+Asyncio-native service variants used by the ASGI entry point.
+"""
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+from backend.services.aio.connected_agent_service import async_connected_agent_service
+from backend.services.aio.genie_agent_service import async_genie_agent_service
+from backend.services.batch_service import AGENT_MAPPING, batch_summary, item_result, logger
+from backend.services.genie_agent_service import direct_genie_response
+from backend.services.request_context import turn_context
+
+
+async def process_batch_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    query, agent, thread_id = item['query'], item['agent'], item['thread_id']
+    try:
+        with turn_context(query, thread_id):
+            if agent is None:
+                result = await async_connected_agent_service.process_query(query, thread_id)
+            elif agent == 'genie':
+                result = direct_genie_response(
+                    query, thread_id, json.loads(await async_genie_agent_service.handoff_genie_agent(query))
+                )
+            else:
+                result = await async_connected_agent_service.process_query_direct(query, AGENT_MAPPING[agent], thread_id)
+    except Exception as e:
+        logger.error(f"Batch item {item['index']} failed: {e}")
+        return item_result(item, started, error=str(e))
+    return item_result(item, started, result)
+
+
+async def run_batch(items: List[Dict[str, Any]], concurrency: int,
+                    process: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]] = process_batch_item
+                    ) -> AsyncIterator[Dict[str, Any]]:
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def bounded(item: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await process(item)
+
+    # Each task copies the current context, so every item gets its own turn
+    tasks = [asyncio.create_task(bounded(item)) for item in items]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            results.append(result)
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield batch_summary(results, started)
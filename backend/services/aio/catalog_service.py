@@ -0,0 +1,48 @@
+import copy
+import httpx
+from typing import Dict, Any
+from backend.services.admission import async_limiters
+from backend.services.catalog_service import CatalogService, PURVIEW_SCOPE
+from backend.services.http_transport import http_transport
+from backend.services.metrics import timed_stage
+from backend.services.token_provider import token_provider
+
+class AsyncCatalogService(CatalogService):
+    def __init__(self, http_client: httpx.AsyncClient = None, credential=None):
+        super().__init__()
+        self.http_client = http_client
+        self.credential = credential or token_provider.as_async()
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self.http_client is None:
+            self.http_client = http_transport.async_client("purview")
+        return self.http_client
+    
+    async def search_catalog(self, query: str) -> Dict[str, Any]:
+        search_request = self.build_search_request(query)
+        results = await self.cache.aget_or_load(
+            self.cache_key(search_request["json"]),
+            lambda: self._fetch_catalog(search_request)
+        )
+        return copy.deepcopy(results)
+    
+    async def _fetch_catalog(self, search_request: Dict[str, Any]) -> Dict[str, Any]:
+        with timed_stage("catalog_fetch", "purview"):
+            token = await self.credential.get_token(PURVIEW_SCOPE)
+            
+            async with async_limiters["catalog_search"].acquire():
+                search_response = await self._get_http_client().post(
+                    search_request["url"],
+                    json=search_request["json"],
+                    headers={"Authorization": f"Bearer {token.token}"}
+                )
+            
+            search_response.raise_for_status()
+            return self.shape_results(search_response.json())
+    
+    async def aclose(self) -> None:
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+async_catalog_service = AsyncCatalogService()
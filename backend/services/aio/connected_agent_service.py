@@ -0,0 +1,411 @@
+import asyncio
+import json
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from azure.ai.projects.aio import AIProjectClient
+from azure.core.exceptions import ResourceNotFoundError
+from backend.config.settings import settings
+from backend.utils.cache import TTLCache
+from backend.utils.logging_config import get_logger
+from backend.services.admission import async_limiters, queue_wait_report
+from backend.services.aio.catalog_service import async_catalog_service
+from backend.services.aio.genie_agent_service import async_genie_agent_service
+from backend.services.aio.message_processor import AsyncMessageProcessor
+from backend.services.metrics import DELEGATIONS, timed_stage
+from backend.services.message_processor import (
+    etag_matches,
+    in_thread_page,
+    thread_page,
+    thread_page_etag,
+    thread_page_query,
+    thread_page_response,
+)
+from backend.services.aio.run_waiter import create_async_run_waiter
+from backend.services.connected_agent_service import (
+    QueryEventHandler,
+    ThreadUnavailableError,
+    announce_genie_job,
+    connected_agent_service,
+    describe_tool_call,
+    parse_run_steps,
+    relay_run_events,
+    run_outcome,
+    run_messages_query,
+    shared_turn_result,
+    streamed_response_message,
+    streamed_run_steps,
+    summarize_catalog,
+    tool_error_output,
+    tool_outcome,
+    thread_lookup,
+    tool_timeout,
+)
+from backend.services.request_context import current_turn
+from backend.services.thread_turns import AsyncThreadTurnSerializer
+from backend.services.run_waiter import RunWaitResult
+from backend.services.token_provider import token_provider
+from backend.services.tracing import request_trace, trace_metadata
+
+class AsyncConnectedAgentService:
+    """Async request path for the connected agents.
+
+    Agent provisioning is a one-off, so it is delegated to the synchronous service on a
+    worker thread; every per-request call goes through the async ``AIProjectClient``.
+    """
+
+    def __init__(self, provisioner=None):
+        self.logger = get_logger(__name__)
+        self.provisioner = provisioner or connected_agent_service
+        self.project_client = None
+        self.message_processor = None
+        self.run_waiter = None
+        self.thread_turns = AsyncThreadTurnSerializer()
+        self.known_threads = TTLCache(
+            settings.KNOWN_THREAD_CACHE_MAX_ENTRIES, settings.KNOWN_THREAD_CACHE_TTL_SECONDS, name="known_threads"
+        )
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+
+    @property
+    def main_agent(self):
+        return self.provisioner.main_agent
+
+    @property
+    def connected_agents(self) -> Dict[str, Any]:
+        return self.provisioner.connected_agents
+
+    async def initialize(self) -> bool:
+        if self._initialized:
+            return True
+
+        async with self._init_lock:
+            if self._initialized:
+                return True
+
+            await asyncio.to_thread(self.provisioner.ensure_ready)
+
+            self.project_client = AIProjectClient(
+                endpoint=settings.AZURE_AI_AGENT_ENDPOINT,
+                credential=token_provider.as_async()
+            )
+            self.message_processor = AsyncMessageProcessor(self.project_client)
+            self.run_waiter = create_async_run_waiter(self.project_client.agents.runs)
+            self._initialized = True
+        return True
+
+    async def _get_or_create_thread(self, thread_id: str = None) -> Tuple[Any, Dict[str, Any]]:
+        with timed_stage("thread_lookup") as stage:
+            thread = self.known_threads.get(thread_id) if thread_id else None
+            stage.outcome = "cache" if thread is not None else "created"
+            if thread is None and thread_id:
+                try:
+                    thread = await self.project_client.agents.threads.get(thread_id)
+                    stage.outcome = "verified"
+                except ResourceNotFoundError:
+                    self.logger.info(f"Thread {thread_id} no longer exists, starting a new one")
+                    stage.outcome = "recreated"
+                except Exception as e:
+                    raise ThreadUnavailableError(f"Could not verify thread {thread_id}: {e}") from e
+            if thread is None:
+                thread = await self.project_client.agents.threads.create()
+            self.known_threads.set(thread.id, thread)
+        return thread, thread_lookup(stage)
+
+    async def _finish_run(self, thread_id: str, result: RunWaitResult) -> RunWaitResult:
+        if result.timed_out:
+            self.logger.warning(
+                f"Run {result.run.id} still {result.run.status} after {result.elapsed_seconds:.1f}s, cancelling"
+            )
+            try:
+                await self.project_client.agents.runs.cancel(thread_id=thread_id, run_id=result.run.id)
+            except Exception as e:
+                self.logger.error(f"Failed to cancel run {result.run.id}: {e}")
+        return result
+
+    async def _catalog_results(self, query: str) -> Dict[str, Any]:
+        turn = current_turn()
+        if turn and turn.combined:
+            snapshot = turn.catalog_snapshot()
+            if snapshot:
+                return snapshot
+
+        results = await async_catalog_service.search_catalog(query)
+        if turn:
+            turn.record_catalog(query, results)
+        return results
+
+    async def _execute_tool_call(self, tool_call, on_event: Optional[QueryEventHandler] = None) -> tuple:
+        name, query = describe_tool_call(tool_call)
+        with timed_stage(f"tool.{name}", "router") as stage:
+            output, label = await self._call_tool(name, query, on_event)
+            stage.outcome = tool_outcome(output)
+        return output, label
+
+    async def _call_tool(self, name: str, query: str, on_event: Optional[QueryEventHandler] = None) -> tuple:
+        if name == "search_catalog":
+            if on_event:
+                on_event("tool_called", {"name": name, "query": query})
+            catalog_data = await self._catalog_results(query)
+            if on_event:
+                on_event("catalog_searched", {"query": query, "assets_found": catalog_data.get("assets_found", 0)})
+            return json.dumps(catalog_data), f"search_catalog('{query}')"
+        if name == "handoff_genie_agent":
+            if on_event:
+                on_event("tool_called", {"name": name, "query": query})
+            output = await async_genie_agent_service.handoff_genie_agent(query)
+            announce_genie_job(output, on_event)
+            return output, f"handoff_genie_agent('{query}')"
+        return tool_error_output(f"Unknown function: {name}"), None
+
+    async def _execute_tool_call_with_timeout(self, tool_call, on_event: Optional[QueryEventHandler] = None) -> tuple:
+        name, query = describe_tool_call(tool_call)
+        timeout = tool_timeout(name)
+        try:
+            return await asyncio.wait_for(self._execute_tool_call(tool_call, on_event), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Tool call {name}('{query}') timed out after {timeout:.0f}s")
+            return tool_error_output(f"{name} timed out after {timeout:.0f}s"), f"{name}('{query}')"
+        except Exception as e:
+            self.logger.error(f"Tool call {name}('{query}') failed: {e}")
+            return tool_error_output(f"{name} failed: {e}"), f"{name}('{query}')"
+
+    async def _handle_required_action(self, run, tools_called: List[str],
+                                      on_event: Optional[QueryEventHandler] = None) -> List[Dict[str, Any]]:
+        tool_calls = getattr(getattr(getattr(run, 'required_action', None), 'submit_tool_outputs', None), 'tool_calls', [])
+        tool_calls = [tool_call for tool_call in tool_calls if hasattr(tool_call, 'function')]
+
+        results = await asyncio.gather(*(self._execute_tool_call_with_timeout(tool_call, on_event)
+                                         for tool_call in tool_calls))
+
+        tool_outputs = []
+        for tool_call, (output, label) in zip(tool_calls, results):
+            if label:
+                tools_called.append(label)
+            tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
+        return tool_outputs
+
+    async def _extract_response(self, thread_id: str, run_result: RunWaitResult, agent: str = "router") -> tuple:
+        with timed_stage("response_extraction", agent) as stage:
+            message = streamed_response_message(run_result)
+            stage.outcome = "stream"
+            if message is None:
+                listed = self.project_client.agents.messages.list(thread_id=thread_id, **run_messages_query(run_result.run.id))
+                async for candidate in listed:
+                    if candidate.role == "assistant":
+                        message = candidate
+                        break
+                stage.outcome = "listed"
+            if message is None:
+                stage.outcome = "missing"
+                return "No response generated", []
+            message_data = await self.message_processor.extract_message_with_annotations(message)
+        return message_data["content"], message_data["annotations"]
+
+    async def _extract_run_details(self, thread_id: str, run_result: RunWaitResult) -> tuple:
+        with timed_stage("run_details", "router") as stage:
+            run_steps = streamed_run_steps(run_result)
+            stage.outcome = "stream"
+            if run_steps is None:
+                run_steps = [step async for step in self.project_client.agents.run_steps.list(
+                    thread_id=thread_id, run_id=run_result.run.id
+                )]
+                stage.outcome = "listed"
+            connected_agents_called, tools_called = parse_run_steps(run_steps)
+        for agent_name in connected_agents_called:
+            DELEGATIONS.inc(agent=agent_name)
+        return connected_agents_called, tools_called
+
+    async def process_query_direct(self, query: str, agent_name: str, thread_id: str = None) -> Dict[str, Any]:
+        await self.initialize()
+
+        if agent_name not in self.connected_agents:
+            return {
+                "success": False,
+                "error": f"Unknown agent: {agent_name}",
+                "response": f"Agent '{agent_name}' is not available"
+            }
+
+        with request_trace(), timed_stage("process_query_direct", agent_name):
+            thread, lookup = await self._get_or_create_thread(thread_id)
+            return await self.thread_turns.run(
+                thread.id, lambda: self._direct_turn(query, agent_name, thread, lookup),
+                coalesce_key=(agent_name, query), share=shared_turn_result(lookup)
+            )
+
+    async def _direct_turn(self, query: str, agent_name: str, thread, lookup: Dict[str, Any]) -> Dict[str, Any]:
+        async with async_limiters["agent_runs"].acquire() as run_queue_wait:
+            with timed_stage("message_create", agent_name):
+                await self.project_client.agents.messages.create(thread_id=thread.id, role="user", content=query)
+            with timed_stage("run_wait", agent_name) as stage:
+                run_result = await self._finish_run(
+                    thread.id, await self.run_waiter.execute(thread.id, self.connected_agents[agent_name].id)
+                )
+                stage.outcome = run_outcome(run_result)
+        run = run_result.run
+        response_text, annotations = await self._extract_response(thread.id, run_result, agent_name)
+
+        return {
+            "success": True,
+            "response": response_text,
+            "annotations": annotations,
+            "metadata": {
+                "query": query,
+                "agent_used": agent_name,
+                "direct_call": True,
+                "run_status": run.status,
+                "thread_id": thread.id,
+                "run_id": run.id,
+                "run_wait": run_result.to_dict(),
+                "thread_lookup": lookup,
+                "queue_wait": queue_wait_report("agent_runs", run_queue_wait),
+                **trace_metadata()
+            }
+        }
+
+    async def process_query(self, query: str, thread_id: str = None,
+                            on_event: Optional[QueryEventHandler] = None) -> Dict[str, Any]:
+        await self.initialize()
+
+        with request_trace(), timed_stage("process_query", "router"):
+            thread, lookup = await self._get_or_create_thread(thread_id)
+            turn = current_turn()
+            if turn:
+                # Tool calls in this turn (e.g. Genie conversation reuse) key off the agent thread
+                turn.thread_id = thread.id
+            if on_event:
+                on_event("thread", {"thread_id": thread.id})
+            return await self.thread_turns.run(
+                thread.id, lambda: self._route_turn(query, thread, lookup, on_event),
+                coalesce_key=None if on_event else ("router", query), share=shared_turn_result(lookup)
+            )
+
+    async def _route_turn(self, query: str, thread, lookup: Dict[str, Any],
+                          on_event: Optional[QueryEventHandler] = None) -> Dict[str, Any]:
+        tools_called = []
+        async with async_limiters["agent_runs"].acquire() as run_queue_wait:
+            with timed_stage("message_create", "router"):
+                await self.project_client.agents.messages.create(thread_id=thread.id, role="user", content=query)
+            with timed_stage("run_wait", "router") as stage:
+                run_result = await self._finish_run(thread.id, await self.run_waiter.execute(
+                    thread.id, self.main_agent.id,
+                    on_requires_action=lambda run: self._handle_required_action(run, tools_called, on_event),
+                    on_event=relay_run_events(on_event) if on_event else None
+                ))
+                stage.outcome = run_outcome(run_result)
+        run = run_result.run
+
+        (response_text, annotations), (connected_agents_called, additional_tools) = await asyncio.gather(
+            self._extract_response(thread.id, run_result),
+            self._extract_run_details(thread.id, run_result)
+        )
+        tools_called.extend(additional_tools)
+
+        if on_event and not run_result.events:
+            for agent_name in connected_agents_called:
+                on_event("agent_delegated", {"agent": agent_name})
+
+        result = {
+            "success": True,
+            "response": response_text,
+            "annotations": annotations,
+            "metadata": {
+                "query": query,
+                "run_status": run.status,
+                "tools_called": tools_called,
+                "connected_agents_called": connected_agents_called,
+                "thread_id": thread.id,
+                "run_id": run.id,
+                "run_wait": run_result.to_dict(),
+                "thread_lookup": lookup,
+                "queue_wait": queue_wait_report("agent_runs", run_queue_wait),
+                **trace_metadata()
+            }
+        }
+        if on_event:
+            on_event("done", result)
+        return result
+
+    async def stream_query(self, query: str, thread_id: str = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        events = asyncio.Queue()
+        state = {"streamed_text": False}
+
+        def on_event(event: str, data: Dict[str, Any]) -> None:
+            if event == "delta":
+                state["streamed_text"] = True
+            elif event == "done" and not state["streamed_text"] and data.get("response"):
+                events.put_nowait(("delta", {"text": data["response"]}))
+            events.put_nowait((event, data))
+
+        async def worker() -> None:
+            try:
+                await self.process_query(query, thread_id, on_event=on_event)
+            except Exception as e:
+                self.logger.error(f"Streaming query failed: {e}")
+                events.put_nowait(("error", {"success": False, "error": str(e)}))
+            finally:
+                events.put_nowait(None)
+
+        task = asyncio.create_task(worker())
+        try:
+            while True:
+                item = await events.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def analyze_purview(self, query: str) -> Dict[str, Any]:
+        with request_trace(), timed_stage("analyze_purview", "purview") as stage:
+            turn = current_turn()
+            captured = turn.catalog_snapshot() if turn else None
+            stage.outcome = "turn" if captured else "search"
+            catalog_data = captured or await self._catalog_results(query)
+            metadata = trace_metadata()
+        return {**summarize_catalog(catalog_data), "catalog_source": stage.outcome, "metadata": metadata}
+
+    async def get_thread_messages(self, thread_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                                  after: Optional[str] = None, since: Optional[int] = None,
+                                  if_none_match: Optional[str] = None) -> Dict[str, Any]:
+        page_query = thread_page_query(limit, before, after, since)
+        await self.initialize()
+
+        pager = self.project_client.agents.messages.list(thread_id=thread_id, **page_query["list"])
+        whole_thread = page_query["limit"] is None
+        # A whole thread reads only its newest message before the ETag check
+        fetch = 1 if whole_thread else page_query["fetch"]
+        listed = []
+        async for message in pager:
+            if not in_thread_page(message, page_query):
+                break
+            listed.append(message)
+            if fetch is not None and len(listed) >= fetch:
+                break
+        messages, has_more = thread_page(listed, page_query)
+        etag = thread_page_etag(thread_id, messages, has_more)
+        if etag_matches(if_none_match, etag):
+            return {"success": True, "not_modified": True, "thread_id": thread_id, "etag": etag}
+        if whole_thread:
+            messages.extend([message async for message in pager])
+
+        formatted_messages = await self.message_processor.format_thread_messages(messages, thread_id)
+        return thread_page_response(thread_id, formatted_messages, has_more, etag)
+
+    def get_health_status(self) -> Dict[str, Any]:
+        return {
+            **self.provisioner.get_health_status(),
+            "service": "Async Connected Agent Service",
+            "known_threads": self.known_threads.stats(),
+            "thread_turns": self.thread_turns.get_stats(),
+            "admission": {name: limiter.get_stats() for name, limiter in async_limiters.items()},
+            "async_client_ready": self.project_client is not None
+        }
+
+    async def cleanup(self):
+        await asyncio.to_thread(self.provisioner.cleanup)
+        await async_catalog_service.aclose()
+        await async_genie_agent_service.aclose()
+        if self.project_client is not None:
+            await self.project_client.close()
+
+async_connected_agent_service = AsyncConnectedAgentService()
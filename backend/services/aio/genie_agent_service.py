@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+import httpx
+from backend.config.settings import settings
+from backend.services.admission import async_limiters
+from backend.services.genie_agent_service import (
+    CONVERSATION_GONE_STATUSES,
+    GenieAgentService,
+    GenieJob,
+    GeniePollSchedule,
+    TERMINAL_STATUSES,
+    turn_thread_id,
+)
+from backend.services.genie_results import build_result_page, manifest_chunks, plan_chunks, statement_parts
+from backend.services.http_transport import http_transport
+from backend.services.metrics import timed_stage
+
+class AsyncGenieAgentService(GenieAgentService):
+
+    def __init__(self, http_client: httpx.AsyncClient = None):
+        super().__init__()
+        self.http_client = http_client
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self.http_client is None:
+            self.http_client = http_transport.async_client("genie")
+        return self.http_client
+    
+    async def _start_conversation(self, query: str, headers: Dict[str, str]) -> Tuple[str, str]:
+        start_response = await self._get_http_client().post(
+            f"{self.space_url()}/start-conversation", headers=headers, json={"content": query}
+        )
+        start_response.raise_for_status()
+        start_data = start_response.json()
+        return start_data['conversation']['id'], start_data['message']['id']
+    
+    async def _seed_conversation(self, key: Tuple[str, str], headers: Dict[str, str], deadline: float) -> Optional[str]:
+        seed = self.seed_questions.get(key)
+        if seed is None:
+            return None
+        self.seed_questions.delete(key)
+        conversation_id, message_id = await self._start_conversation(seed, headers)
+        await self._poll_message(self.message_url(conversation_id, message_id), headers, deadline - time.monotonic())
+        self.conversations.set(key, conversation_id)
+        return conversation_id
+    
+    async def _start_message(self, query: str, headers: Dict[str, str], thread_id: Optional[str],
+                             deadline: Optional[float] = None) -> Tuple[str, str, bool]:
+        key = self.conversation_key(thread_id)
+        conversation_id = self.conversations.get(key) if thread_id else None
+        if conversation_id is None and thread_id:
+            deadline = deadline if deadline is not None else time.monotonic() + settings.GENIE_POLL_TIMEOUT_SECONDS
+            conversation_id = await self._seed_conversation(key, headers, deadline)
+        if conversation_id:
+            response = await self._get_http_client().post(
+                self.followup_url(conversation_id), headers=headers, json={"content": query}
+            )
+            if response.status_code in CONVERSATION_GONE_STATUSES:
+                self.logger.info(f"Genie conversation {conversation_id} is gone, starting a new one")
+                self.conversations.delete(key)
+            else:
+                response.raise_for_status()
+                data = response.json()
+                self.conversations.set(key, conversation_id)
+                return conversation_id, data.get('message_id') or data['id'], True
+    
+        conversation_id, message_id = await self._start_conversation(query, headers)
+        if thread_id:
+            self.conversations.set(key, conversation_id)
+        return conversation_id, message_id, False
+    
+    async def _poll_message(self, status_url: str, headers: Dict[str, str], timeout: float,
+                            stop_when: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Tuple[Dict[str, Any], bool]:
+        client = self._get_http_client()
+        deadline = time.monotonic() + timeout
+        schedule = GeniePollSchedule(settings.GENIE_POLL_INITIAL_INTERVAL, settings.GENIE_POLL_MAX_INTERVAL)
+        status_data: Dict[str, Any] = {}
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return status_data, True
+            await asyncio.sleep(min(schedule.next(status_data.get('status')), remaining))
+            status_response = await client.get(status_url, headers=headers)
+            status_response.raise_for_status()
+            status_data = status_response.json()
+            if status_data.get('status') in TERMINAL_STATUSES or (stop_when and stop_when(status_data)):
+                return status_data, False
+    
+    async def _complete(self, status_data: Dict[str, Any], conversation_id: str, message_id: str,
+                        headers: Dict[str, str]) -> Dict[str, Any]:
+        if status_data.get('status') != 'COMPLETED':
+            return self.error_response(f"Genie query failed with status: {status_data.get('status')}")
+    
+        parsed = self.parse_attachments(status_data)
+    
+        if parsed["attachment_id"] and parsed["generated_query"]:
+            state = {"conversation_id": conversation_id, "message_id": message_id, "attachment_id": parsed["attachment_id"]}
+            results_response = await self._get_http_client().get(self.query_result_url(state), headers=headers)
+    
+            if results_response.status_code == 200:
+                query_results = results_response.json()
+                self._cache_result(query_results)
+                text, parsed["result_page"] = self.render_query_results(query_results, parsed["row_count"], state)
+                parsed["text_response"] += text
+    
+        return self.build_response(parsed, conversation_id, message_id)
+    
+    async def _fetch_query_result(self, state: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        response = await self._get_http_client().get(self.query_result_url(state), headers=headers)
+        response.raise_for_status()
+        query_results = response.json()
+        self._cache_result(query_results)
+        return query_results
+    
+    async def _result_part(self, state: Dict[str, Any], key, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        statement_id = state.get('statement_id')
+        cached = self.result_chunks.get((statement_id, key)) if statement_id else None
+        if cached is not None:
+            return cached
+        if key in ("manifest", 0) or not statement_id:
+            statement_id, manifest, result_data = statement_parts(await self._fetch_query_result(state, headers))
+            return manifest if key == "manifest" else result_data
+        response = await self._get_http_client().get(self.chunk_url(statement_id, key), headers=headers)
+        response.raise_for_status()
+        chunk = response.json()
+        self.result_chunks.set((statement_id, key), chunk)
+        return chunk
+    
+    async def fetch_result_page(self, cursor: str, limit: Optional[int] = None, fmt: Optional[str] = None) -> Dict[str, Any]:
+        if not self.is_configured():
+            return self.error_response("Missing Genie configuration")
+        state, limit, fmt = self.page_request(cursor, limit, fmt)
+        headers = self.headers()
+    
+        manifest = await self._result_part(state, "manifest", headers) or {}
+        first_chunk = await self._result_part(state, 0, headers)
+        plan = plan_chunks(manifest_chunks(manifest, first_chunk), state['offset'], limit)
+        # Later chunks are independent downloads, so fetch them together
+        later = [chunk_index for chunk_index, _, _ in plan if chunk_index != 0]
+        fetched = await asyncio.gather(*[self._result_part(state, chunk_index, headers) for chunk_index in later])
+        by_index = {0: first_chunk, **dict(zip(later, fetched))}
+        rows = []
+        for chunk_index, start, stop in plan:
+            rows.extend((by_index.get(chunk_index) or {}).get('data_array', [])[start:stop])
+    
+        return build_result_page(state, manifest, first_chunk, rows, fmt)
+    
+    async def handoff_genie_agent(self, query: str) -> str:
+        if not self.is_configured():
+            return json.dumps(self.error_response("Missing Genie configuration"))
+    
+        thread_id = turn_thread_id()
+        standalone = self.is_standalone(thread_id)
+        cached = self.serve_cached(query, thread_id) if standalone else None
+        if cached:
+            return json.dumps(cached)
+    
+        with timed_stage("genie_ask", "genie"):
+            async with async_limiters["genie"].acquire():
+                return await self._ask(query, thread_id, standalone)
+    
+    async def _ask(self, query: str, thread_id: Optional[str], standalone: bool) -> str:
+        headers = self.headers()
+        # One poll budget for the whole question, so the tool call returns a job handle in time
+        poll_deadline = time.monotonic() + settings.GENIE_POLL_TIMEOUT_SECONDS
+        conversation_id, message_id, reused = await self._start_message(query, headers, thread_id, poll_deadline)
+        status_url = self.message_url(conversation_id, message_id)
+    
+        status_data, timed_out = await self._poll_message(
+            status_url, headers, poll_deadline - time.monotonic(), stop_when=self.sql_answer_ready
+        )
+        if not timed_out and status_data.get('status') not in TERMINAL_STATUSES:
+            cached = self.answer_for_sql(query, status_data, standalone, conversation_id, message_id)
+            if cached:
+                return json.dumps({**cached, "conversation_reused": reused})
+            status_data, timed_out = await self._poll_message(status_url, headers, poll_deadline - time.monotonic())
+    
+        if timed_out:
+            job = self._track_job(query, conversation_id, message_id)
+            self.logger.info(f"Genie message {message_id} exceeded the poll budget, continuing as job {job.job_id}")
+            return json.dumps(job.pending_response())
+    
+        response = await self._complete(status_data, conversation_id, message_id, headers)
+        return json.dumps({**self.remember_answer(query, response, standalone), "conversation_reused": reused})
+    
+    async def start_job(self, query: str, thread_id: Optional[str] = None) -> GenieJob:
+        if not self.is_configured():
+            raise ValueError("Missing Genie configuration")
+        async with async_limiters["genie"].acquire():
+            conversation_id, message_id, _ = await self._start_message(query, self.headers(), thread_id or turn_thread_id())
+        return self._track_job(query, conversation_id, message_id)
+    
+    def _track_job(self, query: str, conversation_id: str, message_id: str) -> GenieJob:
+        job = GenieJob(query, conversation_id, message_id)
+        self.jobs.set(job.job_id, job)
+        job.task = asyncio.create_task(self._run_job(job))
+        return job
+    
+    async def _run_job(self, job: GenieJob) -> None:
+        headers = self.headers()
+        try:
+            status_url = self.message_url(job.conversation_id, job.message_id)
+            status_data, timed_out = await self._poll_message(status_url, headers, settings.GENIE_JOB_TIMEOUT_SECONDS)
+            if timed_out:
+                job.finish(self.error_response(
+                    f"Genie query still {status_data.get('status')} after {settings.GENIE_JOB_TIMEOUT_SECONDS:.0f}s"
+                ))
+            else:
+                response = await self._complete(status_data, job.conversation_id, job.message_id, headers)
+                job.finish(self.remember_answer(job.query, response, standalone=False))
+        except Exception as e:
+            self.logger.error(f"Genie job {job.job_id} failed: {e}")
+            job.finish(self.error_response(str(e)))
+    
+    async def wait_for_job(self, job_id: str, timeout: float) -> Optional[GenieJob]:
+        job = self.get_job(job_id)
+        if job is not None and job.task is not None and not job.done.is_set():
+            try:
+                await asyncio.wait_for(asyncio.shield(job.task), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+    
+    async def aclose(self) -> None:
+        for job in self.jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+async_genie_agent_service = AsyncGenieAgentService()
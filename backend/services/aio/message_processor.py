@@ -0,0 +1,41 @@
+import asyncio
+from typing import Dict, Iterable, List, Any, Optional
+from backend.services.message_processor import MessageProcessor, citation_file_ids
+from backend.services.metrics import timed_stage
+
+class AsyncMessageProcessor(MessageProcessor):
+    """Resolves citation file names with the async agents client, one lookup per distinct file."""
+    
+    async def _afile_name(self, file_id: str) -> str:
+        async def load():
+            with timed_stage("file_lookup"):
+                return (await self.project_client.agents.files.get(file_id)).filename
+        try:
+            return await self.file_names.aget_or_load(file_id, load)
+        except Exception as e:
+            self.logger.warning(f"Could not resolve file {file_id}: {e}")
+            return file_id
+    
+    async def resolve_file_names(self, file_ids: Iterable[str]) -> Dict[str, str]:
+        file_ids = list(dict.fromkeys(file_ids))
+        names = await asyncio.gather(*(self._afile_name(file_id) for file_id in file_ids))
+        return dict(zip(file_ids, names))
+    
+    async def extract_message_with_annotations(self, message, file_names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        file_citations = getattr(message, 'file_citation_annotations', None) or []
+        url_citations = getattr(message, 'url_citation_annotations', None) or []
+        
+        if file_names is None:
+            file_names = await self.resolve_file_names(citation_file_ids([message]))
+        
+        annotations = [self._file_citation(annotation, file_names[annotation.file_citation.file_id])
+                       for annotation in file_citations]
+        annotations.extend(self._process_url_citations(url_citations))
+        return {"content": self._message_text(message), "annotations": annotations}
+    
+    async def format_thread_messages(self, messages: List, thread_id: str) -> List[Dict[str, Any]]:
+        file_names = await self.resolve_file_names(citation_file_ids(messages))
+        ordered = list(reversed(messages))
+        extracted = [await self.extract_message_with_annotations(message, file_names) for message in ordered]
+        return [self._format_message(message, message_data, thread_id)
+                for message, message_data in zip(ordered, extracted)]
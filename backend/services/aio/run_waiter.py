@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from backend.services.run_waiter import (
+    ACTIVE_STATUSES,
+    PollingRunWaiter,
+    RunWaitResult,
+    StreamingRunWaiter,
+    _tool_call_ids,
+    capture_run_output,
+    is_run_event,
+)
+from backend.config.settings import settings
+from backend.utils.backoff import Backoff
+
+AsyncRequiredActionHandler = Callable[[Any], Awaitable[List[Dict[str, Any]]]]
+EventHandler = Callable[[str, Any], None]
+
+
+class AsyncPollingRunWaiter(PollingRunWaiter):
+    """Awaitable counterpart of ``PollingRunWaiter`` for the async ``runs`` operations."""
+
+    async def execute(self, thread_id: str, agent_id: str,
+                      on_requires_action: Optional[AsyncRequiredActionHandler] = None,
+                      on_event: Optional[EventHandler] = None) -> RunWaitResult:
+        started = time.monotonic()
+        run = await self.runs.create(thread_id=thread_id, agent_id=agent_id)
+        return await self.wait(thread_id, run, on_requires_action, on_event, started=started)
+
+    async def wait(self, thread_id: str, run, on_requires_action: Optional[AsyncRequiredActionHandler] = None,
+                   on_event: Optional[EventHandler] = None, started: float = None,
+                   result: RunWaitResult = None, handled_action: Optional[tuple] = None) -> RunWaitResult:
+        started = started if started is not None else time.monotonic()
+        deadline = started + self.timeout
+        result = result or RunWaitResult(run=run, strategy=self.name)
+        backoff = Backoff(self.initial_interval, self.max_interval)
+        last_status = None
+
+        while run.status in ACTIVE_STATUSES:
+            if run.status != last_status:
+                last_status = run.status
+                if on_event:
+                    on_event(f"thread.run.{run.status}", run)
+
+            if run.status == "requires_action" and on_requires_action:
+                action_key = _tool_call_ids(run)
+                if action_key != handled_action:
+                    handled_action = action_key
+                    tool_outputs = await on_requires_action(run)
+                    if tool_outputs:
+                        await self.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs)
+                    backoff.reset()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result.timed_out = True
+                break
+
+            delay = min(backoff.next(), remaining)
+            await asyncio.sleep(delay)
+            result.wait_seconds += delay
+            run = await self.runs.get(thread_id=thread_id, run_id=run.id)
+            result.polls += 1
+
+        if on_event and not result.timed_out:
+            on_event(f"thread.run.{run.status}", run)
+
+        result.run = run
+        result.elapsed_seconds = time.monotonic() - started
+        return result
+
+
+class AsyncStreamingRunWaiter(StreamingRunWaiter):
+    """Awaitable counterpart of ``StreamingRunWaiter`` built on ``AsyncAgentRunStream``."""
+
+    def __init__(self, runs_client, fallback: AsyncPollingRunWaiter = None, timeout: float = None,
+                 idle_timeout: float = None):
+        super().__init__(runs_client, fallback or AsyncPollingRunWaiter(runs_client, timeout=timeout), timeout,
+                         idle_timeout)
+
+    async def execute(self, thread_id: str, agent_id: str,
+                      on_requires_action: Optional[AsyncRequiredActionHandler] = None,
+                      on_event: Optional[EventHandler] = None) -> RunWaitResult:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        result = RunWaitResult(run=None, strategy=self.name)
+        handled_action = None
+        mark = started
+
+        stalled = False
+        async with await self.runs.stream(thread_id=thread_id, agent_id=agent_id) as stream:
+            events = stream.__aiter__()
+            while True:
+                # A stream that goes quiet is abandoned for polling, or for the timeout at the deadline
+                wait = min(self.idle_timeout, deadline - time.monotonic())
+                try:
+                    event_type, event_data, _ = await asyncio.wait_for(events.__anext__(), timeout=max(0.0, wait))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    stalled = True
+                    break
+                result.wait_seconds += time.monotonic() - mark
+                result.events += 1
+                if on_event:
+                    on_event(str(event_type), event_data)
+                capture_run_output(result, str(event_type), event_data)
+
+                if is_run_event(str(event_type)) and hasattr(event_data, 'status'):
+                    result.run = event_data
+
+                if event_type == "thread.run.requires_action" and on_requires_action:
+                    action_key = _tool_call_ids(event_data)
+                    if action_key != handled_action:
+                        handled_action = action_key
+                        tool_outputs = await on_requires_action(event_data)
+                        await self.runs.submit_tool_outputs_stream(
+                            thread_id=thread_id, run_id=event_data.id,
+                            tool_outputs=tool_outputs, event_handler=stream
+                        )
+
+                mark = time.monotonic()
+                if mark >= deadline:
+                    result.timed_out = True
+                    break
+
+        if stalled:
+            result.wait_seconds += time.monotonic() - mark
+            if time.monotonic() >= deadline:
+                result.timed_out = True
+            else:
+                self.logger.warning(f"Run stream on thread {thread_id} sent nothing for {self.idle_timeout:.0f}s")
+
+        if result.run is None:
+            raise RuntimeError(f"Run stream on thread {thread_id} ended without any run events")
+
+        if result.run.status in ACTIVE_STATUSES and not result.timed_out:
+            self.logger.warning(f"Run stream for {result.run.id} ended while {result.run.status}, polling for completion")
+            result.strategy = f"{self.name}+{self.fallback.name}"
+            # Tool calls already answered on the stream must not be run and submitted again
+            return await self.fallback.wait(thread_id, result.run, on_requires_action, on_event,
+                                            started=started, result=result, handled_action=handled_action)
+
+        result.elapsed_seconds = time.monotonic() - started
+        return result
+
+
+def create_async_run_waiter(runs_client, strategy: str = None):
+    strategy = strategy or settings.RUN_WAIT_STRATEGY
+    if strategy in ("auto", "stream") and hasattr(runs_client, "stream"):
+        return AsyncStreamingRunWaiter(runs_client)
+    return AsyncPollingRunWaiter(runs_client)
@@ -0,0 +1,128 @@
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from backend.config.settings import settings
+from backend.services.connected_agent_service import connected_agent_service
+from backend.services.genie_agent_service import direct_genie_response, genie_agent_service
+from backend.services.request_context import turn_context
+from backend.utils.logging_config import get_logger
+
+AGENT_MAPPING = {'fabric': 'fabric_agent', 'rag': 'rag_agent', 'web': 'web_agent'}
+BATCH_AGENTS = (*AGENT_MAPPING, 'genie')
+
+logger = get_logger(__name__)
+
+
+def parse_batch_request(data: Dict[str, Any]) -> tuple:
+    """Validate a batch body into (items, concurrency).
+
+    ``queries`` holds strings or ``{"query", "agent", "thread_id", "id"}`` objects; a top-level
+    ``agent`` applies to items without one. Items without an agent go through the routing agent.
+    """
+    if data is not None and not isinstance(data, dict):
+        raise ValueError("The batch body must be a JSON object")
+    queries = (data or {}).get('queries')
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("queries must be a non-empty list")
+    if len(queries) > settings.BATCH_MAX_ITEMS:
+        raise ValueError(f"A batch holds at most {settings.BATCH_MAX_ITEMS} queries")
+
+    default_agent = data.get('agent')
+    if default_agent is not None and not isinstance(default_agent, str):
+        raise ValueError("agent must be a string")
+    items = []
+    for index, entry in enumerate(queries):
+        entry = {'query': entry} if isinstance(entry, str) else entry
+        if not isinstance(entry, dict):
+            raise ValueError(f"Item {index} must be a string or an object")
+        for field in ('query', 'agent', 'thread_id'):
+            if entry.get(field) is not None and not isinstance(entry[field], str):
+                raise ValueError(f"Item {index} has a non-string {field}")
+        query = (entry.get('query') or '').strip()
+        if not query:
+            raise ValueError(f"Item {index} has no query")
+        agent = (entry.get('agent') or default_agent or '').strip() or None
+        if agent is not None and agent not in BATCH_AGENTS:
+            raise ValueError(f"Item {index} has unknown agent '{agent}'")
+        items.append({'index': index, 'id': entry.get('id'), 'query': query, 'agent': agent,
+                      'thread_id': entry.get('thread_id')})
+
+    try:
+        concurrency = int(data.get('concurrency') or settings.BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        raise ValueError("concurrency must be an integer")
+    return items, max(1, min(concurrency, settings.BATCH_MAX_CONCURRENCY))
+
+
+def item_result(item: Dict[str, Any], started: float, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> Dict[str, Any]:
+    if error is not None:
+        status = 'error'
+    else:
+        status = 'success' if result.get('success') else 'failed'
+    line = {
+        'type': 'result',
+        'index': item['index'],
+        'id': item['id'],
+        'query': item['query'],
+        'agent': item['agent'] or 'router',
+        'status': status,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    if error is not None:
+        line['error'] = error
+    else:
+        line['result'] = result
+    return line
+
+
+def batch_summary(results: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+    return {
+        'type': 'summary',
+        'items': len(results),
+        'succeeded': sum(1 for result in results if result['status'] == 'success'),
+        'failed': sum(1 for result in results if result['status'] != 'success'),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def ndjson(line: Dict[str, Any]) -> str:
+    return json.dumps(line, default=str) + '\n'
+
+
+def process_batch_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    query, agent, thread_id = item['query'], item['agent'], item['thread_id']
+    try:
+        with turn_context(query, thread_id):
+            if agent is None:
+                result = connected_agent_service.process_query(query, thread_id)
+            elif agent == 'genie':
+                result = direct_genie_response(query, thread_id, json.loads(genie_agent_service.handoff_genie_agent(query)))
+            else:
+                result = connected_agent_service.process_query_direct(query, AGENT_MAPPING[agent], thread_id)
+    except Exception as e:
+        logger.error(f"Batch item {item['index']} failed: {e}")
+        return item_result(item, started, error=str(e))
+    return item_result(item, started, result)
+
+
+def run_batch(items: List[Dict[str, Any]], concurrency: int,
+              process: Callable[[Dict[str, Any]], Dict[str, Any]] = process_batch_item) -> Iterator[Dict[str, Any]]:
+    """Process items at most ``concurrency`` at a time, yielding each result as it completes, then a summary."""
+    started = time.perf_counter()
+    results = []
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    try:
+        # Every item runs in its own copy of the caller's context and opens its own turn
+        futures = [executor.submit(contextvars.copy_context().run, process, item) for item in items]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            yield result
+    finally:
+        # A client that disconnects mid-batch should not keep the queued items running
+        executor.shutdown(wait=False, cancel_futures=True)
+    yield batch_summary(results, started)
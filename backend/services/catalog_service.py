@@ -1,10 +1,14 @@
+import copy
 import json
-import requests
 import re
-from typing import Dict, Any, Optional
-from azure.identity import AzureCliCredential
+from typing import Dict, Any, Optional, Tuple
+from backend.utils.cache import TTLCache
 from backend.utils.logging_config import get_logger
 from backend.config.settings import settings
+from backend.services.admission import limiters
+from backend.services.http_transport import http_transport
+from backend.services.metrics import timed_stage
+from backend.services.token_provider import PURVIEW_SCOPE, token_provider
 
 class CatalogService:
     def __init__(self):
@@ -12,17 +16,21 @@ class CatalogService:
         self.contacts = {
             "c53c736b-8469-409c-9dcc-b3a61953d4dd": "Aymen Furter (aymen.furter@microsoft.com)"
         }
+        self.cache = TTLCache(
+            max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS,
+            name="catalog_search"
+        )
+        self.session = http_transport.session("purview")
     
     def parse_agent_from_description(self, description: str) -> Optional[str]:
         match = re.search(r'agent:\s*(\w+)', description, re.IGNORECASE) if description else None
         return match.group(1) if match else None
     
-    def search_catalog(self, query: str) -> Dict[str, Any]:
-        token = AzureCliCredential().get_token("https://purview.azure.net/.default")
-        
-        search_response = requests.post(
-            f"{settings.PURVIEW_ENDPOINT}/datamap/api/search/query?api-version=2023-09-01",
-            json={
+    def build_search_request(self, query: str) -> Dict[str, Any]:
+        return {
+            "url": f"{settings.PURVIEW_ENDPOINT}/datamap/api/search/query?api-version=2023-09-01",
+            "json": {
                 "limit": 10, 
                 "keywords": query, 
                 "filter": {
@@ -32,14 +40,12 @@ class CatalogService:
                         {"entityType": "databricks_schema"}
                     ]
                 }
-            },
-            headers={"Authorization": f"Bearer {token.token}"}
-        )
-        
-        search_response.raise_for_status()
-
+            }
+        }
+    
+    def shape_results(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         results = []
-        for asset in search_response.json().get('value', []):
+        for asset in payload.get('value', []):
             description = asset.get('userDescription', 'No description')
             agent_name = self.parse_agent_from_description(description)
             contact_id = asset.get('contact', [{}])[0].get('id') if asset.get('contact') else None
@@ -57,5 +63,31 @@ class CatalogService:
             "assets_found": len(results), 
             "results": results
         }
+    
+    def cache_key(self, search_body: Dict[str, Any]) -> Tuple[str, str, int]:
+        keywords = " ".join(str(search_body.get("keywords") or "").lower().split())
+        return keywords, json.dumps(search_body.get("filter"), sort_keys=True), search_body.get("limit")
+    
+    def search_catalog(self, query: str) -> Dict[str, Any]:
+        search_request = self.build_search_request(query)
+        results = self.cache.get_or_load(
+            self.cache_key(search_request["json"]),
+            lambda: self._fetch_catalog(search_request)
+        )
+        return copy.deepcopy(results)
+    
+    def _fetch_catalog(self, search_request: Dict[str, Any]) -> Dict[str, Any]:
+        with timed_stage("catalog_fetch", "purview"):
+            token = token_provider.get_token(PURVIEW_SCOPE)
+            
+            with limiters["catalog_search"].acquire():
+                search_response = self.session.post(
+                    search_request["url"],
+                    json=search_request["json"],
+                    headers={"Authorization": f"Bearer {token.token}"}
+                )
+            
+            search_response.raise_for_status()
+            return self.shape_results(search_response.json())
 
 catalog_service = CatalogService()
@@ -1,14 +1,168 @@
+import contextvars
 import json
+import queue
+import threading
 import time
-from typing import Dict, Any
-from azure.identity import DefaultAzureCredential
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from itertools import islice, takewhile
+from typing import Dict, Any, List, Callable, Iterator, Optional, Tuple
+from azure.ai.agents.models import ListSortOrder
+from azure.core.exceptions import ResourceNotFoundError
 from azure.ai.projects import AIProjectClient
 from backend.config.settings import settings
+from backend.utils.cache import TTLCache
 from backend.utils.logging_config import get_logger
 from backend.services.catalog_service import catalog_service
 from backend.services.genie_agent_service import genie_agent_service
 from backend.services.agent_factory import AgentFactory
-from backend.services.message_processor import MessageProcessor
+from backend.services.admission import limiters, queue_wait_report
+from backend.services.agent_registry import AgentRegistry
+from backend.services.metrics import DELEGATIONS, Stage, timed_stage
+from backend.services.message_processor import (
+    MessageProcessor,
+    etag_matches,
+    in_thread_page,
+    thread_page,
+    thread_page_etag,
+    thread_page_query,
+    thread_page_response,
+)
+from backend.services.request_context import current_turn
+from backend.services.run_waiter import RunWaitResult, create_run_waiter, is_run_event
+from backend.services.http_transport import http_transport
+from backend.services.thread_turns import ThreadTurnSerializer
+from backend.services.token_provider import AI_PROJECT_SCOPE, PURVIEW_SCOPE, token_provider
+from backend.services.tracing import request_trace, trace_metadata
+
+QueryEventHandler = Callable[[str, Dict[str, Any]], None]
+
+# A run's own messages are listed newest first; only the first few can hold its answer
+RUN_MESSAGE_LIMIT = 5
+
+def run_messages_query(run_id: str) -> Dict[str, Any]:
+    return {"run_id": run_id, "limit": RUN_MESSAGE_LIMIT, "order": ListSortOrder.DESCENDING}
+
+def streamed_response_message(run_result: RunWaitResult):
+    """Newest assistant message captured from the run stream, if the stream saw the whole run."""
+    if not run_result.stream_complete:
+        return None
+    return next((message for message in reversed(run_result.messages) if message.role == "assistant"), None)
+
+def streamed_run_steps(run_result: RunWaitResult) -> Optional[List[Any]]:
+    if not run_result.stream_complete or not run_result.steps:
+        return None
+    return list(run_result.steps.values())
+
+def parse_run_steps(run_steps) -> tuple:
+    connected_agents_called = []
+    tools_called = []
+    
+    for step in run_steps:
+        if hasattr(step, 'step_details') and hasattr(step.step_details, 'tool_calls'):
+            for tool_call in step.step_details.tool_calls:
+                if hasattr(tool_call, 'type'):
+                    if tool_call.type == 'connected_agent' and hasattr(tool_call, 'connected_agent'):
+                        connected_agents_called.append(tool_call.connected_agent.get('name', 'unknown'))
+                    elif tool_call.type == 'function' and hasattr(tool_call, 'function'):
+                        func_name = tool_call.function.name
+                        if func_name != '_search_catalog':
+                            tools_called.append(f"{func_name}(...)")
+    
+    return connected_agents_called, tools_called
+
+def summarize_catalog(catalog_data: Dict[str, Any]) -> Dict[str, Any]:
+    if catalog_data.get("assets_found", 0) > 0:
+        assets = catalog_data.get("results", [])
+        agent_types = [asset["connected_agent"] for asset in assets if asset.get("connected_agent")]
+        
+        if agent_types:
+            purview_analysis = f"Found {len(assets)} relevant data assets. Primary agent: {agent_types[0]}"
+        else:
+            purview_analysis = f"Found {len(assets)} data assets but no connected agents available"
+    else:
+        purview_analysis = "No relevant data assets found in catalog. Query may require web search."
+    
+    return {
+        "success": True,
+        "purview": purview_analysis,
+        "catalog_results": catalog_data,
+        "confidence": 0.8 if catalog_data.get("assets_found", 0) > 0 else 0.3
+    }
+
+def describe_tool_call(tool_call) -> tuple:
+    func_name = tool_call.function.name
+    name = "search_catalog" if func_name in ["_search_catalog", "search_catalog"] else func_name
+    return name, json.loads(tool_call.function.arguments).get("query", "")
+
+def tool_timeout(name: str) -> float:
+    if name == "handoff_genie_agent":
+        return settings.GENIE_TOOL_TIMEOUT_SECONDS
+    return settings.SEARCH_CATALOG_TIMEOUT_SECONDS
+
+def tool_error_output(message: str) -> str:
+    return json.dumps({"status": "error", "message": message})
+
+def tool_outcome(output: str) -> str:
+    try:
+        return json.loads(output).get("status") or "success"
+    except (TypeError, ValueError, AttributeError):
+        return "success"
+
+def run_outcome(run_result: RunWaitResult) -> str:
+    if run_result.timed_out:
+        return "timed_out"
+    status = run_result.run.status
+    return str(getattr(status, "value", status))
+
+def announce_genie_job(output: str, on_event: Optional[QueryEventHandler]) -> None:
+    """Tell streaming clients where to collect a Genie answer that outlived the poll budget."""
+    if not on_event:
+        return
+    result = json.loads(output)
+    if result.get("status") == "pending" and result.get("job_id"):
+        on_event("genie_job", {"job_id": result["job_id"], "events_url": f"/api/genie/jobs/{result['job_id']}/events"})
+
+def relay_run_events(on_event: QueryEventHandler) -> Callable[[str, Any], None]:
+    """Translate raw run stream events into the routing events exposed to clients."""
+    delegated = set()
+    
+    def relay(event_type: str, data) -> None:
+        if event_type == "thread.message.delta":
+            text = getattr(data, 'text', None)
+            if text:
+                on_event("delta", {"text": text})
+        elif event_type.startswith("thread.run.step."):
+            for tool_call in getattr(getattr(data, 'step_details', None), 'tool_calls', None) or []:
+                if getattr(tool_call, 'type', None) != 'connected_agent' or tool_call.id in delegated:
+                    continue
+                delegated.add(tool_call.id)
+                on_event("agent_delegated", {"agent": tool_call.connected_agent.get('name', 'unknown')})
+        elif is_run_event(event_type) and hasattr(data, 'status'):
+            on_event("run_status", {"status": data.status})
+    return relay
+
+def thread_lookup(stage: Stage) -> Dict[str, Any]:
+    return {"source": stage.outcome, "seconds": round(stage.duration, 4)}
+
+def shared_turn_result(lookup: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Give a duplicate turn the leader's answer with its own trace, timings and thread lookup."""
+    def share(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {**result, "metadata": {
+            **result.get("metadata", {}),
+            "coalesced": True,
+            "thread_lookup": lookup,
+            "queue_wait": queue_wait_report("agent_runs", 0.0),
+            **trace_metadata()
+        }}
+    return share
+
+class ServiceNotReadyError(RuntimeError):
+    """Raised when a request gives up waiting for the background warm-up."""
+
+
+class ThreadUnavailableError(RuntimeError):
+    """Raised when an existing thread cannot be verified because of a transient error."""
+
 
 class ConnectedAgentService:
     def __init__(self):
@@ -18,134 +172,315 @@ class ConnectedAgentService:
         self.connected_agents = {}
         self.cleanup_resources = {}
         self.agent_factory = None
+        self.agent_registry = None
+        self.provisioning_timings: Dict[str, float] = {}
+        self.provisioning_seconds = None
         self.message_processor = None
+        self.run_waiter = None
+        # Shared by every request; the Genie and catalog limiters, not this pool, bound the backends
+        self.tool_executor = ThreadPoolExecutor(
+            max_workers=settings.TOOL_CALL_MAX_WORKERS, thread_name_prefix="tool-call"
+        )
+        # Run steps are fetched on their own pool, so they never queue behind slow tool calls
+        self.run_details_executor = ThreadPoolExecutor(
+            max_workers=settings.RUN_DETAILS_MAX_WORKERS, thread_name_prefix="run-details"
+        )
+        self.thread_turns = ThreadTurnSerializer()
+        # Threads created or verified recently skip the threads.get round trip
+        self.known_threads = TTLCache(
+            settings.KNOWN_THREAD_CACHE_MAX_ENTRIES, settings.KNOWN_THREAD_CACHE_TTL_SECONDS, name="known_threads"
+        )
         self._initialized = False
+        self._init_lock = threading.Lock()
+        self._warmup_finished = threading.Event()
+        self._warmup_thread = None
+        self._init_error = None
     
     def initialize(self) -> bool:
         if self._initialized:
             return True
         
+        with self._init_lock:
+            if self._initialized:
+                return True
+            try:
+                self._initialize()
+            except Exception as e:
+                self._init_error = e
+                raise
+            self._init_error = None
+            self._initialized = True
+        return True
+    
+    def start_warmup(self) -> None:
+        """Provision agents on a background thread so no request pays the cold start."""
+        with self._init_lock:
+            if self._initialized or (self._warmup_thread and self._warmup_thread.is_alive()):
+                return
+            self._warmup_finished.clear()
+            self._warmup_thread = threading.Thread(target=self._warmup, name="agent-warmup", daemon=True)
+            self._warmup_thread.start()
+    
+    def _warmup(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.initialize()
+            self.logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            self.logger.error(f"Warm-up failed, the next request will retry: {e}")
+        finally:
+            self._warmup_finished.set()
+    
+    def ensure_ready(self, timeout: Optional[float] = None) -> None:
+        """Wait for an in-flight warm-up instead of provisioning again; initialize if none is running."""
+        if self._initialized:
+            return
+        warmup = self._warmup_thread
+        if warmup is not None and warmup.is_alive():
+            timeout = settings.READINESS_TIMEOUT_SECONDS if timeout is None else timeout
+            if not self._warmup_finished.wait(timeout):
+                raise ServiceNotReadyError(f"Agents are still being provisioned after {timeout:.0f}s")
+            if self._initialized:
+                return
+        self.initialize()
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        if self._initialized:
+            state = "ready"
+        elif self._warmup_thread is not None and self._warmup_thread.is_alive():
+            state = "warming_up"
+        elif self._init_error is not None:
+            state = "failed"
+        else:
+            state = "not_started"
+        return {
+            "ready": self._initialized,
+            "state": state,
+            "error": str(self._init_error) if self._init_error else None
+        }
+    
+    def _initialize(self) -> None:
+        token_provider.prefetch(PURVIEW_SCOPE)
+        token_provider.prefetch(AI_PROJECT_SCOPE)
         self.project_client = AIProjectClient(
             endpoint=settings.AZURE_AI_AGENT_ENDPOINT, 
-            credential=DefaultAzureCredential()
+            credential=token_provider,
+            transport=http_transport.azure_transport()
         )
         
-        self.agent_factory = AgentFactory(self.project_client)
+        if settings.AGENT_REGISTRY_ENABLED:
+            self.agent_registry = AgentRegistry(settings.AGENT_REGISTRY_PATH, scope=settings.AZURE_AI_AGENT_ENDPOINT)
+        self.agent_factory = AgentFactory(self.project_client, registry=self.agent_registry)
         self.message_processor = MessageProcessor(self.project_client)
         
         self._create_all_agents()
-        self._initialized = True
-        return True
+    
+    def _provision(self, name: str, create: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = create()
+        elapsed = time.perf_counter() - started
+        self.provisioning_timings[name] = round(elapsed, 3)
+        self.logger.info(f"Provisioned {name} in {elapsed:.2f}s")
+        return result
     
     def _create_all_agents(self):
-        fabric_agent = self.agent_factory.create_fabric_agent()
-        if fabric_agent:
-            self.connected_agents["fabric_agent"] = fabric_agent
-        
-        self.connected_agents["web_agent"] = self.agent_factory.create_web_agent()
+        started = time.perf_counter()
+        # The specialist agents are independent; only the routing agent needs their ids
+        specialists = {
+            "fabric_agent": self.agent_factory.create_fabric_agent,
+            "web_agent": self.agent_factory.create_web_agent,
+            "rag_agent": self.agent_factory.create_rag_agent,
+        }
+        with ThreadPoolExecutor(max_workers=len(specialists), thread_name_prefix="provision") as pool:
+            futures = {name: pool.submit(self._provision, name, create) for name, create in specialists.items()}
+            results = {name: future.result() for name, future in futures.items()}
         
-        rag_agent, cleanup_resources = self.agent_factory.create_rag_agent()
+        if results["fabric_agent"]:
+            self.connected_agents["fabric_agent"] = results["fabric_agent"]
+        self.connected_agents["web_agent"] = results["web_agent"]
+        rag_agent, cleanup_resources = results["rag_agent"]
         self.connected_agents["rag_agent"] = rag_agent
         self.cleanup_resources = cleanup_resources
         
-        self.main_agent = self.agent_factory.create_routing_agent(
+        self.main_agent = self._provision("routing_agent", lambda: self.agent_factory.create_routing_agent(
             self.connected_agents,
             catalog_service.search_catalog,
             genie_agent_service.handoff_genie_agent
-        )
+        ))
+        self.provisioning_seconds = round(time.perf_counter() - started, 3)
+        self.logger.info(f"Provisioned all agents in {self.provisioning_seconds:.2f}s")
+    
+    def _catalog_results(self, query: str) -> Dict[str, Any]:
+        turn = current_turn()
+        if turn and turn.combined:
+            snapshot = turn.catalog_snapshot()
+            if snapshot:
+                return snapshot
+        
+        results = catalog_service.search_catalog(query)
+        if turn:
+            turn.record_catalog(query, results)
+        return results
     
     def _search_catalog(self, query: str) -> str:
-        return json.dumps(catalog_service.search_catalog(query))
+        return json.dumps(self._catalog_results(query))
+    
+    def _get_or_create_thread(self, thread_id: str = None) -> Tuple[Any, Dict[str, Any]]:
+        """Return the thread to run in plus how it was resolved (cache, verified, created, recreated)."""
+        with timed_stage("thread_lookup") as stage:
+            thread = self.known_threads.get(thread_id) if thread_id else None
+            stage.outcome = "cache" if thread is not None else "created"
+            if thread is None and thread_id:
+                try:
+                    thread = self.project_client.agents.threads.get(thread_id)
+                    stage.outcome = "verified"
+                except ResourceNotFoundError:
+                    self.logger.info(f"Thread {thread_id} no longer exists, starting a new one")
+                    stage.outcome = "recreated"
+                except Exception as e:
+                    raise ThreadUnavailableError(f"Could not verify thread {thread_id}: {e}") from e
+            if thread is None:
+                thread = self.project_client.agents.threads.create()
+            self.known_threads.set(thread.id, thread)
+        return thread, thread_lookup(stage)
     
-    def _get_or_create_thread(self, thread_id: str = None):
-        if thread_id:
+    def _get_run_waiter(self):
+        if self.run_waiter is None:
+            self.run_waiter = create_run_waiter(self.project_client.agents.runs)
+        return self.run_waiter
+    
+    def _finish_run(self, thread_id: str, result: RunWaitResult) -> RunWaitResult:
+        if result.timed_out:
+            self.logger.warning(
+                f"Run {result.run.id} still {result.run.status} after {result.elapsed_seconds:.1f}s, cancelling"
+            )
             try:
-                return self.project_client.agents.threads.get(thread_id)
-            except:
-                pass
-        return self.project_client.agents.threads.create()
+                self.project_client.agents.runs.cancel(thread_id=thread_id, run_id=result.run.id)
+            except Exception as e:
+                self.logger.error(f"Failed to cancel run {result.run.id}: {e}")
+        return result
     
-    def _execute_agent_run(self, thread_id: str, agent_id: str, max_iterations: int = 30):
-        run = self.project_client.agents.runs.create(thread_id=thread_id, agent_id=agent_id)
-        
-        for _ in range(max_iterations):
-            if run.status not in ["queued", "in_progress", "requires_action"]:
-                break
-            time.sleep(0.2)
-            run = self.project_client.agents.runs.get(thread_id=thread_id, run_id=run.id)
-        
-        return run
+    def _execute_agent_run(self, thread_id: str, agent_id: str) -> RunWaitResult:
+        result = self._get_run_waiter().execute(thread_id, agent_id)
+        return self._finish_run(thread_id, result)
     
-    def _execute_routing_run(self, thread_id: str, max_iterations: int = 30):
-        run = self.project_client.agents.runs.create(thread_id=thread_id, agent_id=self.main_agent.id)
-        tools_called = []
+    def _execute_tool_call(self, tool_call, on_event: Optional[QueryEventHandler] = None) -> tuple:
+        name, query = describe_tool_call(tool_call)
+        with timed_stage(f"tool.{name}", "router") as stage:
+            output, label = self._call_tool(name, query, on_event)
+            stage.outcome = tool_outcome(output)
+        return output, label
+    
+    def _call_tool(self, name: str, query: str, on_event: Optional[QueryEventHandler] = None) -> tuple:
+        if name == "search_catalog":
+            if on_event:
+                on_event("tool_called", {"name": name, "query": query})
+            results = self._catalog_results(query)
+            if on_event:
+                on_event("catalog_searched", {"query": query, "assets_found": results.get("assets_found", 0)})
+            return json.dumps(results), f"search_catalog('{query}')"
+        if name == "handoff_genie_agent":
+            if on_event:
+                on_event("tool_called", {"name": name, "query": query})
+            output = genie_agent_service.handoff_genie_agent(query)
+            announce_genie_job(output, on_event)
+            return output, f"handoff_genie_agent('{query}')"
+        return tool_error_output(f"Unknown function: {name}"), None
+    
+    def _handle_required_action(self, run, tools_called: List[str],
+                                on_event: Optional[QueryEventHandler] = None) -> List[Dict[str, Any]]:
+        tool_calls = getattr(getattr(getattr(run, 'required_action', None), 'submit_tool_outputs', None), 'tool_calls', [])
+        tool_calls = [tool_call for tool_call in tool_calls if hasattr(tool_call, 'function')]
         
-        for _ in range(max_iterations):
-            if run.status not in ["queued", "in_progress", "requires_action"]:
-                break
-            
-            time.sleep(0.2)
-            run = self.project_client.agents.runs.get(thread_id=thread_id, run_id=run.id)
-            
-            if run.status == "requires_action" and hasattr(run, 'required_action'):
-                tool_outputs = []
-                tool_calls = getattr(getattr(getattr(run, 'required_action', None), 'submit_tool_outputs', None), 'tool_calls', [])
-                
-                for tool_call in tool_calls:
-                    if hasattr(tool_call, 'function'):
-                        func_name = tool_call.function.name
-                        args = json.loads(tool_call.function.arguments)
-                        
-                        if func_name in ["_search_catalog", "search_catalog"]:
-                            query = args.get("query", "")
-                            output = self._search_catalog(query)
-                            tools_called.append(f"search_catalog('{query}')")
-                        elif func_name == "handoff_genie_agent":
-                            query = args.get("query", "")
-                            output = genie_agent_service.handoff_genie_agent(query)
-                            tools_called.append(f"handoff_genie_agent('{query}')")
-                        else:
-                            output = json.dumps({"status": "error", "message": f"Unknown function: {func_name}"})
-                        
-                        tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
-                
-                if tool_outputs:
-                    self.project_client.agents.runs.submit_tool_outputs(
-                        thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
-                    )
+        # Run the whole batch at once so the step costs as much as its slowest tool call
+        started = {tool_call.id: threading.Event() for tool_call in tool_calls}
+        started_at: Dict[str, float] = {}
+        started_lock = threading.Lock()
         
-        return run, tools_called
-    
-    def _extract_response_from_thread(self, thread_id: str) -> tuple:
-        messages = list(self.project_client.agents.messages.list(thread_id=thread_id))
-        for message in messages:
-            if message.role == "assistant":
-                message_data = self.message_processor.extract_message_with_annotations(message)
-                return message_data["content"], message_data["annotations"]
-        return "No response generated", []
-    
-    def _extract_run_details(self, thread_id: str, run_id: str) -> tuple:
-        connected_agents_called = []
-        tools_called = []
+        def run_tool_call(tool_call):
+            with started_lock:
+                started_at[tool_call.id] = time.monotonic()
+            started[tool_call.id].set()
+            return self._execute_tool_call(tool_call, on_event)
         
-        run_steps = list(self.project_client.agents.run_steps.list(thread_id=thread_id, run_id=run_id))
+        # Each call gets its own copy of the caller's context so it sees the current turn
+        futures = [
+            self.tool_executor.submit(contextvars.copy_context().run, run_tool_call, tool_call)
+            for tool_call in tool_calls
+        ]
+        start_deadline = time.monotonic() + settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
         
-        for step in run_steps:
-            if hasattr(step, 'step_details') and hasattr(step.step_details, 'tool_calls'):
-                for tool_call in step.step_details.tool_calls:
-                    if hasattr(tool_call, 'type'):
-                        if tool_call.type == 'connected_agent' and hasattr(tool_call, 'connected_agent'):
-                            connected_agents_called.append(tool_call.connected_agent.get('name', 'unknown'))
-                        elif tool_call.type == 'function' and hasattr(tool_call, 'function'):
-                            func_name = tool_call.function.name
-                            if func_name != '_search_catalog':
-                                tools_called.append(f"{func_name}(...)")
+        tool_outputs = []
+        for tool_call, future in zip(tool_calls, futures):
+            name, query = describe_tool_call(tool_call)
+            timeout = tool_timeout(name)
+            # A call still waiting for a worker is withdrawn rather than left to run for nobody
+            if not started[tool_call.id].wait(max(0.0, start_deadline - time.monotonic())) and future.cancel():
+                self.logger.warning(f"Tool call {name}('{query}') found no free tool worker")
+                output, label = tool_error_output(f"{name} could not start, the service is busy"), f"{name}('{query}')"
+            else:
+                try:
+                    # Each deadline counts from when that call started running, not from when it was submitted
+                    with started_lock:
+                        deadline = started_at.get(tool_call.id, time.monotonic()) + timeout
+                    output, label = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    self.logger.warning(f"Tool call {name}('{query}') timed out after {timeout:.0f}s")
+                    output, label = tool_error_output(f"{name} timed out after {timeout:.0f}s"), f"{name}('{query}')"
+                except Exception as e:
+                    self.logger.error(f"Tool call {name}('{query}') failed: {e}")
+                    output, label = tool_error_output(f"{name} failed: {e}"), f"{name}('{query}')"
+            
+            if label:
+                tools_called.append(label)
+            tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
         
+        return tool_outputs
+    
+    def _execute_routing_run(self, thread_id: str, on_event: Optional[QueryEventHandler] = None) -> tuple:
+        tools_called = []
+        result = self._get_run_waiter().execute(
+            thread_id, self.main_agent.id,
+            on_requires_action=lambda run: self._handle_required_action(run, tools_called, on_event),
+            on_event=relay_run_events(on_event) if on_event else None
+        )
+        return self._finish_run(thread_id, result), tools_called
+    
+    def _extract_response(self, thread_id: str, run_result: RunWaitResult, agent: str = "router") -> tuple:
+        with timed_stage("response_extraction", agent) as stage:
+            message = streamed_response_message(run_result)
+            stage.outcome = "stream"
+            if message is None:
+                listed = self.project_client.agents.messages.list(thread_id=thread_id, **run_messages_query(run_result.run.id))
+                message = next((m for m in islice(listed, RUN_MESSAGE_LIMIT) if m.role == "assistant"), None)
+                stage.outcome = "listed"
+            if message is None:
+                stage.outcome = "missing"
+                return "No response generated", []
+            message_data = self.message_processor.extract_message_with_annotations(message)
+        return message_data["content"], message_data["annotations"]
+    
+    def _extract_run_details(self, thread_id: str, run_result: RunWaitResult) -> tuple:
+        with timed_stage("run_details", "router") as stage:
+            run_steps = streamed_run_steps(run_result)
+            stage.outcome = "stream"
+            if run_steps is None:
+                run_steps = list(self.project_client.agents.run_steps.list(thread_id=thread_id, run_id=run_result.run.id))
+                stage.outcome = "listed"
+            connected_agents_called, tools_called = parse_run_steps(run_steps)
+        for agent_name in connected_agents_called:
+            DELEGATIONS.inc(agent=agent_name)
         return connected_agents_called, tools_called
     
+    def _extract_run_output(self, thread_id: str, run_result: RunWaitResult) -> tuple:
+        """Answer and run details of a finished run, with the steps fetched alongside the messages."""
+        details = self.run_details_executor.submit(
+            contextvars.copy_context().run, self._extract_run_details, thread_id, run_result
+        )
+        return self._extract_response(thread_id, run_result), details.result()
+    
     def process_query_direct(self, query: str, agent_name: str, thread_id: str = None) -> Dict[str, Any]:
-        if not self._initialized:
-            self.initialize()
+        self.ensure_ready()
         
         if agent_name not in self.connected_agents:
             return {
@@ -154,10 +489,22 @@ class ConnectedAgentService:
                 "response": f"Agent '{agent_name}' is not available"
             }
         
-        thread = self._get_or_create_thread(thread_id)
-        self.project_client.agents.messages.create(thread_id=thread.id, role="user", content=query)
-        run = self._execute_agent_run(thread.id, self.connected_agents[agent_name].id)
-        response_text, annotations = self._extract_response_from_thread(thread.id)
+        with request_trace(), timed_stage("process_query_direct", agent_name):
+            thread, lookup = self._get_or_create_thread(thread_id)
+            return self.thread_turns.run(
+                thread.id, lambda: self._direct_turn(query, agent_name, thread, lookup),
+                coalesce_key=(agent_name, query), share=shared_turn_result(lookup)
+            )
+    
+    def _direct_turn(self, query: str, agent_name: str, thread, lookup: Dict[str, Any]) -> Dict[str, Any]:
+        with limiters["agent_runs"].acquire() as run_queue_wait:
+            with timed_stage("message_create", agent_name):
+                self.project_client.agents.messages.create(thread_id=thread.id, role="user", content=query)
+            with timed_stage("run_wait", agent_name) as stage:
+                run_result = self._execute_agent_run(thread.id, self.connected_agents[agent_name].id)
+                stage.outcome = run_outcome(run_result)
+        run = run_result.run
+        response_text, annotations = self._extract_response(thread.id, run_result, agent_name)
         
         return {
             "success": True,
@@ -169,22 +516,52 @@ class ConnectedAgentService:
                 "direct_call": True,
                 "run_status": run.status,
                 "thread_id": thread.id,
-                "run_id": run.id
+                "run_id": run.id,
+                "run_wait": run_result.to_dict(),
+                "thread_lookup": lookup,
+                "queue_wait": queue_wait_report("agent_runs", run_queue_wait),
+                **trace_metadata()
             }
         }
 
-    def process_query(self, query: str, thread_id: str = None) -> Dict[str, Any]:
-        if not self._initialized:
-            self.initialize()
+    def process_query(self, query: str, thread_id: str = None,
+                      on_event: Optional[QueryEventHandler] = None) -> Dict[str, Any]:
+        self.ensure_ready()
         
-        thread = self._get_or_create_thread(thread_id)
-        self.project_client.agents.messages.create(thread_id=thread.id, role="user", content=query)
-        run, tools_called = self._execute_routing_run(thread.id)
-        response_text, annotations = self._extract_response_from_thread(thread.id)
-        connected_agents_called, additional_tools = self._extract_run_details(thread.id, run.id)
+        with request_trace(), timed_stage("process_query", "router"):
+            thread, lookup = self._get_or_create_thread(thread_id)
+            turn = current_turn()
+            if turn:
+                # Tool calls in this turn (e.g. Genie conversation reuse) key off the agent thread
+                turn.thread_id = thread.id
+            if on_event:
+                on_event("thread", {"thread_id": thread.id})
+            # Streaming callers need their own events, so only plain requests share a duplicate's result
+            return self.thread_turns.run(
+                thread.id, lambda: self._route_turn(query, thread, lookup, on_event),
+                coalesce_key=None if on_event else ("router", query), share=shared_turn_result(lookup)
+            )
+    
+    def _route_turn(self, query: str, thread, lookup: Dict[str, Any],
+                    on_event: Optional[QueryEventHandler] = None) -> Dict[str, Any]:
+        # The slot is taken before posting the message, so a rejected turn leaves the thread untouched
+        with limiters["agent_runs"].acquire() as run_queue_wait:
+            with timed_stage("message_create", "router"):
+                self.project_client.agents.messages.create(thread_id=thread.id, role="user", content=query)
+            with timed_stage("run_wait", "router") as stage:
+                run_result, tools_called = self._execute_routing_run(thread.id, on_event=on_event)
+                stage.outcome = run_outcome(run_result)
+        run = run_result.run
+        (response_text, annotations), (connected_agents_called, additional_tools) = self._extract_run_output(
+            thread.id, run_result
+        )
         tools_called.extend(additional_tools)
         
-        return {
+        if on_event and not run_result.events:
+            for agent_name in connected_agents_called:
+                on_event("agent_delegated", {"agent": agent_name})
+        
+        result = {
             "success": True,
             "response": response_text,
             "annotations": annotations,
@@ -194,56 +571,99 @@ class ConnectedAgentService:
                 "tools_called": tools_called,
                 "connected_agents_called": connected_agents_called,
                 "thread_id": thread.id,
-                "run_id": run.id
+                "run_id": run.id,
+                "run_wait": run_result.to_dict(),
+                "thread_lookup": lookup,
+                "queue_wait": queue_wait_report("agent_runs", run_queue_wait),
+                **trace_metadata()
             }
         }
+        if on_event:
+            on_event("done", result)
+        return result
     
-    def analyze_purview(self, query: str) -> Dict[str, Any]:
-        catalog_results = self._search_catalog(query)
-        catalog_data = json.loads(catalog_results)
+    def stream_query(self, query: str, thread_id: str = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Run ``process_query`` on a worker thread and yield its routing events as they happen."""
+        events = queue.Queue()
+        state = {"streamed_text": False}
         
-        if catalog_data.get("assets_found", 0) > 0:
-            assets = catalog_data.get("results", [])
-            agent_types = [asset["connected_agent"] for asset in assets if asset.get("connected_agent")]
-            
-            if agent_types:
-                purview_analysis = f"Found {len(assets)} relevant data assets. Primary agent: {agent_types[0]}"
-            else:
-                purview_analysis = f"Found {len(assets)} data assets but no connected agents available"
-        else:
-            purview_analysis = "No relevant data assets found in catalog. Query may require web search."
+        def on_event(event: str, data: Dict[str, Any]) -> None:
+            if event == "delta":
+                state["streamed_text"] = True
+            elif event == "done" and not state["streamed_text"] and data.get("response"):
+                events.put(("delta", {"text": data["response"]}))
+            events.put((event, data))
         
-        return {
-            "success": True,
-            "purview": purview_analysis,
-            "catalog_results": catalog_data,
-            "confidence": 0.8 if catalog_data.get("assets_found", 0) > 0 else 0.3
-        }
+        def worker() -> None:
+            try:
+                self.process_query(query, thread_id, on_event=on_event)
+            except Exception as e:
+                self.logger.error(f"Streaming query failed: {e}")
+                events.put(("error", {"success": False, "error": str(e)}))
+            finally:
+                events.put(None)
+        
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(worker,), name="process-query-stream", daemon=True).start()
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            yield item
     
-    def get_thread_messages(self, thread_id: str) -> Dict[str, Any]:
-        if not self._initialized:
-            self.initialize()
+    def analyze_purview(self, query: str) -> Dict[str, Any]:
+        with request_trace(), timed_stage("analyze_purview", "purview") as stage:
+            turn = current_turn()
+            captured = turn.catalog_snapshot() if turn else None
+            stage.outcome = "turn" if captured else "search"
+            catalog_data = captured or self._catalog_results(query)
+            metadata = trace_metadata()
+        return {**summarize_catalog(catalog_data), "catalog_source": stage.outcome, "metadata": metadata}
+    
+    def get_thread_messages(self, thread_id: str, limit: Optional[int] = None, before: Optional[str] = None,
+                            after: Optional[str] = None, since: Optional[int] = None,
+                            if_none_match: Optional[str] = None) -> Dict[str, Any]:
+        """One page of a thread in chronological order; unchanged pages short-circuit to ``not_modified``."""
+        page_query = thread_page_query(limit, before, after, since)
+        self.ensure_ready()
         
-        messages = list(self.project_client.agents.messages.list(thread_id=thread_id))
-        formatted_messages = self.message_processor.format_thread_messages(messages, thread_id)
+        listed = iter(self.project_client.agents.messages.list(thread_id=thread_id, **page_query["list"]))
+        whole_thread = page_query["limit"] is None
+        if whole_thread:
+            # Only the newest message is read before the ETag check; the rest only when it changed
+            messages, has_more = list(islice(listed, 1)), False
+        else:
+            listed = takewhile(lambda message: in_thread_page(message, page_query), listed)
+            messages, has_more = thread_page(list(islice(listed, page_query["fetch"])), page_query)
+        etag = thread_page_etag(thread_id, messages, has_more)
+        if etag_matches(if_none_match, etag):
+            return {"success": True, "not_modified": True, "thread_id": thread_id, "etag": etag}
+        if whole_thread:
+            messages.extend(listed)
         
-        return {
-            "success": True,
-            "messages": formatted_messages,
-            "thread_id": thread_id,
-            "message_count": len(formatted_messages)
-        }
+        formatted_messages = self.message_processor.format_thread_messages(messages, thread_id)
+        return thread_page_response(thread_id, formatted_messages, has_more, etag)
 
     def get_health_status(self) -> Dict[str, Any]:
         return {
             "service": "Connected Agent Service",
             "initialized": self._initialized,
+            "readiness": self.get_readiness(),
             "agents_created": len(self.connected_agents),
             "main_agent_ready": self.main_agent is not None,
-            "project_client_ready": self.project_client is not None
+            "project_client_ready": self.project_client is not None,
+            "agent_registry": self.agent_registry.get_stats() if self.agent_registry else None,
+            "known_threads": self.known_threads.stats(),
+            "thread_turns": self.thread_turns.get_stats(),
+            "admission": {name: limiter.get_stats() for name, limiter in limiters.items()},
+            "provisioning": {"agents": dict(self.provisioning_timings), "total_seconds": self.provisioning_seconds}
         }
     
     def cleanup(self):
+        if self.agent_registry is not None:
+            # Registered agents and vector stores are left in place for the next start to reuse
+            return
+        
         if self.main_agent and self.project_client:
             self.project_client.agents.delete_agent(self.main_agent.id)
         
@@ -254,7 +674,7 @@ class ConnectedAgentService:
         if self.cleanup_resources and self.project_client:
             if self.cleanup_resources.get("vector_store"):
                 self.project_client.agents.vector_stores.delete(self.cleanup_resources["vector_store"].id)
-            if self.cleanup_resources.get("file"):
-                self.project_client.agents.files.delete(self.cleanup_resources["file"].id)
+            if self.cleanup_resources.get("file_id"):
+                self.project_client.agents.files.delete(self.cleanup_resources["file_id"])
 
 connected_agent_service = ConnectedAgentService()
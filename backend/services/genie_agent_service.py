@@ -1,12 +1,152 @@
 import os
 import json
+import math
+import re
+import threading
 import time
-import requests
+import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
 from dotenv import load_dotenv
+from backend.config.settings import settings
+from backend.services.genie_results import (
+    RESULT_FORMATS,
+    build_result_page,
+    column_names,
+    decode_cursor,
+    encode_cursor,
+    manifest_chunks,
+    plan_chunks,
+    render_rows,
+    statement_parts,
+)
+from backend.services.http_transport import http_transport
+from backend.services.admission import limiters
+from backend.services.metrics import timed_stage
+from backend.services.request_context import current_turn
+from backend.utils.backoff import Backoff
+from backend.utils.cache import TTLCache
 
 load_dotenv()
 
+TERMINAL_STATUSES = ('COMPLETED', 'FAILED', 'CANCELLED', 'QUERY_RESULT_EXPIRED')
+# Genie passes through these while generating SQL; each usually lasts well under a second
+GENERATION_STATUSES = ('SUBMITTED', 'FILTERING_CONTEXT', 'ASKING_AI')
+GENERATION_MAX_INTERVAL = 1.0
+# Follow-up POSTs to an expired or deleted conversation fail with one of these
+CONVERSATION_GONE_STATUSES = (400, 404, 410)
+# Upper bound for long-polling a Genie job, so a GET never pins a worker for long
+GENIE_JOB_MAX_WAIT_SECONDS = 30
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+def normalize_sql(sql: Optional[str]) -> Optional[str]:
+    if not sql:
+        return None
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def generated_sql(status_data: Dict[str, Any]) -> Optional[str]:
+    for attachment in status_data.get('attachments') or []:
+        if attachment.get('query'):
+            return attachment['query'].get('query')
+    return None
+
+
+def direct_genie_response(query: str, thread_id: Optional[str], result_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a Genie handoff result like the connected agents' direct responses."""
+    return {
+        'success': result_data.get('status') == 'success',
+        'response': result_data.get('response', ''),
+        'annotations': [],
+        'metadata': {'query': query, 'agent_used': 'genie', 'direct_call': True,
+                     'thread_id': thread_id or 'genie-session', 'genie_details': result_data}
+    }
+
+
+def job_wait_seconds(value: Any) -> float:
+    """The ``wait`` parameter of a job GET, clamped to [0, GENIE_JOB_MAX_WAIT_SECONDS]."""
+    try:
+        wait = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"wait must be a number of seconds, got {value!r}")
+    if not math.isfinite(wait):
+        raise ValueError(f"wait must be a number of seconds, got {value!r}")
+    return min(max(wait, 0.0), GENIE_JOB_MAX_WAIT_SECONDS)
+
+
+def turn_thread_id() -> Optional[str]:
+    turn = current_turn()
+    return turn.thread_id if turn else None
+
+
+class GeniePollSchedule:
+    """Poll delays that restart on every status transition.
+
+    While Genie is still generating SQL the delay stays short; once the warehouse is
+    executing it backs off towards ``maximum``.
+    """
+
+    def __init__(self, initial: float, maximum: float):
+        self.backoff = Backoff(initial, maximum, multiplier=1.5)
+        self.status = None
+
+    def next(self, status: Optional[str]) -> float:
+        if status != self.status:
+            self.status = status
+            self.backoff.reset()
+        delay = self.backoff.next()
+        if status is None or status in GENERATION_STATUSES:
+            delay = min(delay, GENERATION_MAX_INTERVAL)
+        return delay
+
+
+class GenieJob:
+    """Handle for a Genie question whose answer is collected after the call returns."""
+
+    def __init__(self, query: str, conversation_id: str, message_id: str):
+        self.job_id = uuid.uuid4().hex
+        self.query = query
+        self.conversation_id = conversation_id
+        self.message_id = message_id
+        self.status = "running"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+        self.task = None
+
+    def finish(self, result: Dict[str, Any]) -> None:
+        self.result = result
+        self.status = "completed" if result.get("status") == "success" else "failed"
+        self.finished_at = time.time()
+        self.done.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "query": self.query,
+            "conversation_id": self.conversation_id,
+            "message_id": self.message_id,
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.created_at, 3),
+            "result": self.result
+        }
+
+    def pending_response(self) -> Dict[str, Any]:
+        return {
+            "status": "pending",
+            "job_id": self.job_id,
+            "conversation_id": self.conversation_id,
+            "message_id": self.message_id,
+            "message": "Genie is still running this query. The result will be available from the Genie job "
+                       f"{self.job_id}; tell the user it is in progress."
+        }
+
 class GenieAgentService:
     
     def __init__(self):
@@ -14,104 +154,389 @@ class GenieAgentService:
         self.databricks_instance = os.getenv('DATABRICKS_INSTANCE')
         self.genie_space_id = os.getenv('GENIE_SPACE_ID') 
         self.auth_token = os.getenv('DATABRICKS_AUTH_TOKEN')
+        self.session = http_transport.session("genie")
+        self.jobs = TTLCache(settings.GENIE_JOB_MAX_ENTRIES, settings.GENIE_JOB_TTL_SECONDS, name="genie_jobs")
+        self.job_executor = ThreadPoolExecutor(max_workers=settings.GENIE_JOB_WORKERS, thread_name_prefix="genie-job")
+        # Completed answers, by normalized question and by generated SQL
+        self.answers = TTLCache(
+            settings.GENIE_ANSWER_CACHE_MAX_ENTRIES, settings.GENIE_ANSWER_CACHE_TTL_SECONDS, name="genie_answers"
+        )
+        # Agent thread -> Genie conversation, so follow-ups keep Genie's context; idle entries expire
+        self.conversations = TTLCache(
+            settings.GENIE_CONVERSATION_MAX_ENTRIES, settings.GENIE_CONVERSATION_IDLE_SECONDS, name="genie_conversations"
+        )
+        # First questions of threads answered from the answer cache; a follow-up opens their conversation
+        self.seed_questions = TTLCache(
+            settings.GENIE_CONVERSATION_MAX_ENTRIES, settings.GENIE_CONVERSATION_IDLE_SECONDS, name="genie_seed_questions"
+        )
+        # Manifests and row chunks of recent results, so paging does not re-download what it already has
+        self.result_chunks = TTLCache(settings.GENIE_RESULT_CACHE_ENTRIES, settings.GENIE_JOB_TTL_SECONDS, name="genie_result_chunks")
     
     def is_configured(self) -> bool:
         return all([self.databricks_instance, self.genie_space_id, self.auth_token])
     
-    def handoff_genie_agent(self, query: str) -> str:
-        if not self.is_configured():
-            return json.dumps({
-                "status": "error",
-                "message": "Missing Genie configuration"
-            })
-        
-        headers = {
+    def headers(self) -> Dict[str, str]:
+        return {
             'Authorization': f'Bearer {self.auth_token}',
             'Content-Type': 'application/json'
         }
-        
-        start_url = f"https://{self.databricks_instance}/api/2.0/genie/spaces/{self.genie_space_id}/start-conversation"
-        start_response = requests.post(start_url, headers=headers, json={"content": query})
-        start_response.raise_for_status()
-        start_data = start_response.json()
-        
-        conversation_id = start_data['conversation']['id']
-        message_id = start_data['message']['id']
-        
-        status_url = f"https://{self.databricks_instance}/api/2.0/genie/spaces/{self.genie_space_id}/conversations/{conversation_id}/messages/{message_id}"
-        
-        for _ in range(60):
-            time.sleep(0.5)
-            status_response = requests.get(status_url, headers=headers)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            
-            if status_data.get('status') in ['COMPLETED', 'FAILED', 'CANCELLED']:
-                break
-        
-        if status_data.get('status') != 'COMPLETED':
-            return json.dumps({
-                "status": "error",
-                "message": f"Genie query failed with status: {status_data.get('status')}"
-            })
-        
+    
+    def space_url(self) -> str:
+        return f"https://{self.databricks_instance}/api/2.0/genie/spaces/{self.genie_space_id}"
+    
+    def message_url(self, conversation_id: str, message_id: str) -> str:
+        return f"{self.space_url()}/conversations/{conversation_id}/messages/{message_id}"
+    
+    def parse_attachments(self, status_data: Dict[str, Any]) -> Dict[str, Any]:
         attachments = status_data.get('attachments', [])
-        text_response = "No response generated"
-        generated_query = None
-        query_description = None
-        row_count = None
-        attachment_id = None
+        parsed = {
+            "text_response": "No response generated",
+            "generated_query": None,
+            "query_description": None,
+            "row_count": None,
+            "attachment_id": None
+        }
         
         for attachment in attachments:
             if 'text' in attachment and attachment['text']:
                 text_content = attachment['text'].get('content', '')
                 if text_content:
-                    text_response = text_content
+                    parsed["text_response"] = text_content
             
             if 'query' in attachment and attachment['query']:
                 query_info = attachment['query']
-                generated_query = query_info.get('query', '')
-                query_description = query_info.get('description', '')
-                row_count = query_info.get('query_result_metadata', {}).get('row_count')
-                attachment_id = attachment.get('attachment_id')
+                parsed["generated_query"] = query_info.get('query', '')
+                parsed["query_description"] = query_info.get('description', '')
+                parsed["row_count"] = query_info.get('query_result_metadata', {}).get('row_count')
+                parsed["attachment_id"] = attachment.get('attachment_id')
         
-        if generated_query and text_response == "No response generated":
+        if parsed["generated_query"] and parsed["text_response"] == "No response generated":
+            generated_query, query_description = parsed["generated_query"], parsed["query_description"]
             text_response = f"{query_description}\n\nGenerated SQL:\n{generated_query}" if query_description else f"Generated SQL query:\n{generated_query}"
-            if row_count is not None:
-                text_response += f"\n\nTotal rows: {row_count}"
+            if parsed["row_count"] is not None:
+                text_response += f"\n\nTotal rows: {parsed['row_count']}"
+            parsed["text_response"] = text_response
         
-        if attachment_id and generated_query:
-            results_url = f"https://{self.databricks_instance}/api/2.0/genie/spaces/{self.genie_space_id}/conversations/{conversation_id}/messages/{message_id}/query-result/{attachment_id}"
-            results_response = requests.get(results_url, headers=headers)
-            
-            if results_response.status_code == 200:
-                query_results = results_response.json()
-                result_data = query_results.get('statement_response', {}).get('result') or query_results.get('result')
-                
-                if result_data and 'data_array' in result_data:
-                    rows = result_data['data_array'][:10]
-                    schema = result_data.get('schema', {}).get('columns', [])
-                    
-                    text_response += "\n\nFirst 10 rows:"
-                    
-                    if schema:
-                        headers_line = " | ".join([col.get('name', f'col_{i}') for i, col in enumerate(schema)])
-                        text_response += f"\n{headers_line}\n{'-' * len(headers_line)}"
-                    
-                    for row in rows:
-                        if isinstance(row, list):
-                            text_response += f"\n{' | '.join([str(val) if val is not None else 'NULL' for val in row])}"
-                    
-                    if row_count and row_count > 10:
-                        text_response += f"\n\n... showing 10 of {row_count} total rows"
-        
-        return json.dumps({
+        return parsed
+    
+    def render_query_results(self, query_results: Dict[str, Any], row_count: Optional[int],
+                             cursor_state: Optional[Dict[str, Any]] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Render the first rows within the configured row and byte budget; returns (text, page info)."""
+        statement_id, manifest, result_data = statement_parts(query_results)
+        if not result_data or 'data_array' not in result_data:
+            return "", None
+        
+        rows = result_data['data_array']
+        table, rendered = render_rows(
+            settings.GENIE_RESULT_FORMAT, column_names(manifest, result_data), rows,
+            settings.GENIE_RESULT_MAX_ROWS, settings.GENIE_RESULT_MAX_BYTES
+        )
+        total = row_count if row_count is not None else manifest.get('total_row_count', len(rows))
+        
+        text_response = f"\n\nFirst {rendered} rows:\n{table}"
+        page = {"row_offset": 0, "row_count": rendered, "total_rows": total, "next_cursor": None}
+        if total > rendered:
+            text_response += f"\n\n... showing {rendered} of {total} total rows"
+            if cursor_state is not None:
+                page["next_cursor"] = encode_cursor({**cursor_state, "statement_id": statement_id, "offset": rendered})
+        return text_response, page
+    
+    def _cache_result(self, query_results: Dict[str, Any]) -> None:
+        statement_id, manifest, result_data = statement_parts(query_results)
+        if statement_id:
+            self.result_chunks.set((statement_id, "manifest"), manifest)
+            if result_data:
+                self.result_chunks.set((statement_id, result_data.get('chunk_index', 0)), result_data)
+    
+    def query_result_url(self, state: Dict[str, Any]) -> str:
+        return f"{self.message_url(state['conversation_id'], state['message_id'])}/query-result/{state['attachment_id']}"
+    
+    def chunk_url(self, statement_id: str, chunk_index: int) -> str:
+        return f"https://{self.databricks_instance}/api/2.0/sql/statements/{statement_id}/result/chunks/{chunk_index}"
+    
+    def page_request(self, cursor: str, limit: Optional[int], fmt: Optional[str]) -> Tuple[Dict[str, Any], int, str]:
+        state = decode_cursor(cursor)
+        limit = max(1, min(int(limit or settings.GENIE_RESULT_PAGE_SIZE), settings.GENIE_RESULT_MAX_PAGE_SIZE))
+        fmt = fmt or settings.GENIE_RESULT_FORMAT
+        if fmt not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format: {fmt}")
+        return state, limit, fmt
+    
+    def _fetch_query_result(self, state: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        response = self.session.get(self.query_result_url(state), headers=headers)
+        response.raise_for_status()
+        query_results = response.json()
+        self._cache_result(query_results)
+        return query_results
+    
+    def _result_part(self, state: Dict[str, Any], key, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        statement_id = state.get('statement_id')
+        cached = self.result_chunks.get((statement_id, key)) if statement_id else None
+        if cached is not None:
+            return cached
+        if key in ("manifest", 0) or not statement_id:
+            statement_id, manifest, result_data = statement_parts(self._fetch_query_result(state, headers))
+            return manifest if key == "manifest" else result_data
+        response = self.session.get(self.chunk_url(statement_id, key), headers=headers)
+        response.raise_for_status()
+        chunk = response.json()
+        self.result_chunks.set((statement_id, key), chunk)
+        return chunk
+    
+    def fetch_result_page(self, cursor: str, limit: Optional[int] = None, fmt: Optional[str] = None) -> Dict[str, Any]:
+        """Rows [offset, offset + limit) of a Genie result, fetching only the chunks that hold them."""
+        if not self.is_configured():
+            return self.error_response("Missing Genie configuration")
+        state, limit, fmt = self.page_request(cursor, limit, fmt)
+        headers = self.headers()
+        
+        manifest = self._result_part(state, "manifest", headers) or {}
+        first_chunk = self._result_part(state, 0, headers)
+        rows = []
+        for chunk_index, start, stop in plan_chunks(manifest_chunks(manifest, first_chunk), state['offset'], limit):
+            chunk = first_chunk if chunk_index == 0 else self._result_part(state, chunk_index, headers)
+            rows.extend((chunk or {}).get('data_array', [])[start:stop])
+        
+        return build_result_page(state, manifest, first_chunk, rows, fmt)
+    
+    def build_response(self, parsed: Dict[str, Any], conversation_id: str, message_id: str) -> Dict[str, Any]:
+        return {
             "status": "success",
-            "response": text_response,
+            "response": parsed["text_response"],
             "conversation_id": conversation_id,
             "message_id": message_id,
-            "generated_query": generated_query,
-            "row_count": row_count
-        })
+            "generated_query": parsed["generated_query"],
+            "row_count": parsed["row_count"],
+            "result_page": parsed.get("result_page")
+        }
+    
+    def error_response(self, message: str) -> Dict[str, Any]:
+        return {"status": "error", "message": message}
+    
+    def _start_conversation(self, query: str, headers: Dict[str, str]) -> Tuple[str, str]:
+        start_url = f"{self.space_url()}/start-conversation"
+        start_response = self.session.post(start_url, headers=headers, json={"content": query})
+        start_response.raise_for_status()
+        start_data = start_response.json()
+        return start_data['conversation']['id'], start_data['message']['id']
+    
+    def conversation_key(self, thread_id: str) -> Tuple[str, str]:
+        return self.genie_space_id, thread_id
+    
+    def followup_url(self, conversation_id: str) -> str:
+        return f"{self.space_url()}/conversations/{conversation_id}/messages"
+    
+    def _seed_conversation(self, key: Tuple[str, str], headers: Dict[str, str], deadline: float) -> Optional[str]:
+        """Open the conversation a cached first answer skipped, asking that question first for context."""
+        seed = self.seed_questions.get(key)
+        if seed is None:
+            return None
+        self.seed_questions.delete(key)
+        conversation_id, message_id = self._start_conversation(seed, headers)
+        # Genie answers one message of a conversation at a time, so the follow-up waits for the seed
+        self._poll_message(self.message_url(conversation_id, message_id), headers, deadline - time.monotonic())
+        self.conversations.set(key, conversation_id)
+        return conversation_id
+    
+    def _start_message(self, query: str, headers: Dict[str, str], thread_id: Optional[str],
+                       deadline: Optional[float] = None) -> Tuple[str, str, bool]:
+        """Ask in the thread's Genie conversation if it is still alive, else start a new one; returns (conv, msg, reused)."""
+        key = self.conversation_key(thread_id)
+        conversation_id = self.conversations.get(key) if thread_id else None
+        if conversation_id is None and thread_id:
+            deadline = deadline if deadline is not None else time.monotonic() + settings.GENIE_POLL_TIMEOUT_SECONDS
+            conversation_id = self._seed_conversation(key, headers, deadline)
+        if conversation_id:
+            response = self.session.post(self.followup_url(conversation_id), headers=headers, json={"content": query})
+            if response.status_code in CONVERSATION_GONE_STATUSES:
+                self.logger.info(f"Genie conversation {conversation_id} is gone, starting a new one")
+                self.conversations.delete(key)
+            else:
+                response.raise_for_status()
+                data = response.json()
+                # Re-setting the entry restarts its idle timer
+                self.conversations.set(key, conversation_id)
+                return conversation_id, data.get('message_id') or data['id'], True
+        
+        conversation_id, message_id = self._start_conversation(query, headers)
+        if thread_id:
+            self.conversations.set(key, conversation_id)
+        return conversation_id, message_id, False
+    
+    def question_key(self, question: str) -> Tuple[str, str, str]:
+        return "question", self.genie_space_id, normalize_question(question)
+    
+    def sql_key(self, sql: Optional[str]) -> Optional[Tuple[str, str, str]]:
+        sql = normalize_sql(sql)
+        return ("sql", self.genie_space_id, sql) if sql else None
+    
+    def is_standalone(self, thread_id: Optional[str]) -> bool:
+        # A follow-up is answered in its conversation's context, so it can't be served by question text
+        if not thread_id:
+            return True
+        key = self.conversation_key(thread_id)
+        return key not in self.conversations and key not in self.seed_questions
+    
+    def serve_cached(self, query: str, thread_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """A cached answer to a standalone question; in a thread, the first follow-up opens the conversation."""
+        cached = self.cached_answer(query)
+        if cached and thread_id:
+            self.seed_questions.set(self.conversation_key(thread_id), query)
+        return cached
+    
+    def _answer(self, entry: Dict[str, Any], kind: str, conversation_id: Optional[str] = None,
+                message_id: Optional[str] = None) -> Dict[str, Any]:
+        """A cached response under this turn's ids; the turn that produced it goes in ``cache.source``."""
+        response = dict(entry["response"])
+        source = {"conversation_id": response.pop("conversation_id", None), "message_id": response.pop("message_id", None)}
+        age = round(time.time() - entry["cached_at"], 1)
+        return {**response, "conversation_id": conversation_id, "message_id": message_id,
+                "cache": {"hit": True, "key": kind, "age_seconds": age, "source": source}}
+    
+    def cached_answer(self, question: str) -> Optional[Dict[str, Any]]:
+        entry = self.answers.get(self.question_key(question))
+        return self._answer(entry, "question") if entry else None
+    
+    def answer_for_sql(self, question: str, status_data: Dict[str, Any], standalone: bool,
+                       conversation_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+        key = self.sql_key(generated_sql(status_data))
+        entry = self.answers.get(key) if key else None
+        if entry is None:
+            return None
+        if standalone:
+            # Remember the new phrasing too, so it skips Genie entirely next time
+            self.answers.set(self.question_key(question), entry)
+        return self._answer(entry, "sql", conversation_id, message_id)
+    
+    def sql_answer_ready(self, status_data: Dict[str, Any]) -> bool:
+        """True once Genie has generated SQL whose answer is already cached; stops polling early."""
+        key = self.sql_key(generated_sql(status_data))
+        return key is not None and key in self.answers
+    
+    def remember_answer(self, question: str, response: Dict[str, Any], standalone: bool) -> Dict[str, Any]:
+        if response.get("status") == "success":
+            entry = {"response": response, "cached_at": time.time()}
+            if standalone:
+                self.answers.set(self.question_key(question), entry)
+            sql_key = self.sql_key(response.get("generated_query"))
+            if sql_key:
+                self.answers.set(sql_key, entry)
+        return {**response, "cache": {"hit": False}}
+    
+    def _poll_message(self, status_url: str, headers: Dict[str, str], timeout: float,
+                      stop_when: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Tuple[Dict[str, Any], bool]:
+        """Poll until the message reaches a terminal status or ``stop_when(status_data)``; returns (status_data, timed_out)."""
+        deadline = time.monotonic() + timeout
+        schedule = GeniePollSchedule(settings.GENIE_POLL_INITIAL_INTERVAL, settings.GENIE_POLL_MAX_INTERVAL)
+        status_data: Dict[str, Any] = {}
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return status_data, True
+            time.sleep(min(schedule.next(status_data.get('status')), remaining))
+            status_response = self.session.get(status_url, headers=headers)
+            status_response.raise_for_status()
+            status_data = status_response.json()
+            if status_data.get('status') in TERMINAL_STATUSES or (stop_when and stop_when(status_data)):
+                return status_data, False
+    
+    def _complete(self, status_data: Dict[str, Any], conversation_id: str, message_id: str,
+                  headers: Dict[str, str]) -> Dict[str, Any]:
+        if status_data.get('status') != 'COMPLETED':
+            return self.error_response(f"Genie query failed with status: {status_data.get('status')}")
+        
+        parsed = self.parse_attachments(status_data)
+        
+        if parsed["attachment_id"] and parsed["generated_query"]:
+            state = {"conversation_id": conversation_id, "message_id": message_id, "attachment_id": parsed["attachment_id"]}
+            results_response = self.session.get(self.query_result_url(state), headers=headers)
+            
+            if results_response.status_code == 200:
+                query_results = results_response.json()
+                self._cache_result(query_results)
+                text, parsed["result_page"] = self.render_query_results(query_results, parsed["row_count"], state)
+                parsed["text_response"] += text
+        
+        return self.build_response(parsed, conversation_id, message_id)
+    
+    def handoff_genie_agent(self, query: str) -> str:
+        if not self.is_configured():
+            return json.dumps(self.error_response("Missing Genie configuration"))
+        
+        thread_id = turn_thread_id()
+        standalone = self.is_standalone(thread_id)
+        cached = self.serve_cached(query, thread_id) if standalone else None
+        if cached:
+            return json.dumps(cached)
+        
+        # The slot covers the whole poll budget; answers served from cache never queue
+        with timed_stage("genie_ask", "genie"), limiters["genie"].acquire():
+            return self._ask(query, thread_id, standalone)
+    
+    def _ask(self, query: str, thread_id: Optional[str], standalone: bool) -> str:
+        headers = self.headers()
+        # One poll budget for the whole question, so the tool call returns a job handle in time
+        poll_deadline = time.monotonic() + settings.GENIE_POLL_TIMEOUT_SECONDS
+        conversation_id, message_id, reused = self._start_message(query, headers, thread_id, poll_deadline)
+        status_url = self.message_url(conversation_id, message_id)
+        
+        status_data, timed_out = self._poll_message(
+            status_url, headers, poll_deadline - time.monotonic(), stop_when=self.sql_answer_ready
+        )
+        if not timed_out and status_data.get('status') not in TERMINAL_STATUSES:
+            # Genie generated SQL we already have an answer for: skip waiting for the warehouse
+            cached = self.answer_for_sql(query, status_data, standalone, conversation_id, message_id)
+            if cached:
+                return json.dumps({**cached, "conversation_reused": reused})
+            # The cached answer expired between the check and the read; wait for Genie after all
+            status_data, timed_out = self._poll_message(status_url, headers, poll_deadline - time.monotonic())
+        
+        if timed_out:
+            # Still running: hand the message over to a background job instead of reporting failure
+            job = self._track_job(query, conversation_id, message_id)
+            self.logger.info(f"Genie message {message_id} exceeded the poll budget, continuing as job {job.job_id}")
+            return json.dumps(job.pending_response())
+        
+        response = self._complete(status_data, conversation_id, message_id, headers)
+        return json.dumps({**self.remember_answer(query, response, standalone), "conversation_reused": reused})
+    
+    def start_job(self, query: str, thread_id: Optional[str] = None) -> GenieJob:
+        """Submit a question and return immediately; the answer is collected in the background."""
+        if not self.is_configured():
+            raise ValueError("Missing Genie configuration")
+        with limiters["genie"].acquire():
+            conversation_id, message_id, _ = self._start_message(query, self.headers(), thread_id or turn_thread_id())
+        return self._track_job(query, conversation_id, message_id)
+    
+    def _track_job(self, query: str, conversation_id: str, message_id: str) -> GenieJob:
+        job = GenieJob(query, conversation_id, message_id)
+        self.jobs.set(job.job_id, job)
+        job.task = self.job_executor.submit(self._run_job, job)
+        return job
+    
+    def _run_job(self, job: GenieJob) -> None:
+        headers = self.headers()
+        try:
+            status_url = self.message_url(job.conversation_id, job.message_id)
+            status_data, timed_out = self._poll_message(status_url, headers, settings.GENIE_JOB_TIMEOUT_SECONDS)
+            if timed_out:
+                job.finish(self.error_response(
+                    f"Genie query still {status_data.get('status')} after {settings.GENIE_JOB_TIMEOUT_SECONDS:.0f}s"
+                ))
+            else:
+                response = self._complete(status_data, job.conversation_id, job.message_id, headers)
+                job.finish(self.remember_answer(job.query, response, standalone=False))
+        except Exception as e:
+            self.logger.error(f"Genie job {job.job_id} failed: {e}")
+            job.finish(self.error_response(str(e)))
+    
+    def get_job(self, job_id: str) -> Optional[GenieJob]:
+        return self.jobs.get(job_id)
+    
+    def wait_for_job(self, job_id: str, timeout: float) -> Optional[GenieJob]:
+        job = self.get_job(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
 
 genie_agent_service = GenieAgentService()
\ No newline at end of file
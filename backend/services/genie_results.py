@@ -0,0 +1,146 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+RESULT_FORMATS = ('markdown', 'json')
+
+
+def statement_parts(query_results: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Split a Genie query-result payload into (statement_id, manifest, first result chunk)."""
+    statement = query_results.get('statement_response') or {}
+    result = statement.get('result') or query_results.get('result')
+    return statement.get('statement_id'), statement.get('manifest') or {}, result
+
+
+def column_names(manifest: Dict[str, Any], result: Optional[Dict[str, Any]] = None) -> List[str]:
+    schema = manifest.get('schema') or (result or {}).get('schema') or {}
+    return [col.get('name', f'col_{i}') for i, col in enumerate(schema.get('columns', []))]
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return 'NULL'
+    return str(value).replace('|', '\\|').replace('\n', ' ')
+
+
+def render_markdown(columns: List[str], rows: List[Any], max_rows: Optional[int] = None,
+                    max_bytes: Optional[int] = None) -> Tuple[str, int]:
+    """Render rows as a markdown table in a single pass; returns (table, rows_rendered).
+
+    Rendering stops before the row that would exceed ``max_rows`` or ``max_bytes``.
+    """
+    lines = []
+    if columns:
+        lines.append(f"| {' | '.join(_cell(name) for name in columns)} |")
+        lines.append(f"|{'|'.join(' --- ' for _ in columns)}|")
+    size = sum(len(line.encode('utf-8')) + 1 for line in lines)
+    rendered = 0
+    for row in rows:
+        if max_rows is not None and rendered >= max_rows:
+            break
+        if not isinstance(row, list):
+            continue
+        line = f"| {' | '.join(_cell(value) for value in row)} |"
+        size += len(line.encode('utf-8')) + 1
+        if max_bytes is not None and size > max_bytes and rendered:
+            break
+        lines.append(line)
+        rendered += 1
+    return "\n".join(lines), rendered
+
+
+def render_columnar(columns: List[str], rows: List[Any], max_rows: Optional[int] = None,
+                    max_bytes: Optional[int] = None) -> Tuple[Dict[str, Any], int]:
+    """Column-major JSON ({"columns": [...], "data": [[column values], ...]}); returns (payload, rows_rendered)."""
+    size = len(json.dumps(columns))
+    kept = []
+    for row in rows:
+        if max_rows is not None and len(kept) >= max_rows:
+            break
+        if not isinstance(row, list):
+            continue
+        size += len(json.dumps(row)) + 1
+        if max_bytes is not None and size > max_bytes and kept:
+            break
+        kept.append(row)
+    data = [list(values) for values in zip(*kept)] if kept else [[] for _ in columns]
+    return {"columns": columns, "data": data}, len(kept)
+
+
+def render_rows(fmt: str, columns: List[str], rows: List[Any], max_rows: Optional[int] = None,
+                max_bytes: Optional[int] = None) -> Tuple[str, int]:
+    if fmt == 'json':
+        payload, rendered = render_columnar(columns, rows, max_rows, max_bytes)
+        return json.dumps(payload, default=str), rendered
+    return render_markdown(columns, rows, max_rows, max_bytes)
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid result cursor: {e}")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid result cursor")
+    for key in ('conversation_id', 'message_id', 'attachment_id'):
+        if not isinstance(state.get(key), str) or not state[key]:
+            raise ValueError(f"Invalid result cursor: {key} must be a non-empty string")
+    if state.get('statement_id') is not None and not isinstance(state['statement_id'], str):
+        raise ValueError("Invalid result cursor: statement_id must be a string")
+    offset = state.get('offset')
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid result cursor: offset must be a non-negative integer")
+    return state
+
+
+def manifest_chunks(manifest: Dict[str, Any], first_chunk: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    chunks = manifest.get('chunks')
+    if chunks:
+        return chunks
+    # Without a manifest only the inline chunk is reachable
+    rows = (first_chunk or {}).get('data_array', [])
+    return [{"chunk_index": 0, "row_offset": 0, "row_count": len(rows)}]
+
+
+def plan_chunks(chunks: List[Dict[str, Any]], offset: int, limit: int) -> List[Tuple[int, int, int]]:
+    """Chunks covering rows [offset, offset + limit) as (chunk_index, start, stop) within each chunk."""
+    end = offset + limit
+    plan = []
+    for chunk in sorted(chunks, key=lambda c: c.get('row_offset', 0)):
+        first = chunk.get('row_offset', 0)
+        last = first + chunk.get('row_count', 0)
+        if last <= offset or first >= end:
+            continue
+        plan.append((chunk.get('chunk_index', 0), max(offset, first) - first, min(end, last) - first))
+    return plan
+
+
+def build_result_page(state: Dict[str, Any], manifest: Dict[str, Any], first_chunk: Optional[Dict[str, Any]],
+                      rows: List[Any], fmt: str) -> Dict[str, Any]:
+    offset = state['offset']
+    chunks = manifest_chunks(manifest, first_chunk)
+    total = manifest.get('total_row_count')
+    if total is None:
+        total = sum(chunk.get('row_count', 0) for chunk in chunks)
+    next_offset = offset + len(rows)
+    columns = column_names(manifest, first_chunk)
+
+    page = {
+        "status": "success",
+        "row_offset": offset,
+        "row_count": len(rows),
+        "total_rows": total,
+        "format": fmt,
+        "next_cursor": encode_cursor({**state, "offset": next_offset}) if rows and next_offset < total else None
+    }
+    if fmt == 'json':
+        page.update(render_columnar(columns, rows)[0])
+    else:
+        page["markdown"] = render_markdown(columns, rows)[0]
+    return page
@@ -0,0 +1,167 @@
+import threading
+import time
+from typing import Any, Dict, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from backend.config.settings import settings
+from backend.utils.logging_config import get_logger
+
+RETRY_STATUSES = (429, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class BackendConfig:
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float,
+                 retries: int, retry_methods: frozenset = IDEMPOTENT_METHODS):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.retry_methods = retry_methods
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+
+def default_backends() -> Dict[str, BackendConfig]:
+    connect, read = settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT
+    return {
+        # Purview search is a read-only POST, so it is safe to retry
+        "purview": BackendConfig(settings.PURVIEW_POOL_SIZE, connect, read, settings.HTTP_RETRIES,
+                                 IDEMPOTENT_METHODS | {"POST"}),
+        "genie": BackendConfig(settings.GENIE_POOL_SIZE, connect, read, settings.HTTP_RETRIES),
+        "agents": BackendConfig(settings.AGENTS_POOL_SIZE, connect, settings.AGENTS_READ_TIMEOUT, 0),
+        "downloads": BackendConfig(2, connect, 120.0, settings.HTTP_RETRIES),
+        # Trace export is best-effort; a lost batch is not worth a retry
+        "traces": BackendConfig(1, connect, read, 0),
+    }
+
+
+class InstrumentedSession(requests.Session):
+    """``requests.Session`` that applies backend timeouts by default and tracks pool usage."""
+
+    def __init__(self, name: str, config: BackendConfig):
+        super().__init__()
+        self.name = name
+        self.config = config
+        self._stats_lock = threading.Lock()
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.seconds_total = 0.0
+
+        adapter = HTTPAdapter(
+            pool_connections=config.pool_size,
+            pool_maxsize=config.pool_size,
+            max_retries=Retry(
+                total=config.retries,
+                connect=config.retries,
+                read=config.retries,
+                status=config.retries,
+                backoff_factor=0.2,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=config.retry_methods,
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.adapter = adapter
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.config.timeout)
+        with self._stats_lock:
+            self.requests_total += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.monotonic()
+        try:
+            return super().request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._stats_lock:
+                self.errors_total += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.seconds_total += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        pools = []
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": pool.host,
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": pool.pool.qsize() if pool.pool else 0,
+                "max_size": pool.pool.maxsize if pool.pool else self.config.pool_size
+            })
+        return {
+            "pool_size": self.config.pool_size,
+            "timeout": {"connect": self.config.connect_timeout, "read": self.config.read_timeout},
+            "requests": self.requests_total,
+            "errors": self.errors_total,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_seconds": round(self.seconds_total / self.requests_total, 3) if self.requests_total else 0.0,
+            "pools": pools
+        }
+
+
+class HttpTransport:
+    """Process-wide keep-alive connection pools, one per backend."""
+
+    def __init__(self, backends: Dict[str, BackendConfig] = None):
+        self.logger = get_logger(__name__)
+        self.backends = backends or default_backends()
+        self._sessions: Dict[str, InstrumentedSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self, backend: str) -> InstrumentedSession:
+        session = self._sessions.get(backend)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(backend)
+                if session is None:
+                    session = self._sessions[backend] = InstrumentedSession(backend, self.backends[backend])
+        return session
+
+    def azure_transport(self, backend: str = "agents"):
+        """Azure SDK pipeline transport that shares this backend's pooled session."""
+        from azure.core.pipeline.transport import RequestsTransport
+
+        config = self.backends[backend]
+        return RequestsTransport(
+            session=self.session(backend),
+            session_owner=False,
+            connection_timeout=config.connect_timeout,
+            read_timeout=config.read_timeout
+        )
+
+    def async_client(self, backend: str) -> httpx.AsyncClient:
+        config = self.backends[backend]
+        limits = httpx.Limits(max_connections=config.pool_size, max_keepalive_connections=config.pool_size)
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+            transport=httpx.AsyncHTTPTransport(retries=config.retries, limits=limits)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: session.stats() for name, session in list(self._sessions.items())}
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+http_transport = HttpTransport()
@@ -1,42 +1,162 @@
-from typing import Dict, List, Any
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from azure.ai.agents.models import ListSortOrder
 from azure.ai.projects import AIProjectClient
+from backend.config.settings import settings
+from backend.utils.cache import TTLCache
 from backend.utils.logging_config import get_logger
+from backend.services.metrics import timed_stage
+
+# messages.list serves at most this many messages per request; the pager fetches further pages itself
+LIST_PAGE_SIZE_MAX = 100
+
+def citation_file_ids(messages: Iterable) -> List[str]:
+    """Distinct cited file ids across messages, in first-seen order."""
+    return list(dict.fromkeys(
+        annotation.file_citation.file_id
+        for message in messages
+        for annotation in (getattr(message, 'file_citation_annotations', None) or [])
+    ))
+
+def thread_page_query(limit: Optional[int] = None, before: Optional[str] = None, after: Optional[str] = None,
+                      since: Optional[int] = None) -> Dict[str, Any]:
+    """Validate thread paging parameters into ``messages.list`` arguments.
+
+    Without any parameters the whole thread is returned; its ETag covers only the newest message, so
+    an unchanged thread is answered after one listed page. ``before``/``after`` are message ids in
+    chronological terms; ``after`` and ``since`` (a unix timestamp) return the messages just after
+    the given point. One extra message is read to tell whether more remain.
+    """
+    if sum(value is not None for value in (before, after, since)) > 1:
+        raise ValueError("Use only one of before, after or since")
+    if limit is None and before is None and after is None and since is None:
+        return {"list": {"limit": LIST_PAGE_SIZE_MAX, "order": ListSortOrder.DESCENDING},
+                "limit": None, "fetch": None, "ascending": False, "since": None}
+    limit = settings.THREAD_MESSAGES_PAGE_SIZE if limit is None else limit
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, settings.THREAD_MESSAGES_MAX_PAGE_SIZE)
+    # The service lists newest first; "after" walks forward in time from the cursor instead.
+    # "since" reads newest first down to the timestamp, so a poll costs only the new messages.
+    ascending = after is not None
+    query = {"limit": min(limit + 1, LIST_PAGE_SIZE_MAX),
+             "order": ListSortOrder.ASCENDING if ascending else ListSortOrder.DESCENDING}
+    if before or after:
+        query["after"] = before or after
+    fetch = None if since is not None else limit + 1
+    return {"list": query, "limit": limit, "fetch": fetch, "ascending": ascending, "since": since}
+
+def in_thread_page(message, page_query: Dict[str, Any]) -> bool:
+    """False once a newest-first listing reaches a message at or before ``since``."""
+    since = page_query["since"]
+    return since is None or (message.created_at or 0) > since
+
+def thread_page(messages: List, page_query: Dict[str, Any]) -> Tuple[List, bool]:
+    """Trim the messages read for a page to its limit; returns (messages newest first, has_more)."""
+    limit = page_query["limit"]
+    has_more = limit is not None and len(messages) > limit
+    if page_query["since"] is not None:
+        # Everything newer than ``since`` was read; the page is the oldest of it
+        messages = messages[-limit:]
+    else:
+        messages = messages[:limit]
+    if page_query["ascending"]:
+        messages.reverse()
+    return messages, has_more
+
+def thread_page_etag(thread_id: str, messages: List, has_more: bool) -> str:
+    digest = hashlib.sha256(f"{thread_id}|{has_more}".encode("utf-8"))
+    for message in messages:
+        # In-progress assistant messages keep their id while their content grows
+        digest.update(f"|{message.id}:{getattr(message, 'status', None)}:{getattr(message, 'completed_at', None)}".encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def thread_page_response(thread_id: str, formatted_messages: List[Dict[str, Any]], has_more: bool,
+                         etag: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "messages": formatted_messages,
+        "thread_id": thread_id,
+        "message_count": len(formatted_messages),
+        "has_more": has_more,
+        "first_id": formatted_messages[0]["id"] if formatted_messages else None,
+        "last_id": formatted_messages[-1]["id"] if formatted_messages else None,
+        "etag": etag
+    }
 
 class MessageProcessor:
     def __init__(self, project_client: AIProjectClient):
         self.logger = get_logger(__name__)
         self.project_client = project_client
+        # File metadata never changes for a given id, so names can be cached for a long time
+        self.file_names = TTLCache(
+            settings.FILE_METADATA_CACHE_MAX_ENTRIES, settings.FILE_METADATA_CACHE_TTL_SECONDS, name="file_metadata"
+        )
+        self.lookup_executor = ThreadPoolExecutor(
+            max_workers=settings.FILE_LOOKUP_MAX_WORKERS, thread_name_prefix="file-lookup"
+        )
     
-    def extract_message_with_annotations(self, message) -> Dict[str, Any]:
-        annotations = []
-        content = ""
-        
+    def _load_file_name(self, file_id: str) -> str:
+        with timed_stage("file_lookup"):
+            return self.project_client.agents.files.get(file_id).filename
+    
+    def _file_name(self, file_id: str) -> str:
+        try:
+            return self.file_names.get_or_load(file_id, lambda: self._load_file_name(file_id))
+        except Exception as e:
+            # A deleted or unreadable file should not break the whole message
+            self.logger.warning(f"Could not resolve file {file_id}: {e}")
+            return file_id
+    
+    def resolve_file_names(self, file_ids: Iterable[str]) -> Dict[str, str]:
+        """Names for distinct file ids; uncached ids are looked up concurrently."""
+        file_ids = list(dict.fromkeys(file_ids))
+        missing = [file_id for file_id in file_ids if file_id not in self.file_names]
+        lookup = self.lookup_executor.map if len(missing) > 1 else map
+        names = dict(zip(missing, lookup(self._file_name, missing)))
+        return {file_id: names[file_id] if file_id in names else self._file_name(file_id) for file_id in file_ids}
+    
+    def _message_text(self, message) -> str:
         if hasattr(message, 'content') and message.content:
-            content = message.content[0].text.value if message.content[0].text else ""
+            return message.content[0].text.value if message.content[0].text else ""
+        return ""
+    
+    def extract_message_with_annotations(self, message, file_names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        annotations = []
+        content = self._message_text(message)
         
         if hasattr(message, 'file_citation_annotations'):
-            annotations.extend(self._process_file_citations(message.file_citation_annotations))
+            annotations.extend(self._process_file_citations(message.file_citation_annotations, file_names))
         
         if hasattr(message, 'url_citation_annotations'):
             annotations.extend(self._process_url_citations(message.url_citation_annotations))
         
         return {"content": content, "annotations": annotations}
     
-    def _process_file_citations(self, file_citations: List) -> List[Dict[str, Any]]:
-        annotations = []
-        for annotation in file_citations:
-            file_id = annotation.file_citation.file_id
-            file_info = self.project_client.agents.files.get(file_id)
-            annotations.append({
-                "type": "file_citation",
-                "text": annotation.text,
-                "start_index": annotation.start_index,
-                "end_index": annotation.end_index,
-                "file_id": file_id,
-                "file_name": file_info.filename,
-                "quote": annotation.file_citation.quote
-            })
-        return annotations
+    def _file_citation(self, annotation, file_name: str) -> Dict[str, Any]:
+        return {
+            "type": "file_citation",
+            "text": annotation.text,
+            "start_index": annotation.start_index,
+            "end_index": annotation.end_index,
+            "file_id": annotation.file_citation.file_id,
+            "file_name": file_name,
+            "quote": annotation.file_citation.quote
+        }
+    
+    def _process_file_citations(self, file_citations: List,
+                                file_names: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        if file_names is None:
+            file_names = self.resolve_file_names(annotation.file_citation.file_id for annotation in file_citations)
+        return [self._file_citation(annotation, file_names[annotation.file_citation.file_id])
+                for annotation in file_citations]
     
     def _process_url_citations(self, url_citations: List) -> List[Dict[str, Any]]:
         return [{
@@ -48,16 +168,21 @@ class MessageProcessor:
             "title": annotation.url_citation.title
         } for annotation in url_citations]
     
+    def _format_message(self, message, message_data: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+        return {
+            "id": message.id,
+            "role": message.role,
+            "content": message_data["content"],
+            "annotations": message_data["annotations"],
+            "created_at": message.created_at,
+            "thread_id": thread_id
+        }
+    
     def format_thread_messages(self, messages: List, thread_id: str) -> List[Dict[str, Any]]:
+        # Resolve every cited file of the thread once, before formatting any message
+        file_names = self.resolve_file_names(citation_file_ids(messages))
         formatted_messages = []
         for message in reversed(messages):
-            message_data = self.extract_message_with_annotations(message)
-            formatted_messages.append({
-                "id": message.id,
-                "role": message.role,
-                "content": message_data["content"],
-                "annotations": message_data["annotations"],
-                "created_at": message.created_at,
-                "thread_id": thread_id
-            })
+            message_data = self.extract_message_with_annotations(message, file_names)
+            formatted_messages.append(self._format_message(message, message_data, thread_id))
         return formatted_messages
@@ -0,0 +1,82 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from backend.services.tracing import request_trace
+
+
+class TurnContext:
+    """State shared by every step of one user turn (routing run, tool calls, purview analysis).
+
+    Catalog searches made during the turn are recorded here so later steps can reuse them
+    instead of querying Purview again. In ``combined`` mode every search in the turn is
+    served from the first one.
+    """
+
+    def __init__(self, query: str, thread_id: Optional[str] = None, combined: bool = False):
+        self.query = query
+        self.thread_id = thread_id
+        self.combined = combined
+        self.catalog_results: Dict[str, Dict[str, Any]] = {}
+        self.catalog_searches = 0
+        self.queue_waits: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record_catalog(self, query: str, results: Dict[str, Any]) -> None:
+        with self._lock:
+            self.catalog_results[query] = results
+            self.catalog_searches += 1
+
+    def adopt(self, other: "TurnContext") -> None:
+        """Take over the catalog searches of the duplicate turn whose result this turn shares."""
+        if other is self:
+            return
+        with other._lock:
+            results, searches = dict(other.catalog_results), other.catalog_searches
+        with self._lock:
+            for query, result in results.items():
+                self.catalog_results.setdefault(query, result)
+            self.catalog_searches += searches
+
+    def record_queue_wait(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.queue_waits[name] = self.queue_waits.get(name, 0.0) + seconds
+
+    def queue_wait_snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(seconds, 4) for name, seconds in self.queue_waits.items()}
+
+    def catalog_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Union of every catalog search made so far in this turn, de-duplicated by asset."""
+        with self._lock:
+            if not self.catalog_results:
+                return None
+            assets = {}
+            for results in self.catalog_results.values():
+                for asset in results.get("results", []):
+                    assets.setdefault(asset.get("asset_id"), asset)
+            return {
+                "status": "success",
+                "assets_found": len(assets),
+                "results": list(assets.values()),
+                "queries": list(self.catalog_results.keys())
+            }
+
+
+_current_turn: ContextVar[Optional[TurnContext]] = ContextVar("current_turn", default=None)
+
+
+def current_turn() -> Optional[TurnContext]:
+    return _current_turn.get()
+
+
+@contextmanager
+def turn_context(query: str, thread_id: Optional[str] = None, combined: bool = False) -> Iterator[TurnContext]:
+    turn = TurnContext(query, thread_id, combined)
+    token = _current_turn.set(turn)
+    try:
+        # Every step of the turn reports into one trace
+        with request_trace():
+            yield turn
+    finally:
+        _current_turn.reset(token)
@@ -0,0 +1,259 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from backend.config.settings import settings
+from backend.utils.backoff import Backoff
+from backend.utils.logging_config import get_logger
+
+ACTIVE_STATUSES = ("queued", "in_progress", "requires_action")
+
+RequiredActionHandler = Callable[[Any], List[Dict[str, Any]]]
+EventHandler = Callable[[str, Any], None]
+
+
+@dataclass
+class RunWaitResult:
+    run: Any
+    strategy: str
+    polls: int = 0
+    events: int = 0
+    wait_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    timed_out: bool = False
+    messages: List[Any] = field(default_factory=list)
+    steps: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def stream_complete(self) -> bool:
+        """True when the whole run was observed on the stream, so its messages and steps are final."""
+        return self.strategy == "stream" and not self.timed_out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "polls": self.polls,
+            "events": self.events,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "timed_out": self.timed_out
+        }
+
+
+def is_run_event(event_type: str) -> bool:
+    # Run step events also carry a status but describe the step, not the run
+    return event_type.startswith("thread.run.") and not event_type.startswith("thread.run.step.")
+
+
+def capture_run_output(result: RunWaitResult, event_type: str, event_data) -> None:
+    """Keep completed messages and the latest state of each run step seen on the stream."""
+    if event_type == "thread.message.completed":
+        result.messages.append(event_data)
+    elif event_type.startswith("thread.run.step.") and event_type != "thread.run.step.delta":
+        if getattr(event_data, 'id', None):
+            result.steps[event_data.id] = event_data
+
+
+def _tool_call_ids(run) -> tuple:
+    tool_calls = getattr(getattr(getattr(run, 'required_action', None), 'submit_tool_outputs', None), 'tool_calls', None) or []
+    return tuple(getattr(tool_call, 'id', None) for tool_call in tool_calls)
+
+
+class PollingRunWaiter:
+    """Polls ``runs.get`` with exponential backoff and jitter until the run settles or the deadline passes."""
+
+    name = "poll"
+
+    def __init__(self, runs_client, initial_interval: float = None, max_interval: float = None,
+                 timeout: float = None):
+        self.logger = get_logger(__name__)
+        self.runs = runs_client
+        self.initial_interval = initial_interval if initial_interval is not None else settings.RUN_POLL_INITIAL_INTERVAL
+        self.max_interval = max_interval if max_interval is not None else settings.RUN_POLL_MAX_INTERVAL
+        self.timeout = timeout if timeout is not None else settings.RUN_TIMEOUT_SECONDS
+
+    def execute(self, thread_id: str, agent_id: str, on_requires_action: Optional[RequiredActionHandler] = None,
+                on_event: Optional[EventHandler] = None) -> RunWaitResult:
+        started = time.monotonic()
+        run = self.runs.create(thread_id=thread_id, agent_id=agent_id)
+        return self.wait(thread_id, run, on_requires_action, on_event, started=started)
+
+    def wait(self, thread_id: str, run, on_requires_action: Optional[RequiredActionHandler] = None,
+             on_event: Optional[EventHandler] = None, started: float = None,
+             result: RunWaitResult = None, handled_action: Optional[tuple] = None) -> RunWaitResult:
+        started = started if started is not None else time.monotonic()
+        deadline = started + self.timeout
+        result = result or RunWaitResult(run=run, strategy=self.name)
+        backoff = Backoff(self.initial_interval, self.max_interval)
+        last_status = None
+
+        while run.status in ACTIVE_STATUSES:
+            if run.status != last_status:
+                last_status = run.status
+                if on_event:
+                    on_event(f"thread.run.{run.status}", run)
+
+            if run.status == "requires_action" and on_requires_action:
+                action_key = _tool_call_ids(run)
+                if action_key != handled_action:
+                    handled_action = action_key
+                    tool_outputs = on_requires_action(run)
+                    if tool_outputs:
+                        self.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs)
+                    backoff.reset()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result.timed_out = True
+                break
+
+            delay = min(backoff.next(), remaining)
+            time.sleep(delay)
+            result.wait_seconds += delay
+            run = self.runs.get(thread_id=thread_id, run_id=run.id)
+            result.polls += 1
+
+        if on_event and not result.timed_out:
+            on_event(f"thread.run.{run.status}", run)
+
+        result.run = run
+        result.elapsed_seconds = time.monotonic() - started
+        return result
+
+
+class StreamWatchdog:
+    """Closes a run stream that sends nothing for ``idle_timeout`` seconds or is still waiting at ``deadline``.
+
+    The clock only runs while the consumer waits for the next event, not while it handles one.
+    """
+
+    def __init__(self, stream, idle_timeout: float, deadline: float):
+        self.stream = stream
+        self.idle_timeout = idle_timeout
+        self.deadline = deadline
+        self.fired = False
+        self._waiting_since: Optional[float] = time.monotonic()
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="run-stream-watchdog", daemon=True)
+
+    def __enter__(self) -> "StreamWatchdog":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def pause(self) -> None:
+        with self._condition:
+            self._waiting_since = None
+
+    def resume(self) -> None:
+        with self._condition:
+            self._waiting_since = time.monotonic()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._stopped:
+                if self._waiting_since is None:
+                    self._condition.wait()
+                    continue
+                remaining = min(self._waiting_since + self.idle_timeout, self.deadline) - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self.fired = True
+                break
+        if self.fired:
+            # Unblocks the consumer's read; it then falls back to polling or reports the timeout
+            close = getattr(self.stream, "close", None)
+            if close:
+                close()
+
+
+class StreamingRunWaiter:
+    """Consumes the runs streaming API and falls back to polling if the stream ends before the run settles."""
+
+    name = "stream"
+
+    def __init__(self, runs_client, fallback: PollingRunWaiter = None, timeout: float = None,
+                 idle_timeout: float = None):
+        self.logger = get_logger(__name__)
+        self.runs = runs_client
+        self.fallback = fallback or PollingRunWaiter(runs_client, timeout=timeout)
+        self.timeout = timeout if timeout is not None else settings.RUN_TIMEOUT_SECONDS
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.RUN_STREAM_IDLE_TIMEOUT_SECONDS
+
+    def execute(self, thread_id: str, agent_id: str, on_requires_action: Optional[RequiredActionHandler] = None,
+                on_event: Optional[EventHandler] = None) -> RunWaitResult:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        result = RunWaitResult(run=None, strategy=self.name)
+        handled_action = None
+        mark = started
+
+        with self.runs.stream(thread_id=thread_id, agent_id=agent_id) as stream, \
+                StreamWatchdog(stream, self.idle_timeout, deadline) as watchdog:
+            try:
+                for event_type, event_data, _ in stream:
+                    watchdog.pause()
+                    if watchdog.fired:
+                        break
+                    result.wait_seconds += time.monotonic() - mark
+                    result.events += 1
+                    if on_event:
+                        on_event(str(event_type), event_data)
+                    capture_run_output(result, str(event_type), event_data)
+
+                    if is_run_event(str(event_type)) and hasattr(event_data, 'status'):
+                        result.run = event_data
+
+                    if event_type == "thread.run.requires_action" and on_requires_action:
+                        action_key = _tool_call_ids(event_data)
+                        if action_key != handled_action:
+                            handled_action = action_key
+                            tool_outputs = on_requires_action(event_data)
+                            self.runs.submit_tool_outputs_stream(
+                                thread_id=thread_id, run_id=event_data.id,
+                                tool_outputs=tool_outputs, event_handler=stream
+                            )
+
+                    mark = time.monotonic()
+                    if mark >= deadline:
+                        result.timed_out = True
+                        break
+                    watchdog.resume()
+            except Exception:
+                # Reading a stream the watchdog closed may raise; anything else is a real failure
+                if not watchdog.fired:
+                    raise
+
+        if watchdog.fired:
+            result.wait_seconds += time.monotonic() - mark
+            if time.monotonic() >= deadline:
+                result.timed_out = True
+            else:
+                self.logger.warning(f"Run stream on thread {thread_id} sent nothing for {self.idle_timeout:.0f}s")
+
+        if result.run is None:
+            raise RuntimeError(f"Run stream on thread {thread_id} ended without any run events")
+
+        if result.run.status in ACTIVE_STATUSES and not result.timed_out:
+            self.logger.warning(f"Run stream for {result.run.id} ended while {result.run.status}, polling for completion")
+            result.strategy = f"{self.name}+{self.fallback.name}"
+            # Tool calls already answered on the stream must not be run and submitted again
+            return self.fallback.wait(thread_id, result.run, on_requires_action, on_event,
+                                      started=started, result=result, handled_action=handled_action)
+
+        result.elapsed_seconds = time.monotonic() - started
+        return result
+
+
+def create_run_waiter(runs_client, strategy: str = None):
+    strategy = strategy or settings.RUN_WAIT_STRATEGY
+    if strategy in ("auto", "stream") and hasattr(runs_client, "stream"):
+        return StreamingRunWaiter(runs_client)
+    return PollingRunWaiter(runs_client)
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from backend.config.settings import settings
+from backend.services.admission import LimitExceededError
+from backend.services.request_context import current_turn
+from backend.services.tracing import record_span
+
+
+class _ThreadTurns:
+    """Arrival-ordered tickets for one agent thread, plus the turns that later duplicates can join."""
+
+    def __init__(self):
+        self.next_ticket = 0
+        self.serving = 0
+        self.pending = 0
+        self.abandoned = set()
+        self.flights: Dict[Hashable, Any] = {}
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.turn = None
+
+
+class ThreadTurnSerializer:
+    """Runs turns on the same agent thread one at a time, in arrival order.
+
+    The agents service allows a single active run per thread, so a second turn waits for the
+    first instead of failing or racing it. A turn with the same ``coalesce_key`` as one already
+    queued or running (a double submit) shares that turn's result instead of starting another run:
+    it takes over the leader's catalog searches and gets ``share(result)``, so the caller can give
+    it its own trace and timings.
+    Per-thread state exists only while turns are pending, so memory is bounded by in-flight turns.
+    """
+
+    name = "thread_turn"
+
+    def __init__(self, queue_depth: int = None):
+        self.queue_depth = queue_depth if queue_depth is not None else settings.THREAD_TURN_QUEUE_DEPTH
+        self._threads: Dict[str, _ThreadTurns] = {}
+        self._condition = threading.Condition()
+        self.queued = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _enter(self, thread_id: str, coalesce_key: Optional[Hashable], new_flight: Callable[[], Any]):
+        """Register a turn; returns (turns, ticket, flight, leader). Caller holds the condition."""
+        turns = self._threads.get(thread_id)
+        if turns is None:
+            turns = self._threads[thread_id] = _ThreadTurns()
+        flight = turns.flights.get(coalesce_key) if coalesce_key is not None else None
+        if flight is not None:
+            self.coalesced += 1
+            return turns, None, flight, False
+        if turns.pending > self.queue_depth:
+            self.rejected += 1
+            raise LimitExceededError(
+                f"thread {thread_id}", f"{turns.pending} turns pending", settings.ADMISSION_RETRY_AFTER_SECONDS
+            )
+        if turns.pending:
+            self.queued += 1
+        ticket = turns.next_ticket
+        turns.next_ticket += 1
+        turns.pending += 1
+        if coalesce_key is not None:
+            flight = turns.flights[coalesce_key] = new_flight()
+        return turns, ticket, flight, True
+
+    def _leave(self, thread_id: str, turns: _ThreadTurns, ticket: int, coalesce_key: Optional[Hashable]) -> None:
+        """Hand the thread to the next ticket. Caller holds the condition."""
+        if ticket == turns.serving:
+            turns.serving += 1
+            while turns.serving in turns.abandoned:
+                turns.abandoned.discard(turns.serving)
+                turns.serving += 1
+        else:
+            # Cancelled while still queued: skip this ticket when its turn comes
+            turns.abandoned.add(ticket)
+        turns.pending -= 1
+        if coalesce_key is not None:
+            turns.flights.pop(coalesce_key, None)
+        if turns.pending == 0:
+            del self._threads[thread_id]
+
+    @staticmethod
+    def _record_wait(started: float) -> None:
+        waited = time.perf_counter() - started
+        turn = current_turn()
+        if turn:
+            turn.record_queue_wait(ThreadTurnSerializer.name, waited)
+        record_span(f"queue.{ThreadTurnSerializer.name}", started, waited)
+
+    @staticmethod
+    def _share(started: float, value: Any, leader_turn, share: Optional[Callable[[Any], Any]]) -> Any:
+        """The duplicate's view of the leader's result."""
+        ThreadTurnSerializer._record_wait(started)
+        turn = current_turn()
+        if turn and leader_turn:
+            turn.adopt(leader_turn)
+        return share(value) if share else value
+
+    def run(self, thread_id: str, fn: Callable[[], Any], coalesce_key: Optional[Hashable] = None,
+            share: Optional[Callable[[Any], Any]] = None) -> Any:
+        started = time.perf_counter()
+        with self._condition:
+            turns, ticket, flight, leader = self._enter(thread_id, coalesce_key, _Flight)
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self._share(started, flight.value, flight.turn, share)
+
+        with self._condition:
+            self._condition.wait_for(lambda: turns.serving == ticket)
+        self._record_wait(started)
+        try:
+            value = fn()
+            if flight is not None:
+                flight.value, flight.turn = value, current_turn()
+            return value
+        except Exception as e:
+            if flight is not None:
+                flight.error = e
+            raise
+        finally:
+            with self._condition:
+                self._leave(thread_id, turns, ticket, coalesce_key)
+                self._condition.notify_all()
+            if flight is not None:
+                flight.event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_threads": len(self._threads),
+            "queue_depth": self.queue_depth,
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected
+        }
+
+
+class AsyncThreadTurnSerializer(ThreadTurnSerializer):
+    """Event-loop counterpart of ``ThreadTurnSerializer``; duplicates await the leader's future."""
+
+    def __init__(self, queue_depth: int = None):
+        super().__init__(queue_depth)
+        self._condition = None
+
+    async def run(self, thread_id: str, fn: Callable[[], Awaitable[Any]], coalesce_key: Optional[Hashable] = None,
+                  share: Optional[Callable[[Any], Any]] = None) -> Any:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        started = time.perf_counter()
+        async with self._condition:
+            turns, ticket, flight, leader = self._enter(
+                thread_id, coalesce_key, lambda: asyncio.get_running_loop().create_future()
+            )
+        if not leader:
+            value, leader_turn = await asyncio.shield(flight)
+            return self._share(started, value, leader_turn, share)
+
+        try:
+            async with self._condition:
+                await self._condition.wait_for(lambda: turns.serving == ticket)
+            self._record_wait(started)
+            value = await fn()
+            if flight is not None:
+                flight.set_result((value, current_turn()))
+            return value
+        except asyncio.CancelledError:
+            if flight is not None and not flight.done():
+                flight.cancel()
+            raise
+        except Exception as e:
+            if flight is not None and not flight.done():
+                flight.set_exception(e)
+                # Mark it retrieved; there may be no duplicate waiting on it
+                flight.exception()
+            raise
+        finally:
+            async with self._condition:
+                self._leave(thread_id, turns, ticket, coalesce_key)
+                self._condition.notify_all()
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from azure.identity import AzureCliCredential, DefaultAzureCredential
+from backend.config.settings import settings
+from backend.utils.logging_config import get_logger
+
+PURVIEW_SCOPE = "https://purview.azure.net/.default"
+AI_PROJECT_SCOPE = "https://ai.azure.com/.default"
+
+# Tokens this close to expiry are treated as stale so in-flight requests don't carry them past expiry
+EXPIRY_SKEW_SECONDS = 30
+
+
+class TokenProvider:
+    """Shared Azure credential that caches access tokens per scope.
+
+    Tokens are refreshed on a background timer ``refresh_margin`` seconds before they
+    expire, so callers only block on the very first acquisition of a scope. The
+    provider implements ``get_token`` and can be passed anywhere a ``TokenCredential``
+    is expected.
+    """
+
+    def __init__(self, credential=None, refresh_margin: float = None, retry_interval: float = 30.0):
+        self.logger = get_logger(__name__)
+        self._credential = credential
+        self.refresh_margin = refresh_margin if refresh_margin is not None else settings.TOKEN_REFRESH_MARGIN_SECONDS
+        self.retry_interval = retry_interval
+        self._tokens: Dict[Tuple[str, ...], Any] = {}
+        self._timers: Dict[Tuple[str, ...], threading.Timer] = {}
+        self._scope_locks: Dict[Tuple[str, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.cache_hits = 0
+
+    @property
+    def credential(self):
+        if self._credential is None:
+            self._credential = AzureCliCredential() if settings.AZURE_CREDENTIAL == 'cli' else DefaultAzureCredential()
+        return self._credential
+
+    def _scope_lock(self, key: Tuple[str, ...]) -> threading.Lock:
+        with self._lock:
+            return self._scope_locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, token) -> bool:
+        return token is not None and token.expires_on - time.time() > EXPIRY_SKEW_SECONDS
+
+    def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None, **kwargs):
+        if claims or tenant_id:
+            # Challenge-driven requests must hit the credential directly
+            return self.credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+
+        key = tuple(scopes)
+        token = self._tokens.get(key)
+        if self._fresh(token):
+            self.cache_hits += 1
+            return token
+
+        with self._scope_lock(key):
+            token = self._tokens.get(key)
+            if self._fresh(token):
+                self.cache_hits += 1
+                return token
+            return self._acquire(key)
+
+    def _acquire(self, key: Tuple[str, ...]):
+        token = self.credential.get_token(*key)
+        self.acquisitions += 1
+        self._tokens[key] = token
+        expires_in = token.expires_on - time.time()
+        # Short-lived tokens are refreshed at half-life rather than in a tight loop
+        self._schedule_refresh(key, max(expires_in - self.refresh_margin, expires_in / 2, 1.0))
+        return token
+
+    def _schedule_refresh(self, key: Tuple[str, ...], delay: float) -> None:
+        timer = threading.Timer(max(delay, 0.0), self._refresh, args=(key,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._timers[key] = timer
+        timer.start()
+
+    def _refresh(self, key: Tuple[str, ...]) -> None:
+        with self._scope_lock(key):
+            try:
+                self._acquire(key)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_failures += 1
+                self.logger.warning(f"Background token refresh for {key} failed, retrying: {e}")
+                current = self._tokens.get(key)
+                remaining = current.expires_on - time.time() if current else 0
+                self._schedule_refresh(key, min(self.retry_interval, max(remaining / 2, 1.0)))
+
+    def prefetch(self, *scopes: str) -> None:
+        """Acquire a token in the background so the first request does not pay for it."""
+        def warm():
+            try:
+                self.get_token(*scopes)
+            except Exception as e:
+                self.logger.warning(f"Token prefetch for {scopes} failed: {e}")
+        threading.Thread(target=warm, name="token-prefetch", daemon=True).start()
+
+    async def get_token_async(self, *scopes: str, **kwargs):
+        token = self._tokens.get(tuple(scopes))
+        if not (kwargs.get('claims') or kwargs.get('tenant_id')) and self._fresh(token):
+            self.cache_hits += 1
+            return token
+        return await asyncio.to_thread(self.get_token, *scopes, **kwargs)
+
+    def as_async(self) -> "AsyncTokenProvider":
+        return AsyncTokenProvider(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # Clients entering the credential as a context manager must not stop the shared refresher
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "scopes": {
+                " ".join(key): {"expires_in_seconds": int(token.expires_on - now)}
+                for key, token in list(self._tokens.items())
+            },
+            "acquisitions": self.acquisitions,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "cache_hits": self.cache_hits
+        }
+
+
+class AsyncTokenProvider:
+    """``AsyncTokenCredential`` view over a shared ``TokenProvider``."""
+
+    def __init__(self, provider: TokenProvider):
+        self.provider = provider
+
+    async def get_token(self, *scopes: str, **kwargs):
+        return await self.provider.get_token_async(*scopes, **kwargs)
+
+    async def close(self) -> None:
+        # The underlying provider is process-wide and outlives any single client
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+token_provider = TokenProvider()
@@ -0,0 +1,198 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from backend.config.settings import settings
+from backend.services.http_transport import http_transport
+from backend.utils.logging_config import get_logger
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "duration", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, start: Optional[float] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.perf_counter() if start is None else start
+        self.duration: Optional[float] = None
+        self.attributes = attributes or {}
+
+
+class Trace:
+    """Spans recorded during one API request, reported in the response and optionally exported."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def report(self) -> Dict[str, Any]:
+        """Finished spans so far, with start offsets relative to the beginning of the request."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "elapsed_seconds": round(time.perf_counter() - self.origin, 4),
+            "spans": [{
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "start_seconds": round(span.start - self.origin, 4),
+                "duration_seconds": round(span.duration, 4),
+                **span.attributes
+            } for span in spans]
+        }
+
+    def to_otlp(self, service_name: str) -> Dict[str, Any]:
+        """The trace as an OTLP/HTTP JSON export request."""
+        def nanos(perf: float) -> str:
+            return str(int((self.started_at + perf - self.origin) * 1e9))
+
+        with self._lock:
+            spans = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [{
+                    "traceId": self.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": nanos(span.start),
+                    "endTimeUnixNano": nanos(span.start + span.duration),
+                    "attributes": [{"key": key, "value": {"stringValue": str(value)}}
+                                   for key, value in span.attributes.items()],
+                    "status": {"code": 2 if span.attributes.get("outcome") == "error" else 1}
+                } for span in spans]
+            }]
+        }]}
+
+
+class TraceExporter:
+    """Posts finished traces to an OTLP/HTTP collector from a background thread.
+
+    Requests never wait on the collector: traces are queued, and dropped once the queue is full.
+    """
+
+    def __init__(self, endpoint: str, service_name: str, max_queue: int):
+        self.logger = get_logger(__name__)
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace: Trace) -> None:
+        if not trace.spans:
+            return
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        session = http_transport.session("traces")
+        while True:
+            trace = self.queue.get()
+            try:
+                response = session.post(self.endpoint, json=trace.to_otlp(self.service_name))
+                response.raise_for_status()
+                self.exported += 1
+            except Exception as e:
+                self.failed += 1
+                self.logger.warning(f"Could not export trace {trace.trace_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "queued": self.queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+exporter = TraceExporter(
+    settings.TRACE_EXPORT_ENDPOINT, settings.TRACE_SERVICE_NAME, settings.TRACE_EXPORT_QUEUE_SIZE
+) if settings.TRACE_EXPORT_ENDPOINT else None
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def request_trace() -> Iterator[Trace]:
+    """Join the trace of the enclosing request, or start one that is exported when this block ends."""
+    trace = _current_trace.get()
+    if trace is not None:
+        yield trace
+        return
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if exporter is not None:
+            exporter.submit(trace)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Record a child of the current span on the current trace; a no-op outside of a request."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    record = Span(name, parent.span_id if parent else None, attributes=attributes)
+    token = _current_span.set(record)
+    try:
+        yield record
+    finally:
+        _current_span.reset(token)
+        record.duration = time.perf_counter() - record.start
+        trace.add(record)
+
+
+def trace_metadata() -> Dict[str, Any]:
+    """``trace_id`` and ``timings`` for response metadata; empty outside of a request."""
+    trace = _current_trace.get()
+    return {"trace_id": trace.trace_id, "timings": trace.report()} if trace else {}
+
+
+def record_span(name: str, start: float, duration: float, **attributes) -> None:
+    """Add an already finished span (e.g. time spent queued) under the current span."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    record = Span(name, parent.span_id if parent else None, start, attributes)
+    record.duration = duration
+    trace.add(record)
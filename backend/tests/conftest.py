@@ -42,6 +42,7 @@ def _ensure_azure_stubs():
         "BingGroundingTool": _BaseTool,
         "FileSearchTool": _FileSearchTool,
         "FilePurpose": SimpleNamespace(AGENTS="agents"),
+        "ListSortOrder": SimpleNamespace(ASCENDING="asc", DESCENDING="desc"),
     }
 
     for name, value in stubs.items():
@@ -70,5 +71,28 @@ def _ensure_azure_stubs():
                 pass
         projects_module.AIProjectClient = _AIProjectClient
 
+    transport_module = _ensure_module("azure.core.pipeline.transport")
+    if not hasattr(transport_module, "RequestsTransport"):
+        class _RequestsTransport:
+            def __init__(self, **kwargs):
+                self.kwargs = kwargs
+        transport_module.RequestsTransport = _RequestsTransport
+
+    exceptions_module = _ensure_module("azure.core.exceptions")
+    if not hasattr(exceptions_module, "ResourceNotFoundError"):
+        class _ResourceNotFoundError(Exception):
+            status_code = 404
+        exceptions_module.ResourceNotFoundError = _ResourceNotFoundError
+
+    projects_aio_module = _ensure_module("azure.ai.projects.aio")
+    if not hasattr(projects_aio_module, "AIProjectClient"):
+        class _AsyncAIProjectClient:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            async def close(self):
+                pass
+        projects_aio_module.AIProjectClient = _AsyncAIProjectClient
+
 
 _ensure_azure_stubs()
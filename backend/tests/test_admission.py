@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.services.admission import AsyncConcurrencyLimiter, ConcurrencyLimiter, LimitExceededError
+from backend.services.request_context import turn_context
+
+
+def test_limiter_queues_up_to_depth_then_rejects():
+    limiter = ConcurrencyLimiter("genie", limit=1, queue_depth=1, queue_timeout=2, retry_after=3)
+    holding = threading.Event()
+    release = threading.Event()
+    waits = []
+
+    def hold():
+        with limiter.acquire():
+            holding.set()
+            release.wait(2)
+
+    def queued():
+        with turn_context("q") as turn:
+            with limiter.acquire() as waited:
+                waits.append((waited, turn.queue_wait_snapshot()))
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(2)
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    while limiter.waiting == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(LimitExceededError) as rejected:
+        with limiter.acquire():
+            pass
+    assert rejected.value.retry_after == 3
+
+    time.sleep(0.02)
+    release.set()
+    holder.join()
+    waiter.join()
+
+    waited, snapshot = waits[0]
+    assert waited >= 0.02
+    assert snapshot["genie"] == pytest.approx(waited, abs=1e-3)
+    assert limiter.get_stats()["rejected"] == 1
+    assert limiter.get_stats()["in_flight"] == 0
+
+
+def test_limiter_rejects_after_queue_timeout():
+    limiter = ConcurrencyLimiter("catalog_search", limit=1, queue_depth=5, queue_timeout=0.01)
+
+    with limiter.acquire():
+        with pytest.raises(LimitExceededError):
+            with limiter.acquire():
+                pass
+    assert limiter.waiting == 0
+
+
+def test_disabled_limiter_never_queues():
+    limiter = ConcurrencyLimiter("agent_runs", limit=0, queue_depth=0)
+
+    with limiter.acquire() as first, limiter.acquire() as second:
+        assert first == second == 0.0
+
+
+def test_async_limiter_bounds_concurrency_and_sheds_overflow():
+    limiter = AsyncConcurrencyLimiter("agent_runs", limit=2, queue_depth=1, queue_timeout=1)
+    peak = {"now": 0, "max": 0}
+
+    async def call():
+        async with limiter.acquire():
+            peak["now"] += 1
+            peak["max"] = max(peak["max"], peak["now"])
+            await asyncio.sleep(0.01)
+            peak["now"] -= 1
+
+    async def main():
+        return await asyncio.gather(*(call() for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert peak["max"] == 2
+    assert sum(isinstance(result, LimitExceededError) for result in results) == 1
@@ -0,0 +1,132 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+
+from backend.services.agent_factory import AgentFactory
+from backend.services.agent_registry import AgentRegistry, definition_fingerprint
+
+
+class RecordingAgents:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+        self.uploads = 0
+        self.existing = set()
+        self.files = SimpleNamespace(upload_and_poll=self._upload, delete=lambda file_id: self.deleted.append(file_id))
+        self.vector_stores = SimpleNamespace(
+            create_and_poll=self._create_vector_store,
+            get=self._get,
+            delete=lambda vs_id: self.deleted.append(vs_id)
+        )
+
+    def _upload(self, file_path, purpose):
+        self.uploads += 1
+        return SimpleNamespace(id=f"file-{self.uploads}")
+
+    def _create_vector_store(self, file_ids, name):
+        vs = SimpleNamespace(id=f"vs-{file_ids[0]}")
+        self.existing.add(vs.id)
+        return vs
+
+    def _get(self, resource_id):
+        if resource_id not in self.existing:
+            raise ResourceNotFoundError(resource_id)
+        return SimpleNamespace(id=resource_id)
+
+    def create_agent(self, **definition):
+        agent = SimpleNamespace(id=f"{definition['name']}-{len(self.created) + 1}")
+        self.created.append(definition["name"])
+        self.existing.add(agent.id)
+        return agent
+
+    def get_agent(self, agent_id):
+        return self._get(agent_id)
+
+    def delete_agent(self, agent_id):
+        self.deleted.append(agent_id)
+        self.existing.discard(agent_id)
+
+
+def build_factory(tmp_path, agents):
+    registry = AgentRegistry(tmp_path / "registry.json", scope="https://project")
+    return AgentFactory(SimpleNamespace(agents=agents), registry=registry)
+
+
+def test_fingerprint_ignores_tool_order():
+    tools_a = [SimpleNamespace(name="search"), SimpleNamespace(name="genie")]
+    tools_b = list(reversed(tools_a))
+
+    assert definition_fingerprint({"model": "m", "tools": tools_a}) == definition_fingerprint({"model": "m", "tools": tools_b})
+    assert definition_fingerprint({"model": "m", "tools": tools_a}) != definition_fingerprint({"model": "n", "tools": tools_a})
+
+
+def test_unchanged_agent_is_reused_after_restart(monkeypatch, tmp_path):
+    monkeypatch.setattr("backend.services.agent_factory.settings.MODEL_DEPLOYMENT_NAME", "gpt")
+    agents = RecordingAgents()
+
+    first = build_factory(tmp_path, agents).create_web_agent()
+    second_factory = build_factory(tmp_path, agents)
+    second = second_factory.create_web_agent()
+
+    assert second.id == first.id
+    assert agents.created == ["web-agent"]
+    assert second_factory.registry.get_stats()["reused"] == 1
+
+
+def test_changed_definition_replaces_the_agent(monkeypatch, tmp_path):
+    agents = RecordingAgents()
+    monkeypatch.setattr("backend.services.agent_factory.settings.MODEL_DEPLOYMENT_NAME", "gpt")
+    first = build_factory(tmp_path, agents).create_web_agent()
+
+    monkeypatch.setattr("backend.services.agent_factory.settings.MODEL_DEPLOYMENT_NAME", "gpt-next")
+    second = build_factory(tmp_path, agents).create_web_agent()
+
+    assert second.id != first.id
+    assert agents.deleted == [first.id]
+    stored = json.loads((tmp_path / "registry.json").read_text())
+    assert stored["scopes"]["https://project"]["web-agent"]["id"] == second.id
+
+
+def test_missing_remote_agent_is_recreated(monkeypatch, tmp_path):
+    monkeypatch.setattr("backend.services.agent_factory.settings.MODEL_DEPLOYMENT_NAME", "gpt")
+    agents = RecordingAgents()
+    first = build_factory(tmp_path, agents).create_web_agent()
+    agents.existing.clear()
+
+    second = build_factory(tmp_path, agents).create_web_agent()
+
+    assert second.id != first.id
+    assert agents.created == ["web-agent", "web-agent"]
+
+
+def test_rag_agent_reuses_vector_store(monkeypatch, tmp_path):
+    monkeypatch.setattr("backend.services.agent_factory.settings.MODEL_DEPLOYMENT_NAME", "gpt")
+    monkeypatch.setattr("backend.services.agent_factory.DATA_DIR", tmp_path)
+    (tmp_path / "encarta_guide.pdf").write_bytes(b"%PDF-1.4 encarta")
+    agents = RecordingAgents()
+
+    first_agent, first_resources = build_factory(tmp_path, agents).create_rag_agent()
+    second_agent, second_resources = build_factory(tmp_path, agents).create_rag_agent()
+
+    assert agents.uploads == 1
+    assert second_resources["vector_store"].id == first_resources["vector_store"].id
+    assert second_resources["file_id"] == "file-1"
+    assert second_agent.id == first_agent.id
+
+
+def test_transient_fetch_failure_keeps_the_registered_agent(monkeypatch, tmp_path):
+    monkeypatch.setattr("backend.services.agent_factory.settings.MODEL_DEPLOYMENT_NAME", "gpt")
+    agents = RecordingAgents()
+    build_factory(tmp_path, agents).create_web_agent()
+
+    def unavailable(agent_id):
+        raise RuntimeError("503 Service Unavailable")
+
+    agents.get_agent = unavailable
+    with pytest.raises(RuntimeError):
+        build_factory(tmp_path, agents).create_web_agent()
+
+    assert agents.created == ["web-agent"]
+    assert agents.deleted == []
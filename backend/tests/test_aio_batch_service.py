@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+from backend.services.aio.batch_service import run_batch
+from backend.services.batch_service import item_result, parse_batch_request
+
+
+def test_async_run_batch_bounds_concurrency_and_yields_summary():
+    items, _ = parse_batch_request({"queries": ["a", "b", "c", "d"]})
+    active = {"now": 0, "peak": 0}
+
+    async def process(item):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return item_result(item, time.perf_counter(), {"success": True})
+
+    async def collect():
+        return [line async for line in run_batch(items, 2, process=process)]
+
+    lines = asyncio.run(collect())
+
+    assert active["peak"] == 2
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2, 3]
+    assert lines[-1]["succeeded"] == 4
@@ -0,0 +1,42 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from backend.services.aio.catalog_service import AsyncCatalogService
+
+
+class DummyCredential:
+    async def get_token(self, scope):
+        assert scope == "https://purview.azure.net/.default"
+        return SimpleNamespace(token="token-value")
+
+
+def test_search_catalog_builds_results(monkeypatch):
+    monkeypatch.setattr("backend.services.catalog_service.settings.PURVIEW_ENDPOINT", "https://purview.test")
+
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer token-value"
+        assert json.loads(request.content)["keywords"] == "sales"
+        return httpx.Response(200, json={
+            "value": [
+                {
+                    "displayText": "Sales Report",
+                    "userDescription": "Agent: rag_agent",
+                    "id": "asset-1",
+                    "contact": [{"id": "c53c736b-8469-409c-9dcc-b3a61953d4dd"}],
+                }
+            ]
+        })
+
+    service = AsyncCatalogService(
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        credential=DummyCredential(),
+    )
+
+    result = asyncio.run(service.search_catalog("sales"))
+
+    assert result["assets_found"] == 1
+    assert result["results"][0]["connected_agent"] == "rag_agent"
+    assert result["results"][0]["contact"] == "Aymen Furter (aymen.furter@microsoft.com)"
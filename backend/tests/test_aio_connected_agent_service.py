@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.aio.connected_agent_service import AsyncConnectedAgentService
+from backend.services.aio.run_waiter import AsyncPollingRunWaiter
+
+
+class AsyncItems:
+    def __init__(self, items):
+        self.items = list(items)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self.items:
+            yield item
+
+
+class AsyncRuns:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.submitted = []
+
+    async def create(self, thread_id, agent_id):
+        return SimpleNamespace(id="run-1", status="queued")
+
+    async def get(self, thread_id, run_id):
+        return self.responses.pop(0)
+
+    async def submit_tool_outputs(self, **kwargs):
+        self.submitted.append(kwargs)
+
+
+class AsyncProjectClient:
+    def __init__(self, runs, messages=(), steps=()):
+        async def create_thread():
+            return SimpleNamespace(id="thread-1")
+
+        async def create_message(**kwargs):
+            pass
+
+        self.agents = SimpleNamespace(
+            threads=SimpleNamespace(create=create_thread),
+            messages=SimpleNamespace(create=create_message, list=lambda thread_id, **kwargs: AsyncItems(messages)),
+            run_steps=SimpleNamespace(list=lambda thread_id, run_id: AsyncItems(steps)),
+            runs=runs,
+        )
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    async def fake_sleep(_):
+        pass
+    monkeypatch.setattr("backend.services.aio.run_waiter.asyncio.sleep", fake_sleep)
+
+
+def build_service(runs, **kwargs):
+    provisioner = SimpleNamespace(main_agent=SimpleNamespace(id="main-1"), connected_agents={})
+    service = AsyncConnectedAgentService(provisioner=provisioner)
+    service.project_client = AsyncProjectClient(runs, **kwargs)
+    service.run_waiter = AsyncPollingRunWaiter(runs, initial_interval=0.01, timeout=5)
+    service.message_processor = SimpleNamespace()
+    service._initialized = True
+    return service
+
+
+def test_process_query_runs_tool_calls_concurrently(monkeypatch):
+    tool_calls = [
+        SimpleNamespace(id="call-1", function=SimpleNamespace(name="search_catalog", arguments=json.dumps({"query": "a"}))),
+        SimpleNamespace(id="call-2", function=SimpleNamespace(name="handoff_genie_agent", arguments=json.dumps({"query": "b"}))),
+    ]
+    runs = AsyncRuns([
+        SimpleNamespace(id="run-1", status="requires_action",
+                        required_action=SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls))),
+        SimpleNamespace(id="run-1", status="completed"),
+    ])
+    service = build_service(runs, steps=[SimpleNamespace(step_details=SimpleNamespace(tool_calls=[
+        SimpleNamespace(type="connected_agent", connected_agent={"name": "web_agent"})
+    ]))])
+
+    async def slow_search(query):
+        await asyncio.sleep(0.05)
+        return {"assets_found": 1}
+
+    async def slow_genie(query):
+        await asyncio.sleep(0.05)
+        return json.dumps({"status": "success"})
+
+    monkeypatch.setattr("backend.services.aio.connected_agent_service.async_catalog_service",
+                        SimpleNamespace(search_catalog=slow_search))
+    monkeypatch.setattr("backend.services.aio.connected_agent_service.async_genie_agent_service",
+                        SimpleNamespace(handoff_genie_agent=slow_genie))
+
+    started = time.monotonic()
+    result = asyncio.run(service.process_query("find data"))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.1
+    assert result["response"] == "No response generated"
+    assert result["metadata"]["tools_called"] == ["search_catalog('a')", "handoff_genie_agent('b')"]
+    assert result["metadata"]["connected_agents_called"] == ["web_agent"]
+    assert [output["tool_call_id"] for output in runs.submitted[0]["tool_outputs"]] == ["call-1", "call-2"]
+
+
+def test_stream_query_yields_events():
+    runs = AsyncRuns([SimpleNamespace(id="run-1", status="completed")])
+    service = build_service(runs)
+
+    async def collect():
+        return [event async for event, _ in service.stream_query("hello")]
+
+    events = asyncio.run(collect())
+    assert events[0] == "thread"
+    assert events[-2:] == ["delta", "done"]
+
+
+def test_analyze_purview_reuses_catalog_results_from_the_turn(monkeypatch):
+    from backend.services.request_context import turn_context
+
+    searches = []
+
+    async def fake_search(query):
+        searches.append(query)
+        return {"status": "success", "assets_found": 1,
+                "results": [{"asset_id": "a1", "name": "encarta", "type": "rag", "description": ""}]}
+
+    monkeypatch.setattr("backend.services.aio.connected_agent_service.async_catalog_service.search_catalog", fake_search)
+    service = build_service(AsyncRuns([]))
+
+    async def scenario():
+        with turn_context("encarta"):
+            await service._catalog_results("encarta")
+            return await service.analyze_purview("encarta")
+
+    analysis = asyncio.run(scenario())
+
+    assert analysis["catalog_source"] == "turn"
+    assert searches == ["encarta"]
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.services.aio.genie_agent_service import AsyncGenieAgentService
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    async def fake_sleep(_):
+        pass
+    monkeypatch.setattr("backend.services.aio.genie_agent_service.asyncio.sleep", fake_sleep)
+
+
+def configure(service):
+    service.databricks_instance = "test.cloud"
+    service.genie_space_id = "space"
+    service.auth_token = "token"
+    return service
+
+
+def test_handoff_genie_agent_success():
+    status_calls = {"count": 0}
+
+    def handler(request):
+        if request.method == "POST":
+            assert json.loads(request.content) == {"content": "give me data"}
+            return httpx.Response(200, json={"conversation": {"id": "conv-1"}, "message": {"id": "msg-1"}})
+        if "query-result" in request.url.path:
+            return httpx.Response(200, json={"statement_response": {"result": {
+                "data_array": [["a", 1]],
+                "schema": {"columns": [{"name": "col1"}, {"name": "col2"}]},
+            }}})
+        status_calls["count"] += 1
+        if status_calls["count"] == 1:
+            return httpx.Response(200, json={"status": "RUNNING"})
+        return httpx.Response(200, json={"status": "COMPLETED", "attachments": [{
+            "text": {"content": "analysis"},
+            "query": {"query": "SELECT 1", "description": "d", "query_result_metadata": {"row_count": 1}},
+            "attachment_id": "att-1",
+        }]})
+
+    service = configure(AsyncGenieAgentService(httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    payload = json.loads(asyncio.run(service.handoff_genie_agent("give me data")))
+
+    assert payload["status"] == "success"
+    assert payload["response"].startswith("analysis")
+    assert "col1 | col2" in payload["response"]
+    assert payload["generated_query"] == "SELECT 1"
+
+
+def test_handoff_genie_agent_missing_configuration():
+    service = AsyncGenieAgentService()
+    service.databricks_instance = None
+    payload = json.loads(asyncio.run(service.handoff_genie_agent("query")))
+    assert payload["status"] == "error"
+
+
+def test_start_job_completes_in_background():
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(200, json={"conversation": {"id": "conv-1"}, "message": {"id": "msg-1"}})
+        return httpx.Response(200, json={"status": "COMPLETED", "attachments": [{"text": {"content": "done"}}]})
+
+    async def scenario():
+        service = configure(AsyncGenieAgentService(httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+        job = await service.start_job("question")
+        assert job.status == "running"
+        return await service.wait_for_job(job.job_id, timeout=2)
+
+    job = asyncio.run(scenario())
+    assert job.status == "completed"
+    assert job.result["response"] == "done"
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from backend.services import batch_service
+from backend.services.batch_service import parse_batch_request, run_batch
+
+
+def test_parse_batch_request_applies_default_agent_and_caps_concurrency(monkeypatch):
+    monkeypatch.setattr(batch_service.settings, "BATCH_MAX_CONCURRENCY", 3)
+
+    items, concurrency = parse_batch_request({
+        "queries": ["first", {"query": " second ", "agent": "genie", "id": "q2"}],
+        "agent": "web",
+        "concurrency": 10,
+    })
+
+    assert [(item["query"], item["agent"]) for item in items] == [("first", "web"), ("second", "genie")]
+    assert items[1]["id"] == "q2"
+    assert concurrency == 3
+
+
+@pytest.mark.parametrize("body", [
+    {}, {"queries": []}, {"queries": [""]}, {"queries": ["q"], "agent": "nope"},
+    {"queries": [{"query": "q", "agent": 5}]}, {"queries": ["q"], "agent": 5}, {"queries": [{"query": 5}]},
+    {"queries": [5]}, {"queries": ["q"], "concurrency": "many"}, ["q"],
+])
+def test_parse_batch_request_rejects_invalid_bodies(body):
+    with pytest.raises(ValueError):
+        parse_batch_request(body)
+
+
+def test_run_batch_streams_results_as_they_complete_within_the_limit():
+    items, _ = parse_batch_request({"queries": ["slow", "fast", "broken"]})
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def process(item):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05 if item["query"] == "slow" else 0.01)
+        with lock:
+            active["now"] -= 1
+        if item["query"] == "broken":
+            return batch_service.item_result(item, time.perf_counter(), error="boom")
+        return batch_service.item_result(item, time.perf_counter(), {"success": True})
+
+    lines = list(run_batch(items, 2, process=process))
+
+    assert lines[2]["query"] == "slow"
+    assert active["peak"] == 2
+    assert lines[-1] == {**lines[-1], "type": "summary", "items": 3, "succeeded": 2, "failed": 1}
+
+
+def test_process_batch_item_reports_errors(monkeypatch):
+    def fail(query, thread_id):
+        raise RuntimeError("agent unavailable")
+
+    monkeypatch.setattr(batch_service.connected_agent_service, "process_query", fail)
+    items, _ = parse_batch_request({"queries": ["q"]})
+
+    line = batch_service.process_batch_item(items[0])
+
+    assert line["status"] == "error"
+    assert line["agent"] == "router"
+    assert line["error"] == "agent unavailable"
@@ -0,0 +1,25 @@
+import backend.benchmarks.cases  # noqa: F401
+from backend.benchmarks.runner import CASES, compare, load_baseline, run_cases, save_baseline
+
+
+def test_every_case_runs_at_small_scale():
+    results = run_cases(scale=0.01, repeat=1)
+
+    assert set(results) == set(CASES)
+    assert all(result["min_seconds"] > 0 for result in results.values())
+
+
+def test_stored_baseline_covers_every_case():
+    assert set(load_baseline()["results"]) == set(CASES)
+
+
+def test_compare_flags_only_cases_beyond_tolerance(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline({"fast": {"min_seconds": 0.010}, "slow": {"min_seconds": 0.010}}, path)
+
+    regressions = compare(
+        {"fast": {"min_seconds": 0.012}, "slow": {"min_seconds": 0.020}, "new": {"min_seconds": 1.0}},
+        load_baseline(path), tolerance=1.5
+    )
+
+    assert [(regression["name"], regression["ratio"]) for regression in regressions] == [("slow", 2.0)]
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.utils.cache import TTLCache
+
+
+def test_get_set_and_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("backend.utils.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=4, ttl_seconds=10)
+
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_or_load_collapses_concurrent_loads():
+    cache = TTLCache()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_get_or_load_does_not_cache_errors():
+    cache = TTLCache()
+
+    def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
+
+
+def test_aget_or_load_collapses_concurrent_loads():
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(cache.aget_or_load("k", loader) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["value"] * 3
+    assert calls == [1]
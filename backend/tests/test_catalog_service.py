@@ -53,8 +53,8 @@ def test_search_catalog_builds_results(monkeypatch):
         }
         return DummyResponse(payload)
 
-    monkeypatch.setattr("backend.services.catalog_service.AzureCliCredential", DummyCredential)
-    monkeypatch.setattr("backend.services.catalog_service.requests.post", fake_post)
+    monkeypatch.setattr("backend.services.catalog_service.token_provider", DummyCredential())
+    monkeypatch.setattr(service.session, "post", fake_post)
 
     result = service.search_catalog("sales")
 
@@ -65,3 +65,27 @@ def test_search_catalog_builds_results(monkeypatch):
     # Contact id is mapped through the contacts dictionary
     assert assets["Sales Report"]["contact"] == "Aymen Furter (aymen.furter@microsoft.com)"
     assert assets["Marketing Data"]["contact"] is None
+
+
+def test_search_catalog_caches_normalized_keywords(monkeypatch):
+    service = CatalogService()
+    posts = []
+
+    class DummyCredential:
+        def get_token(self, scope):
+            return SimpleNamespace(token="token-value")
+
+    def fake_post(url, json, headers):
+        posts.append(json["keywords"])
+        return DummyResponse({"value": [{"displayText": "Sales", "userDescription": None, "id": "asset-1"}]})
+
+    monkeypatch.setattr("backend.services.catalog_service.token_provider", DummyCredential())
+    monkeypatch.setattr(service.session, "post", fake_post)
+
+    first = service.search_catalog("Sales")
+    first["results"].clear()
+    second = service.search_catalog("  sales ")
+
+    assert posts == ["Sales"]
+    assert second["assets_found"] == 1 and len(second["results"]) == 1
+    assert service.cache.stats()["hits"] == 1
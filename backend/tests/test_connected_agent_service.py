@@ -1,9 +1,26 @@
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from types import SimpleNamespace
 
 import pytest
 
-from backend.services.connected_agent_service import ConnectedAgentService
+from azure.core.exceptions import ResourceNotFoundError
+
+from backend.config.settings import settings
+from backend.services.connected_agent_service import (
+    ConnectedAgentService,
+    ServiceNotReadyError,
+    ThreadUnavailableError,
+    relay_run_events,
+    shared_turn_result,
+    tool_timeout,
+)
+from backend.services.metrics import DELEGATIONS, STAGE_SECONDS
+from backend.services.request_context import turn_context
+from backend.services.run_waiter import RunWaitResult
+from backend.services.tracing import request_trace
 
 
 class StubAgent:
@@ -18,6 +35,9 @@ class RecordingProjectClient:
         self.files_deleted = []
         self.messages_created = []
         self.message_list = []
+        self.list_calls = []
+        self.messages_read = 0
+        self.thread_gets = []
         self.thread_to_return = SimpleNamespace(id="thread-1")
 
         class Threads:
@@ -25,9 +45,12 @@ class RecordingProjectClient:
                 self.outer = outer
 
             def get(self, thread_id):
+                self.outer.thread_gets.append(thread_id)
                 if thread_id == "existing":
                     return SimpleNamespace(id=thread_id)
-                raise RuntimeError("missing thread")
+                if thread_id == "flaky":
+                    raise TimeoutError("read timed out")
+                raise ResourceNotFoundError("missing thread")
 
             def create(self):
                 return self.outer.thread_to_return
@@ -39,8 +62,13 @@ class RecordingProjectClient:
             def create(self, **kwargs):
                 self.outer.messages_created.append(kwargs)
 
-            def list(self, thread_id):
-                return list(self.outer.message_list)
+            def list(self, thread_id, **kwargs):
+                self.outer.list_calls.append(kwargs)
+                # message_list is newest first, as the service lists by default
+                messages = list(self.outer.message_list)
+                for message in messages[::-1] if kwargs.get("order") == "asc" else messages:
+                    self.outer.messages_read += 1
+                    yield message
 
         class Runs:
             def __init__(self, outer):
@@ -104,16 +132,18 @@ def service():
     return ConnectedAgentService()
 
 
-def test_initialize_creates_agents(monkeypatch, service):
+def test_initialize_creates_agents(monkeypatch, service, tmp_path):
     created_agents = {}
+    monkeypatch.setattr("backend.services.connected_agent_service.settings.AGENT_REGISTRY_PATH", str(tmp_path / "registry.json"))
 
     class DummyAIProjectClient:
-        def __init__(self, endpoint, credential):
+        def __init__(self, endpoint, credential, transport=None):
             self.endpoint = endpoint
             self.credential = credential
+            self.transport = transport
 
     class DummyAgentFactory:
-        def __init__(self, project_client):
+        def __init__(self, project_client, registry=None):
             assert isinstance(project_client, DummyAIProjectClient)
 
         def create_fabric_agent(self):
@@ -123,7 +153,7 @@ def test_initialize_creates_agents(monkeypatch, service):
             return StubAgent("web-1")
 
         def create_rag_agent(self):
-            return StubAgent("rag-1"), {"vector_store": StubAgent("vs-1"), "file": StubAgent("file-1")}
+            return StubAgent("rag-1"), {"vector_store": StubAgent("vs-1"), "file_id": "file-1"}
 
         def create_routing_agent(self, connected_agents, search_fn, genie_fn):
             created_agents["connected"] = dict(connected_agents)
@@ -134,7 +164,7 @@ def test_initialize_creates_agents(monkeypatch, service):
             self.project_client = project_client
 
     monkeypatch.setattr("backend.services.connected_agent_service.AIProjectClient", DummyAIProjectClient)
-    monkeypatch.setattr("backend.services.connected_agent_service.DefaultAzureCredential", lambda: "creds")
+    monkeypatch.setattr("backend.services.connected_agent_service.token_provider", SimpleNamespace(prefetch=lambda scope: None))
     monkeypatch.setattr("backend.services.connected_agent_service.AgentFactory", DummyAgentFactory)
     monkeypatch.setattr("backend.services.connected_agent_service.MessageProcessor", DummyMessageProcessor)
 
@@ -145,6 +175,37 @@ def test_initialize_creates_agents(monkeypatch, service):
     assert "rag_agent" in created_agents["connected"]
 
 
+def test_specialist_agents_are_provisioned_concurrently(service):
+    barrier = threading.Barrier(3, timeout=2)
+    order = []
+
+    def specialist(agent, resources=None):
+        def create():
+            barrier.wait()
+            order.append(agent.id)
+            return (agent, resources) if resources is not None else agent
+        return create
+
+    def create_routing_agent(connected_agents, search_fn, genie_fn):
+        order.append("main")
+        return StubAgent("main-1")
+
+    service.agent_factory = SimpleNamespace(
+        create_fabric_agent=specialist(StubAgent("fabric-1")),
+        create_web_agent=specialist(StubAgent("web-1")),
+        create_rag_agent=specialist(StubAgent("rag-1"), {"vector_store": StubAgent("vs-1")}),
+        create_routing_agent=create_routing_agent,
+    )
+
+    service._create_all_agents()
+
+    assert order[-1] == "main"
+    assert list(service.connected_agents) == ["fabric_agent", "web_agent", "rag_agent"]
+    provisioning = service.get_health_status()["provisioning"]
+    assert set(provisioning["agents"]) == {"fabric_agent", "web_agent", "rag_agent", "routing_agent"}
+    assert provisioning["total_seconds"] is not None
+
+
 def test_initialize_short_circuits_when_already_initialized(monkeypatch, service):
     service._initialized = True
 
@@ -157,16 +218,16 @@ def test_initialize_short_circuits_when_already_initialized(monkeypatch, service
 
 
 def test_analyze_purview_varies_with_results(service):
-    service._search_catalog = lambda query: json.dumps({
+    service._catalog_results = lambda query: {
         "assets_found": 1,
         "results": [{"connected_agent": "genie"}]
-    })
+    }
     success = service.analyze_purview("sales")
     assert success["success"] is True
     assert "Primary agent" in success["purview"]
     assert success["confidence"] == 0.8
 
-    service._search_catalog = lambda query: json.dumps({"assets_found": 0, "results": []})
+    service._catalog_results = lambda query: {"assets_found": 0, "results": []}
     no_assets = service.analyze_purview("weather")
     assert "No relevant data assets" in no_assets["purview"]
     assert no_assets["confidence"] == 0.3
@@ -199,41 +260,68 @@ def test_process_query_direct_succeeds(monkeypatch, service):
     service.connected_agents = {"web_agent": StubAgent("web-1")}
 
     def fake_get_or_create(thread_id=None):
-        return SimpleNamespace(id="thread-1")
+        return SimpleNamespace(id="thread-1"), {"source": "created", "seconds": 0.0}
 
     def fake_execute_agent_run(thread_id, agent_id):
-        return SimpleNamespace(id="run-1", status="completed")
+        return RunWaitResult(run=SimpleNamespace(id="run-1", status="completed"), strategy="poll", polls=2)
 
-    def fake_extract_response(thread_id):
+    def fake_extract_response(thread_id, run_result, agent="router"):
         return "final response", ["note"]
 
     service._get_or_create_thread = fake_get_or_create
     service._execute_agent_run = fake_execute_agent_run
-    service._extract_response_from_thread = fake_extract_response
+    service._extract_response = fake_extract_response
 
     result = service.process_query_direct("hi", "web_agent")
     assert result["metadata"]["agent_used"] == "web_agent"
     assert result["response"] == "final response"
+    assert result["metadata"]["run_wait"]["polls"] == 2
     assert project_client.messages_created[0]["content"] == "hi"
 
 
 def test_process_query_combines_tool_details(service):
     project_client = prepare_service_with_project_client(service)
 
-    service._get_or_create_thread = lambda thread_id=None: SimpleNamespace(id="thread-2")
-    service._execute_routing_run = lambda thread_id: (
-        SimpleNamespace(id="run-2", status="completed"), ["tool_a"]
+    service._get_or_create_thread = lambda thread_id=None: (SimpleNamespace(id="thread-2"), {"source": "cache"})
+    service._execute_routing_run = lambda thread_id, on_event=None: (
+        RunWaitResult(run=SimpleNamespace(id="run-2", status="completed"), strategy="poll"), ["tool_a"]
     )
-    service._extract_response_from_thread = lambda thread_id: ("answer", [])
-    service._extract_run_details = lambda thread_id, run_id: (["rag_agent"], ["tool_b"])
+    service._extract_response = lambda thread_id, run_result: ("answer", [])
+    service._extract_run_details = lambda thread_id, run_result: (["rag_agent"], ["tool_b"])
 
     result = service.process_query("find data")
     metadata = result["metadata"]
     assert metadata["tools_called"] == ["tool_a", "tool_b"]
+    assert set(metadata["queue_wait"]) == {"agent_runs"}
     assert metadata["connected_agents_called"] == ["rag_agent"]
     assert project_client.messages_created[0]["role"] == "user"
 
 
+def test_process_query_reports_trace_timings(service):
+    prepare_service_with_project_client(service)
+    service._execute_routing_run = lambda thread_id, on_event=None: (
+        RunWaitResult(run=SimpleNamespace(id="run-3", status="completed"), strategy="poll"), []
+    )
+    service._extract_response = lambda thread_id, run_result: ("answer", [])
+    service._extract_run_details = lambda thread_id, run_result: ([], [])
+    service._catalog_results = lambda query: {"assets_found": 0, "results": []}
+
+    with turn_context("find data"):
+        metadata = service.process_query("find data")["metadata"]
+        analysis = service.analyze_purview("find data")
+
+    spans = {span["name"]: span for span in metadata["timings"]["spans"]}
+    assert len(metadata["trace_id"]) == 32
+    assert spans["thread_lookup"]["outcome"] == "created"
+    assert spans["run_wait"]["agent"] == "router"
+    assert spans["run_wait"]["outcome"] == "completed"
+    assert spans["queue.agent_runs"]["parent_id"] is not None
+    assert spans["message_create"]["start_seconds"] <= spans["run_wait"]["start_seconds"]
+    # The analysis joins the request trace, so its report also covers the routing turn
+    assert analysis["metadata"]["trace_id"] == metadata["trace_id"]
+    assert "process_query" in {span["name"] for span in analysis["metadata"]["timings"]["spans"]}
+
+
 def test_get_thread_messages_returns_formatted(service):
     project_client = prepare_service_with_project_client(service)
     project_client.message_list = [SimpleNamespace(id="msg", role="assistant", created_at=1)]
@@ -243,6 +331,117 @@ def test_get_thread_messages_returns_formatted(service):
     assert result["messages"][0]["thread_id"] == "thread-1"
 
 
+def test_get_thread_messages_without_parameters_returns_the_whole_thread(service):
+    project_client = prepare_service_with_project_client(service)
+    project_client.message_list = [SimpleNamespace(id=f"msg-{i}", role="user", created_at=i) for i in range(250, 0, -1)]
+
+    result = service.get_thread_messages("thread-1")
+    assert project_client.list_calls[-1] == {"limit": 100, "order": "desc"}
+    assert result["message_count"] == 250
+    assert result["first_id"] == "msg-1" and result["last_id"] == "msg-250"
+    assert result["has_more"] is False
+
+    project_client.messages_read = 0
+    unchanged = service.get_thread_messages("thread-1", if_none_match=result["etag"])
+    assert unchanged["not_modified"] is True
+    assert project_client.messages_read == 1
+
+
+def test_get_thread_messages_pages_with_cursor_and_etag(service):
+    project_client = prepare_service_with_project_client(service)
+    project_client.message_list = [SimpleNamespace(id=f"msg-{i}", role="user", created_at=i) for i in (3, 2, 1)]
+
+    result = service.get_thread_messages("thread-1", limit=2, before="msg-4")
+    assert project_client.list_calls[-1] == {"limit": 3, "order": "desc", "after": "msg-4"}
+    assert [message["id"] for message in result["messages"]] == ["msg-2", "msg-3"]
+    assert result["has_more"] is True
+    assert result["first_id"] == "msg-2"
+
+    formatted = []
+    service.message_processor.format_thread_messages = lambda messages, thread_id: formatted.append(1) or []
+    unchanged = service.get_thread_messages("thread-1", limit=2, before="msg-4", if_none_match=result["etag"])
+    assert unchanged["not_modified"] is True
+    assert formatted == []
+
+
+def test_get_thread_messages_since_and_invalid_parameters(service):
+    project_client = prepare_service_with_project_client(service)
+    project_client.message_list = [SimpleNamespace(id=f"msg-{i}", role="user", created_at=i) for i in (3, 2, 1)]
+
+    result = service.get_thread_messages("thread-1", since=1)
+    assert project_client.list_calls[-1]["order"] == "desc"
+    assert [message["id"] for message in result["messages"]] == ["msg-2", "msg-3"]
+    assert result["has_more"] is False
+
+    project_client.message_list = [SimpleNamespace(id=f"msg-{i}", role="user", created_at=i) for i in range(500, 0, -1)]
+    project_client.messages_read = 0
+    result = service.get_thread_messages("thread-1", limit=2, since=496)
+    assert [message["id"] for message in result["messages"]] == ["msg-497", "msg-498"]
+    assert result["has_more"] is True
+    # Only the new messages and the one that ends the walk are read
+    assert project_client.messages_read == 5
+
+    with pytest.raises(ValueError):
+        service.get_thread_messages("thread-1", before="msg-1", after="msg-2")
+
+
+def test_concurrent_initialize_provisions_once(monkeypatch, service):
+    calls = []
+
+    def slow_initialize():
+        calls.append(1)
+        time.sleep(0.05)
+
+    monkeypatch.setattr(service, "_initialize", slow_initialize)
+    threads = [threading.Thread(target=service.initialize) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert service.get_readiness()["state"] == "ready"
+
+
+def test_ensure_ready_waits_for_warmup_instead_of_provisioning(monkeypatch, service):
+    release = threading.Event()
+    calls = []
+
+    def blocking_initialize():
+        calls.append(1)
+        release.wait(2)
+
+    monkeypatch.setattr(service, "_initialize", blocking_initialize)
+    service.start_warmup()
+
+    with pytest.raises(ServiceNotReadyError):
+        service.ensure_ready(timeout=0.01)
+    assert service.get_readiness()["state"] == "warming_up"
+
+    release.set()
+    service.ensure_ready(timeout=2)
+    assert calls == [1]
+    assert service.get_readiness()["ready"] is True
+
+
+def test_failed_warmup_is_retried_by_the_next_request(monkeypatch, service):
+    attempts = []
+
+    def flaky_initialize():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("endpoint unavailable")
+
+    monkeypatch.setattr(service, "_initialize", flaky_initialize)
+    service.start_warmup()
+    service._warmup_thread.join(2)
+    assert service.get_readiness() == {"ready": False, "state": "failed", "error": "endpoint unavailable"}
+
+    service.ensure_ready()
+    assert len(attempts) == 2
+    assert service.get_readiness()["ready"] is True
+
+
 def test_get_health_status(service):
     health = service.get_health_status()
     assert health["service"] == "Connected Agent Service"
@@ -254,7 +453,7 @@ def test_cleanup_removes_resources(service):
     service.project_client = project_client
     service.main_agent = StubAgent("main")
     service.connected_agents = {"web": StubAgent("web-id")}
-    service.cleanup_resources = {"vector_store": StubAgent("vs"), "file": StubAgent("file")}
+    service.cleanup_resources = {"vector_store": StubAgent("vs"), "file_id": "file"}
 
     service.cleanup()
 
@@ -263,27 +462,53 @@ def test_cleanup_removes_resources(service):
     assert project_client.files_deleted == ["file"]
 
 
-def test_extract_response_from_thread_picks_first_assistant(service):
+def polled_run(run_id="run-1"):
+    return RunWaitResult(run=SimpleNamespace(id=run_id, status="completed"), strategy="poll")
+
+
+def test_extract_response_picks_first_assistant_of_the_run(service):
     project_client = prepare_service_with_project_client(service)
     service.project_client.message_list = [
         SimpleNamespace(role="user"),
         SimpleNamespace(role="assistant", content=[SimpleNamespace(text=SimpleNamespace(value="ignore"))]),
     ]
 
-    response, annotations = service._extract_response_from_thread("thread-1")
+    response, annotations = service._extract_response("thread-1", polled_run())
     assert response == "assistant reply"
     assert annotations == ["note"]
+    assert project_client.list_calls == [{"run_id": "run-1", "limit": 5, "order": "desc"}]
 
 
-def test_extract_response_from_thread_handles_missing(service):
+def test_extract_response_handles_missing(service):
     project_client = prepare_service_with_project_client(service)
     service.project_client.message_list = [SimpleNamespace(role="user")]
 
-    response, annotations = service._extract_response_from_thread("thread-1")
+    response, annotations = service._extract_response("thread-1", polled_run())
     assert response == "No response generated"
     assert annotations == []
 
 
+def test_extract_run_output_uses_streamed_messages_and_steps(service):
+    project_client = prepare_service_with_project_client(service)
+    seen = []
+    service.message_processor.extract_message_with_annotations = lambda message: seen.append(message) or {
+        "content": "streamed", "annotations": []
+    }
+    step = SimpleNamespace(id="step-1", step_details=SimpleNamespace(tool_calls=[
+        SimpleNamespace(type="connected_agent", connected_agent={"name": "web_agent"})
+    ]))
+    answer = SimpleNamespace(role="assistant", id="msg-2")
+    run_result = RunWaitResult(run=SimpleNamespace(id="run-1", status="completed"), strategy="stream",
+                               messages=[SimpleNamespace(role="assistant", id="msg-1"), answer],
+                               steps={"step-1": step})
+
+    (response, _), (connected, _) = service._extract_run_output("thread-1", run_result)
+    assert response == "streamed"
+    assert seen == [answer]
+    assert connected == ["web_agent"]
+    assert project_client.list_calls == []
+
+
 def test_extract_run_details_collects_tools(service):
     project_client = prepare_service_with_project_client(service)
 
@@ -303,39 +528,88 @@ def test_extract_run_details_collects_tools(service):
         SimpleNamespace(step_details=SimpleNamespace(tool_calls=[connected_call, function_call, search_call]))
     ]
 
-    connected, tools = service._extract_run_details("thread", "run")
+    connected, tools = service._extract_run_details("thread", polled_run())
     assert connected == ["rag_agent"]
     assert tools == ["handoff_genie_agent(...)"]
 
 
+def test_tool_calls_and_delegations_are_metered(monkeypatch, service):
+    project_client = prepare_service_with_project_client(service)
+    service._catalog_results = lambda query: {"status": "success", "assets_found": 0}
+    monkeypatch.setattr(
+        "backend.services.connected_agent_service.genie_agent_service",
+        SimpleNamespace(handoff_genie_agent=lambda query: json.dumps({"status": "pending", "job_id": "job-1"}))
+    )
+    project_client.agents.run_steps.steps = [SimpleNamespace(step_details=SimpleNamespace(tool_calls=[
+        SimpleNamespace(type="connected_agent", connected_agent={"name": "metered_agent"})
+    ]))]
+
+    def count(stage, outcome):
+        series = STAGE_SECONDS._series.get((stage, "router", outcome))
+        return sum(series[0]) if series else 0
+
+    before = count("tool.handoff_genie_agent", "pending"), count("tool.search_catalog", "success")
+    service._handle_required_action(
+        tool_call_run(("call-1", "search_catalog", "a"), ("call-2", "handoff_genie_agent", "b")), []
+    )
+    service._extract_run_details("thread", polled_run())
+
+    assert count("tool.handoff_genie_agent", "pending") == before[0] + 1
+    assert count("tool.search_catalog", "success") == before[1] + 1
+    assert count("run_details", "listed") >= 1
+    assert DELEGATIONS._values[("metered_agent",)] == 1.0
+
+
 def test_get_or_create_thread_returns_existing(service):
     service.project_client = RecordingProjectClient()
-    thread = service._get_or_create_thread("existing")
+    thread, lookup = service._get_or_create_thread("existing")
     assert thread.id == "existing"
+    assert lookup["source"] == "verified"
 
-    thread = service._get_or_create_thread("missing")
+    thread, lookup = service._get_or_create_thread("missing")
     assert thread.id == "thread-1"
+    assert lookup["source"] == "recreated"
+
+
+def test_get_or_create_thread_skips_verification_for_known_threads(service):
+    service.project_client = RecordingProjectClient()
+    created, _ = service._get_or_create_thread()
+    service._get_or_create_thread("existing")
+
+    assert service._get_or_create_thread(created.id)[1]["source"] == "cache"
+    assert service._get_or_create_thread("existing")[1]["source"] == "cache"
+    assert service.project_client.thread_gets == ["existing"]
+
+
+def test_get_or_create_thread_raises_on_transient_errors(service):
+    service.project_client = RecordingProjectClient()
+
+    with pytest.raises(ThreadUnavailableError):
+        service._get_or_create_thread("flaky")
+    assert "flaky" not in service.known_threads
 
 
 def test_execute_agent_run_advances_until_complete(monkeypatch, service):
     service.project_client = RecordingProjectClient()
     responses = [SimpleNamespace(id="run-created", status="in_progress"), SimpleNamespace(id="run-created", status="completed")]
     service.project_client.agents.runs.get_responses = responses
-    monkeypatch.setattr("backend.services.connected_agent_service.time.sleep", lambda _: None)
+    monkeypatch.setattr("backend.services.run_waiter.time.sleep", lambda _: None)
 
-    run = service._execute_agent_run("thread-1", "agent-1")
-    assert run.status == "completed"
+    result = service._execute_agent_run("thread-1", "agent-1")
+    assert result.run.status == "completed"
+    assert result.polls == 2
+    assert result.strategy == "poll"
 
 
 def test_execute_routing_run_handles_tool_calls(monkeypatch, service):
     service.project_client = RecordingProjectClient()
     service.main_agent = StubAgent("main-1")
-    service._search_catalog = lambda query: json.dumps({"assets_found": 0})
+    service._catalog_results = lambda query: {"assets_found": 0}
     monkeypatch.setattr(
         "backend.services.connected_agent_service.genie_agent_service",
         SimpleNamespace(handoff_genie_agent=lambda query: json.dumps({"status": "success"}))
     )
-    monkeypatch.setattr("backend.services.connected_agent_service.time.sleep", lambda _: None)
+    monkeypatch.setattr("backend.services.run_waiter.time.sleep", lambda _: None)
 
     tool_calls = [
         SimpleNamespace(
@@ -354,9 +628,236 @@ def test_execute_routing_run_handles_tool_calls(monkeypatch, service):
     ]
     service.project_client.agents.runs.get_responses = responses
 
-    run, tools = service._execute_routing_run("thread-1")
-    assert run.status == "completed"
+    result, tools = service._execute_routing_run("thread-1")
+    assert result.run.status == "completed"
     assert tools == ["search_catalog('catalog')", "handoff_genie_agent('sales')"]
     submitted = service.project_client.agents.runs.submitted[0]
     assert submitted["thread_id"] == "thread-1"
     assert len(submitted["tool_outputs"]) == 2
+
+
+def test_execute_agent_run_cancels_on_timeout(monkeypatch, service):
+    service.project_client = RecordingProjectClient()
+    cancelled = []
+    service.project_client.agents.runs.cancel = lambda thread_id, run_id: cancelled.append(run_id)
+    service.run_waiter = SimpleNamespace(execute=lambda thread_id, agent_id: RunWaitResult(
+        run=SimpleNamespace(id="run-slow", status="in_progress"), strategy="poll", timed_out=True
+    ))
+
+    result = service._execute_agent_run("thread-1", "agent-1")
+    assert result.timed_out is True
+    assert cancelled == ["run-slow"]
+
+
+def test_stream_query_yields_events_and_final_result(service):
+    prepare_service_with_project_client(service)
+    service._get_or_create_thread = lambda thread_id=None: (SimpleNamespace(id="thread-3"), {"source": "cache"})
+
+    def fake_routing_run(thread_id, on_event=None):
+        on_event("tool_called", {"name": "search_catalog", "query": "sales"})
+        return RunWaitResult(run=SimpleNamespace(id="run-3", status="completed"), strategy="poll"), []
+
+    service._execute_routing_run = fake_routing_run
+    service._extract_response = lambda thread_id, run_result: ("full answer", [])
+    service._extract_run_details = lambda thread_id, run_result: (["rag_agent"], [])
+
+    events = list(service.stream_query("sales"))
+    names = [name for name, _ in events]
+
+    assert names == ["thread", "tool_called", "agent_delegated", "delta", "done"]
+    assert events[3][1] == {"text": "full answer"}
+    assert events[-1][1]["metadata"]["run_id"] == "run-3"
+
+
+def test_stream_query_reports_errors(service):
+    service._initialized = True
+    service._get_or_create_thread = lambda thread_id=None: (_ for _ in ()).throw(RuntimeError("boom"))
+
+    events = list(service.stream_query("sales"))
+    assert events == [("error", {"success": False, "error": "boom"})]
+
+
+def test_relay_run_events_translates_stream_events():
+    received = []
+    relay = relay_run_events(lambda event, data: received.append((event, data)))
+    step = SimpleNamespace(step_details=SimpleNamespace(tool_calls=[
+        SimpleNamespace(id="tc-1", type="connected_agent", connected_agent={"name": "web_agent"})
+    ]))
+
+    relay("thread.run.in_progress", SimpleNamespace(status="in_progress"))
+    relay("thread.run.step.created", step)
+    relay("thread.run.step.completed", step)
+    relay("thread.message.delta", SimpleNamespace(text="Hel"))
+
+    assert received == [
+        ("run_status", {"status": "in_progress"}),
+        ("agent_delegated", {"agent": "web_agent"}),
+        ("delta", {"text": "Hel"}),
+    ]
+
+
+def tool_call_run(*calls):
+    tool_calls = [
+        SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps({"query": query})))
+        for call_id, name, query in calls
+    ]
+    return SimpleNamespace(
+        id="run-1", status="requires_action",
+        required_action=SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls)),
+    )
+
+
+def test_handle_required_action_runs_tool_calls_concurrently(monkeypatch, service):
+    def slow_search(query):
+        time.sleep(0.2)
+        return {"assets_found": 0}
+
+    def slow_genie(query):
+        time.sleep(0.2)
+        return json.dumps({"status": "success"})
+
+    service._catalog_results = slow_search
+    monkeypatch.setattr(
+        "backend.services.connected_agent_service.genie_agent_service",
+        SimpleNamespace(handoff_genie_agent=slow_genie)
+    )
+    tools_called = []
+
+    started = time.monotonic()
+    outputs = service._handle_required_action(
+        tool_call_run(("call-1", "search_catalog", "a"), ("call-2", "handoff_genie_agent", "b")), tools_called
+    )
+
+    assert time.monotonic() - started < 0.35
+    assert [output["tool_call_id"] for output in outputs] == ["call-1", "call-2"]
+    assert tools_called == ["search_catalog('a')", "handoff_genie_agent('b')"]
+
+
+def test_handle_required_action_reports_timeouts_and_failures(monkeypatch, service):
+    monkeypatch.setattr("backend.services.connected_agent_service.settings.SEARCH_CATALOG_TIMEOUT_SECONDS", 0.05)
+
+    def hanging_search(query):
+        time.sleep(0.3)
+        return {"assets_found": 0}
+
+    def failing_genie(query):
+        raise RuntimeError("warehouse down")
+
+    service._catalog_results = hanging_search
+    monkeypatch.setattr(
+        "backend.services.connected_agent_service.genie_agent_service",
+        SimpleNamespace(handoff_genie_agent=failing_genie)
+    )
+    tools_called = []
+
+    outputs = service._handle_required_action(
+        tool_call_run(("call-1", "search_catalog", "a"), ("call-2", "handoff_genie_agent", "b")), tools_called
+    )
+
+    timed_out, failed = (json.loads(output["output"]) for output in outputs)
+    assert timed_out["status"] == "error" and "timed out" in timed_out["message"]
+    assert failed["status"] == "error" and "warehouse down" in failed["message"]
+    assert tools_called == ["search_catalog('a')", "handoff_genie_agent('b')"]
+
+
+def test_queued_tool_calls_get_their_full_timeout_once_started(monkeypatch, service):
+    monkeypatch.setattr("backend.services.connected_agent_service.settings.SEARCH_CATALOG_TIMEOUT_SECONDS", 0.15)
+
+    def search(query):
+        time.sleep(0.1)
+        return {"assets_found": 0}
+
+    service._catalog_results = search
+    service.tool_executor = ThreadPoolExecutor(max_workers=1)
+
+    outputs = service._handle_required_action(
+        tool_call_run(("call-1", "search_catalog", "a"), ("call-2", "search_catalog", "b")), []
+    )
+
+    assert [json.loads(output["output"])["assets_found"] for output in outputs] == [0, 0]
+
+
+def test_tool_calls_that_never_get_a_worker_are_withdrawn(monkeypatch, service):
+    monkeypatch.setattr("backend.services.connected_agent_service.settings.ADMISSION_QUEUE_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr("backend.services.connected_agent_service.settings.SEARCH_CATALOG_TIMEOUT_SECONDS", 0.1)
+    release = threading.Event()
+    searched = []
+
+    def search(query):
+        searched.append(query)
+        release.wait(1)
+        return {"assets_found": 0}
+
+    service._catalog_results = search
+    service.tool_executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        outputs = service._handle_required_action(
+            tool_call_run(("call-1", "search_catalog", "a"), ("call-2", "search_catalog", "b")), []
+        )
+    finally:
+        release.set()
+
+    assert "busy" in json.loads(outputs[1]["output"])["message"]
+    service.tool_executor.shutdown(wait=True)
+    assert searched == ["a"]
+
+
+def test_genie_tool_timeout_outlasts_admission_and_poll_budget():
+    assert tool_timeout("handoff_genie_agent") >= (
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS + settings.GENIE_POLL_TIMEOUT_SECONDS
+    )
+
+
+def test_analyze_purview_reuses_catalog_results_from_the_turn(monkeypatch, service):
+    searches = []
+
+    def fake_search(query):
+        searches.append(query)
+        return {"assets_found": 1, "results": [{"asset_id": f"asset-{query}", "connected_agent": "rag_agent"}]}
+
+    monkeypatch.setattr("backend.services.connected_agent_service.catalog_service",
+                        SimpleNamespace(search_catalog=fake_search))
+
+    with turn_context("what does encarta cost?") as turn:
+        outputs = service._handle_required_action(tool_call_run(("call-1", "search_catalog", "encarta")), [])
+        analysis = service.analyze_purview("what does encarta cost?")
+
+    assert json.loads(outputs[0]["output"])["assets_found"] == 1
+    assert searches == ["encarta"]
+    assert analysis["catalog_source"] == "turn"
+    assert analysis["catalog_results"]["queries"] == ["encarta"]
+    assert turn.catalog_searches == 1
+
+
+def test_combined_mode_serves_routing_searches_from_the_analysis(monkeypatch, service):
+    searches = []
+
+    def fake_search(query):
+        searches.append(query)
+        return {"assets_found": 1, "results": [{"asset_id": "asset-1", "connected_agent": "genie"}]}
+
+    monkeypatch.setattr("backend.services.connected_agent_service.catalog_service",
+                        SimpleNamespace(search_catalog=fake_search))
+
+    with turn_context("taxi fares", combined=True):
+        analysis = service.analyze_purview("taxi fares")
+        outputs = service._handle_required_action(tool_call_run(("call-1", "search_catalog", "taxi")), [])
+
+    assert searches == ["taxi fares"]
+    assert analysis["catalog_source"] == "search"
+    assert json.loads(outputs[0]["output"])["results"][0]["asset_id"] == "asset-1"
+
+
+def test_shared_turn_result_carries_the_duplicates_own_trace():
+    leader = {"success": True, "response": "answer",
+              "metadata": {"run_id": "run-1", "trace_id": "leader", "thread_lookup": {"source": "created"}}}
+
+    with turn_context("q", "thread-1"), request_trace() as trace:
+        shared = shared_turn_result({"source": "cache"})(leader)
+
+    assert shared["response"] == "answer"
+    assert shared["metadata"]["run_id"] == "run-1"
+    assert shared["metadata"]["trace_id"] == trace.trace_id != "leader"
+    assert shared["metadata"]["coalesced"] is True
+    assert shared["metadata"]["thread_lookup"] == {"source": "cache"}
+    assert leader["metadata"]["trace_id"] == "leader"
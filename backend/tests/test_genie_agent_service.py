@@ -1,9 +1,10 @@
 import json
+import time
 from types import SimpleNamespace
 
 import pytest
 
-from backend.services.genie_agent_service import GenieAgentService
+from backend.services.genie_agent_service import GENIE_JOB_MAX_WAIT_SECONDS, GenieAgentService, job_wait_seconds
 
 
 class DummyResponse:
@@ -78,8 +79,8 @@ def test_handoff_genie_agent_success(monkeypatch, configured_service):
             ],
         })
 
-    monkeypatch.setattr("backend.services.genie_agent_service.requests.post", fake_post)
-    monkeypatch.setattr("backend.services.genie_agent_service.requests.get", fake_get)
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", fake_get)
     monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
 
     payload = json.loads(configured_service.handoff_genie_agent("give me data"))
@@ -102,10 +103,268 @@ def test_handoff_genie_agent_non_completed_status(monkeypatch, configured_servic
     def fake_get(url, headers):
         return DummyResponse({"status": "FAILED"})
 
-    monkeypatch.setattr("backend.services.genie_agent_service.requests.post", fake_post)
-    monkeypatch.setattr("backend.services.genie_agent_service.requests.get", fake_get)
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", fake_get)
     monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
 
     payload = json.loads(configured_service.handoff_genie_agent("failing"))
     assert payload["status"] == "error"
     assert "FAILED" in payload["message"]
+
+
+def test_poll_schedule_stays_short_while_generating_and_resets_on_transition():
+    from backend.services.genie_agent_service import GeniePollSchedule
+
+    schedule = GeniePollSchedule(0.25, 3.0)
+    schedule.backoff.jitter = 0
+    generating = [schedule.next("ASKING_AI") for _ in range(6)]
+    executing = [schedule.next("EXECUTING_QUERY") for _ in range(8)]
+
+    assert generating[0] == 0.25
+    assert max(generating) == 1.0
+    assert executing[0] == 0.25
+    assert executing[-1] == 3.0
+
+
+def test_slow_query_continues_as_background_job(monkeypatch, configured_service):
+    finish = {"ready": False}
+
+    def fake_get(url, headers):
+        if "query-result" in url:
+            return DummyResponse({}, status_code=404)
+        if finish["ready"]:
+            return DummyResponse({"status": "COMPLETED", "attachments": [{"text": {"content": "late answer"}}]})
+        return DummyResponse({"status": "EXECUTING_QUERY"})
+
+    real_sleep = time.sleep
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: real_sleep(0.001))
+    monkeypatch.setattr("backend.services.genie_agent_service.settings.GENIE_POLL_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr("backend.services.genie_agent_service.settings.GENIE_JOB_TIMEOUT_SECONDS", 1e9)
+    monkeypatch.setattr(configured_service.session, "post", lambda url, headers, json: DummyResponse({
+        "conversation": {"id": "conv-3"}, "message": {"id": "msg-3"},
+    }))
+    monkeypatch.setattr(configured_service.session, "get", fake_get)
+
+    payload = json.loads(configured_service.handoff_genie_agent("slow question"))
+    assert payload["status"] == "pending"
+
+    finish["ready"] = True
+    job = configured_service.wait_for_job(payload["job_id"], timeout=2)
+    assert job.status == "completed"
+    assert job.to_dict()["result"]["response"] == "late answer"
+
+
+def test_start_job_returns_handle_immediately(monkeypatch, configured_service):
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
+    monkeypatch.setattr(configured_service.session, "post", lambda url, headers, json: DummyResponse({
+        "conversation": {"id": "conv-4"}, "message": {"id": "msg-4"},
+    }))
+    monkeypatch.setattr(configured_service.session, "get", lambda url, headers: DummyResponse({"status": "FAILED"}))
+
+    job = configured_service.start_job("question")
+    assert job.conversation_id == "conv-4"
+
+    job = configured_service.wait_for_job(job.job_id, timeout=2)
+    assert job.status == "failed"
+    assert "FAILED" in job.result["message"]
+    assert configured_service.get_job("missing") is None
+
+
+def test_result_pages_fetch_only_the_chunks_they_need(monkeypatch, configured_service):
+    manifest = {
+        "schema": {"columns": [{"name": "n"}]},
+        "total_row_count": 25,
+        "chunks": [
+            {"chunk_index": 0, "row_offset": 0, "row_count": 10},
+            {"chunk_index": 1, "row_offset": 10, "row_count": 10},
+            {"chunk_index": 2, "row_offset": 20, "row_count": 5},
+        ],
+    }
+    requested = []
+
+    def fake_get(url, headers):
+        requested.append(url.rsplit("/", 2)[-2:])
+        if "query-result" in url:
+            return DummyResponse({"statement_response": {
+                "statement_id": "stmt-1",
+                "manifest": manifest,
+                "result": {"chunk_index": 0, "row_offset": 0, "data_array": [[i] for i in range(10)]},
+            }})
+        chunk_index = int(url.rsplit("/", 1)[-1])
+        start = chunk_index * 10
+        return DummyResponse({"chunk_index": chunk_index, "data_array": [[i] for i in range(start, min(start + 10, 25))]})
+
+    monkeypatch.setattr(configured_service.session, "get", fake_get)
+    monkeypatch.setattr("backend.services.genie_agent_service.settings.GENIE_RESULT_MAX_ROWS", 5)
+
+    headers = configured_service.headers()
+    state = {"conversation_id": "conv", "message_id": "msg", "attachment_id": "att"}
+    query_results = configured_service._fetch_query_result(state, headers)
+    text, page = configured_service.render_query_results(query_results, 25, state)
+    assert "First 5 rows" in text and "showing 5 of 25" in text
+
+    second = configured_service.fetch_result_page(page["next_cursor"], limit=10, fmt="json")
+    assert second["data"] == [list(range(5, 15))]
+    assert requested == [["query-result", "att"], ["chunks", "1"]]
+
+    last = configured_service.fetch_result_page(second["next_cursor"], limit=50)
+    assert last["row_offset"] == 15 and last["row_count"] == 10
+    assert last["next_cursor"] is None
+    assert requested[-1] == ["chunks", "2"]
+
+
+def test_followups_in_a_thread_reuse_the_genie_conversation(monkeypatch, configured_service):
+    from backend.services.request_context import turn_context
+
+    posts = []
+    expired = {"value": False}
+
+    def fake_post(url, headers, json):
+        posts.append(url.rsplit("/", 2)[-2:])
+        if url.endswith("start-conversation"):
+            conversation = f"conv-{len(posts)}"
+            return DummyResponse({"conversation": {"id": conversation}, "message": {"id": f"msg-{len(posts)}"}})
+        if expired["value"]:
+            return DummyResponse({"error_code": "RESOURCE_DOES_NOT_EXIST"}, status_code=404)
+        return DummyResponse({"id": f"msg-{len(posts)}", "conversation_id": url.rsplit("/", 2)[-2]})
+
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", lambda url, headers: DummyResponse({"status": "COMPLETED"}))
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
+
+    def ask(question, thread_id):
+        with turn_context(question, thread_id):
+            return json.loads(configured_service.handoff_genie_agent(question))
+
+    first = ask("total sales", "thread-1")
+    followup = ask("and last year?", "thread-1")
+    other_thread = ask("total revenue", "thread-2")
+
+    assert first["conversation_reused"] is False
+    assert followup["conversation_reused"] is True
+    assert followup["conversation_id"] == first["conversation_id"]
+    assert other_thread["conversation_id"] != first["conversation_id"]
+
+    expired["value"] = True
+    fallback = ask("and by region?", "thread-1")
+    assert fallback["conversation_reused"] is False
+    assert fallback["conversation_id"] != first["conversation_id"]
+    assert posts[-2:] == [[first["conversation_id"], "messages"], ["space", "start-conversation"]]
+
+
+def test_calls_without_a_thread_start_a_new_conversation(monkeypatch, configured_service):
+    starts = []
+
+    def fake_post(url, headers, json):
+        starts.append(url)
+        return DummyResponse({"conversation": {"id": f"conv-{len(starts)}"}, "message": {"id": "msg"}})
+
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", lambda url, headers: DummyResponse({"status": "COMPLETED"}))
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
+
+    configured_service.handoff_genie_agent("first question")
+    configured_service.handoff_genie_agent("second question")
+
+    assert len(starts) == 2
+    assert all(url.endswith("start-conversation") for url in starts)
+
+
+def completed_with_sql(sql):
+    return DummyResponse({"status": "COMPLETED", "attachments": [
+        {"text": {"content": "answer"}, "query": {"query": sql, "description": ""}}
+    ]})
+
+
+def test_repeated_questions_are_served_from_the_answer_cache(monkeypatch, configured_service):
+    starts = []
+
+    def fake_post(url, headers, json):
+        starts.append(json["content"])
+        return DummyResponse({"conversation": {"id": f"conv-{len(starts)}"}, "message": {"id": "msg"}})
+
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", lambda url, headers: completed_with_sql("SELECT 1"))
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
+
+    first = json.loads(configured_service.handoff_genie_agent("What were total sales?"))
+    again = json.loads(configured_service.handoff_genie_agent("  what were   TOTAL sales "))
+
+    assert first["cache"] == {"hit": False}
+    assert again["cache"]["hit"] is True
+    assert again["cache"]["key"] == "question"
+    assert again["cache"]["age_seconds"] >= 0
+    assert again["response"] == first["response"]
+    assert again["conversation_id"] is None and again["message_id"] is None
+    assert again["cache"]["source"] == {"conversation_id": first["conversation_id"], "message_id": "msg"}
+    assert starts == ["What were total sales?"]
+
+
+def test_cached_first_question_of_a_thread_seeds_the_conversation_of_its_follow_up(monkeypatch, configured_service):
+    from backend.services.request_context import turn_context
+
+    posts = []
+
+    def fake_post(url, headers, json):
+        posts.append((url.rsplit("/", 2)[-2:], json["content"]))
+        if url.endswith("start-conversation"):
+            return DummyResponse({"conversation": {"id": f"conv-{len(posts)}"}, "message": {"id": f"msg-{len(posts)}"}})
+        return DummyResponse({"id": f"msg-{len(posts)}", "conversation_id": url.rsplit("/", 2)[-2]})
+
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", lambda url, headers: completed_with_sql("SELECT 1"))
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
+
+    configured_service.handoff_genie_agent("What were total sales?")
+    with turn_context("What were total sales?", "thread-1"):
+        first = json.loads(configured_service.handoff_genie_agent("What were total sales?"))
+    assert first["cache"]["key"] == "question"
+    assert len(posts) == 1
+
+    with turn_context("and last year?", "thread-1"):
+        followup = json.loads(configured_service.handoff_genie_agent("and last year?"))
+
+    assert followup["conversation_reused"] is True
+    assert followup["cache"] == {"hit": False}
+    assert posts[1:] == [(["space", "start-conversation"], "What were total sales?"),
+                         (["conv-2", "messages"], "and last year?")]
+
+
+def test_same_generated_sql_shares_the_answer_without_waiting_for_the_warehouse(monkeypatch, configured_service):
+    statuses = []
+
+    def fake_post(url, headers, json):
+        return DummyResponse({"conversation": {"id": "conv"}, "message": {"id": json["content"][:5]}})
+
+    def fake_get(url, headers):
+        if "query-result" in url:
+            return DummyResponse({}, status_code=404)
+        statuses.append(url)
+        if len(statuses) == 1:
+            return completed_with_sql("SELECT sum(amount) FROM sales;")
+        return DummyResponse({"status": "EXECUTING_QUERY", "attachments": [
+            {"query": {"query": "SELECT  sum(amount)\nFROM sales"}}
+        ]})
+
+    monkeypatch.setattr(configured_service.session, "post", fake_post)
+    monkeypatch.setattr(configured_service.session, "get", fake_get)
+    monkeypatch.setattr("backend.services.genie_agent_service.time.sleep", lambda _: None)
+
+    json.loads(configured_service.handoff_genie_agent("total sales"))
+    rephrased = json.loads(configured_service.handoff_genie_agent("how much did we sell overall"))
+
+    assert rephrased["cache"]["key"] == "sql"
+    assert rephrased["message_id"] == "how m"
+    assert rephrased["cache"]["source"]["message_id"] == "total"
+    assert len(statuses) == 2
+    assert configured_service.cached_answer("how much did we sell overall")["cache"]["key"] == "question"
+
+
+def test_job_wait_seconds_clamps_and_rejects_non_numbers():
+    assert job_wait_seconds(None) == 0
+    assert job_wait_seconds("2.5") == 2.5
+    assert job_wait_seconds("-3") == 0
+    assert job_wait_seconds("1e9") == GENIE_JOB_MAX_WAIT_SECONDS
+    for value in ("soon", "nan", "inf"):
+        with pytest.raises(ValueError):
+            job_wait_seconds(value)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from backend.services.genie_results import (
+    build_result_page,
+    decode_cursor,
+    encode_cursor,
+    plan_chunks,
+    render_columnar,
+    render_markdown,
+)
+
+
+def test_render_markdown_respects_row_and_byte_budgets():
+    rows = [[f"name-{i}", i, None] for i in range(50)]
+
+    table, rendered = render_markdown(["name", "value", "note"], rows, max_rows=10)
+    assert rendered == 10
+    assert table.splitlines()[0] == "| name | value | note |"
+    assert table.splitlines()[2] == "| name-0 | 0 | NULL |"
+
+    table, rendered = render_markdown(["name", "value", "note"], rows, max_rows=50, max_bytes=200)
+    assert 0 < rendered < 10
+    assert len(table.encode("utf-8")) <= 200
+
+
+def test_render_markdown_escapes_cell_separators():
+    table, _ = render_markdown(["a"], [["x|y\nz"]])
+    assert table.splitlines()[-1] == "| x\\|y z |"
+
+
+def test_render_columnar_is_column_major():
+    payload, rendered = render_columnar(["a", "b"], [[1, "x"], [2, "y"], [3, "z"]], max_rows=2)
+    assert rendered == 2
+    assert payload == {"columns": ["a", "b"], "data": [[1, 2], ["x", "y"]]}
+
+
+def test_cursor_round_trip_and_validation():
+    state = {"conversation_id": "c", "message_id": "m", "attachment_id": "a", "statement_id": "s", "offset": 10}
+    assert decode_cursor(encode_cursor(state)) == state
+    assert decode_cursor(encode_cursor({**state, "statement_id": None}))["offset"] == 10
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    for crafted in ({"offset": "x"}, {"offset": None}, {"offset": -1}, {"offset": True}, {"message_id": 5},
+                    {"attachment_id": ""}, {"statement_id": ["s"]}):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor({**state, **crafted}))
+
+
+def test_plan_chunks_spans_chunk_boundaries():
+    chunks = [
+        {"chunk_index": 0, "row_offset": 0, "row_count": 100},
+        {"chunk_index": 1, "row_offset": 100, "row_count": 100},
+        {"chunk_index": 2, "row_offset": 200, "row_count": 50},
+    ]
+    assert plan_chunks(chunks, 90, 20) == [(0, 90, 100), (1, 0, 10)]
+    assert plan_chunks(chunks, 240, 100) == [(2, 40, 50)]
+    assert plan_chunks(chunks, 250, 10) == []
+
+
+def test_build_result_page_sets_next_cursor_until_the_end():
+    manifest = {"schema": {"columns": [{"name": "a"}]}, "total_row_count": 3,
+                "chunks": [{"chunk_index": 0, "row_offset": 0, "row_count": 3}]}
+    state = {"conversation_id": "c", "message_id": "m", "attachment_id": "a", "offset": 1}
+
+    page = build_result_page(state, manifest, None, [[2]], "json")
+    assert page["data"] == [[2]]
+    assert decode_cursor(page["next_cursor"])["offset"] == 2
+
+    last = build_result_page({**state, "offset": 2}, manifest, None, [[3]], "markdown")
+    assert last["next_cursor"] is None
+    assert json.dumps(last["markdown"]).count("| 3 |") == 1
@@ -0,0 +1,69 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.services.http_transport import BackendConfig, HttpTransport, IDEMPOTENT_METHODS
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_session_reuses_connections_and_reports_stats(server):
+    transport = HttpTransport({"test": BackendConfig(pool_size=2, connect_timeout=1, read_timeout=2, retries=0)})
+    session = transport.session("test")
+
+    for _ in range(3):
+        assert session.get(f"{server}/status").json() == {"ok": True}
+
+    stats = transport.get_stats()["test"]
+    assert stats["requests"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["pools"][0]["connections_created"] == 1
+    assert stats["pools"][0]["requests"] == 3
+    transport.close()
+
+
+def test_session_applies_default_timeout(monkeypatch):
+    transport = HttpTransport({"test": BackendConfig(pool_size=1, connect_timeout=1.5, read_timeout=7, retries=0)})
+    seen = {}
+
+    def fake_request(self, method, url, **kwargs):
+        seen.update(kwargs)
+
+    monkeypatch.setattr("backend.services.http_transport.requests.Session.request", fake_request)
+    transport.session("test").get("https://example.test")
+
+    assert seen["timeout"] == (1.5, 7)
+
+
+def test_only_configured_methods_are_retried():
+    transport = HttpTransport({
+        "reads": BackendConfig(pool_size=1, connect_timeout=1, read_timeout=1, retries=2),
+        "search": BackendConfig(pool_size=1, connect_timeout=1, read_timeout=1, retries=2,
+                                retry_methods=IDEMPOTENT_METHODS | {"POST"}),
+    })
+
+    assert "POST" not in transport.session("reads").adapter.max_retries.allowed_methods
+    assert "POST" in transport.session("search").adapter.max_retries.allowed_methods
@@ -80,3 +80,45 @@ def test_format_thread_messages_reverses_order():
     formatted = processor.format_thread_messages(messages, "thread-1")
     assert [msg["content"] for msg in formatted] == ["second", "first"]
     assert all(msg["thread_id"] == "thread-1" for msg in formatted)
+
+
+def test_format_thread_messages_looks_up_each_file_once():
+    project_client = DummyProjectClient()
+    processor = MessageProcessor(project_client)
+    messages = [build_message(content_value=str(i)) for i in range(3)]
+    messages[2].file_citation_annotations[0].file_citation.file_id = "file-2"
+
+    formatted = processor.format_thread_messages(messages, "thread-1")
+    assert sorted(project_client.agents.files.calls) == ["file-1", "file-2"]
+    assert formatted[0]["annotations"][0]["file_name"] == "file-2.pdf"
+
+    processor.format_thread_messages(messages, "thread-1")
+    assert len(project_client.agents.files.calls) == 2
+
+
+def test_resolve_file_names_falls_back_to_id_on_lookup_failure():
+    project_client = DummyProjectClient()
+
+    def get(file_id):
+        raise RuntimeError("file deleted")
+
+    project_client.agents.files.get = get
+    processor = MessageProcessor(project_client)
+
+    assert processor.resolve_file_names(["file-1", "file-1"]) == {"file-1": "file-1"}
+    assert "file-1" not in processor.file_names
+
+
+def test_failed_lookups_are_attempted_once_per_call():
+    project_client = DummyProjectClient()
+    attempts = []
+
+    def get(file_id):
+        attempts.append(file_id)
+        raise RuntimeError("file deleted")
+
+    project_client.agents.files.get = get
+    processor = MessageProcessor(project_client)
+
+    assert processor.resolve_file_names(["file-1", "file-2"]) == {"file-1": "file-1", "file-2": "file-2"}
+    assert sorted(attempts) == ["file-1", "file-2"]
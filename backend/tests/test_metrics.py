@@ -0,0 +1,60 @@
+import pytest
+
+from backend.config.settings import settings
+from backend.services.metrics import STAGE_SECONDS, MetricsRegistry, timed_stage
+
+
+def stage_count(stage, agent="none", outcome="success"):
+    series = STAGE_SECONDS._series.get((stage, agent, outcome))
+    return sum(series[0]) if series else 0
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(3.0, stage="a")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="a"} 3.55' in lines
+    assert 'stage_seconds_count{stage="a"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("delegations_total", "Delegations", ("agent",))
+    counter.inc(agent='rag "agent"')
+    counter.inc(agent='rag "agent"')
+
+    assert 'delegations_total{agent="rag \\"agent\\""} 2.0' in registry.render().splitlines()
+
+
+def test_timed_stage_records_refined_outcome_and_errors():
+    before_ok = stage_count("unit_stage", "web_agent", "cache")
+    before_error = stage_count("unit_stage", "web_agent", "error")
+
+    with timed_stage("unit_stage", "web_agent") as stage:
+        stage.outcome = "cache"
+    with pytest.raises(RuntimeError):
+        with timed_stage("unit_stage", "web_agent"):
+            raise RuntimeError("boom")
+
+    assert stage.duration >= 0
+    assert stage_count("unit_stage", "web_agent", "cache") == before_ok + 1
+    assert stage_count("unit_stage", "web_agent", "error") == before_error + 1
+
+
+def test_timed_stage_skips_observation_when_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    before = stage_count("disabled_stage")
+
+    with timed_stage("disabled_stage") as stage:
+        pass
+
+    assert stage.duration is not None
+    assert stage_count("disabled_stage") == before
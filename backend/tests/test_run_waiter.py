@@ -0,0 +1,242 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.run_waiter import (
+    PollingRunWaiter,
+    StreamingRunWaiter,
+    create_run_waiter,
+)
+
+
+class ScriptedRuns:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.gets = 0
+        self.submitted = []
+
+    def create(self, thread_id, agent_id):
+        return SimpleNamespace(id="run-1", status="queued")
+
+    def get(self, thread_id, run_id):
+        self.gets += 1
+        status = self.statuses.pop(0) if self.statuses else "in_progress"
+        return status if not isinstance(status, str) else SimpleNamespace(id=run_id, status=status)
+
+    def submit_tool_outputs(self, **kwargs):
+        self.submitted.append(kwargs)
+
+
+class FakeStream:
+    def __init__(self, runs, events):
+        self.runs = runs
+        self.events = list(events)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        while self.events:
+            yield self.events.pop(0)
+
+
+class StreamingRuns(ScriptedRuns):
+    def __init__(self, events, follow_up=(), statuses=()):
+        super().__init__(statuses)
+        self.events = events
+        self.follow_up = list(follow_up)
+
+    def stream(self, thread_id, agent_id):
+        self.active_stream = FakeStream(self, self.events)
+        return self.active_stream
+
+    def submit_tool_outputs_stream(self, thread_id, run_id, tool_outputs, event_handler):
+        self.submitted.append({"run_id": run_id, "tool_outputs": tool_outputs})
+        event_handler.events.extend(self.follow_up)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr("backend.services.run_waiter.time.sleep", lambda _: None)
+
+
+def requires_action_run(*call_ids):
+    tool_calls = [SimpleNamespace(id=call_id) for call_id in call_ids]
+    return SimpleNamespace(
+        id="run-1",
+        status="requires_action",
+        required_action=SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls)),
+    )
+
+
+def test_polling_waiter_counts_polls_and_wait_time():
+    runs = ScriptedRuns(["in_progress", "in_progress", "completed"])
+    waiter = PollingRunWaiter(runs, initial_interval=0.01, max_interval=0.04, timeout=5)
+
+    result = waiter.execute("thread-1", "agent-1")
+
+    assert result.run.status == "completed"
+    assert result.polls == 3
+    assert result.wait_seconds > 0
+    assert result.timed_out is False
+
+
+def test_polling_waiter_submits_each_required_action_once():
+    action = requires_action_run("call-1")
+    runs = ScriptedRuns([action, action, "completed"])
+    waiter = PollingRunWaiter(runs, initial_interval=0.01, max_interval=0.02, timeout=5)
+    handled = []
+
+    def handler(run):
+        handled.append(run.id)
+        return [{"tool_call_id": "call-1", "output": "{}"}]
+
+    result = waiter.execute("thread-1", "agent-1", on_requires_action=handler)
+
+    assert result.run.status == "completed"
+    assert handled == ["run-1"]
+    assert len(runs.submitted) == 1
+
+
+def test_polling_waiter_stops_at_deadline():
+    runs = ScriptedRuns([])
+    waiter = PollingRunWaiter(runs, initial_interval=0.01, max_interval=0.01, timeout=0)
+
+    result = waiter.execute("thread-1", "agent-1")
+
+    assert result.timed_out is True
+    assert result.run.status == "queued"
+
+
+def test_streaming_waiter_handles_tool_calls_and_emits_events():
+    action = requires_action_run("call-1")
+    completed = SimpleNamespace(id="run-1", status="completed")
+    runs = StreamingRuns(
+        events=[("thread.run.created", SimpleNamespace(id="run-1", status="queued"), None),
+                ("thread.run.requires_action", action, None)],
+        follow_up=[("thread.message.delta", SimpleNamespace(text="hi"), None),
+                   ("thread.run.completed", completed, None)],
+    )
+    seen = []
+
+    result = StreamingRunWaiter(runs, timeout=5).execute(
+        "thread-1", "agent-1",
+        on_requires_action=lambda run: [{"tool_call_id": "call-1", "output": "{}"}],
+        on_event=lambda event_type, data: seen.append(event_type),
+    )
+
+    assert result.run is completed
+    assert result.events == 4
+    assert result.polls == 0
+    assert runs.submitted[0]["run_id"] == "run-1"
+    assert "thread.message.delta" in seen
+
+
+def test_streaming_waiter_captures_messages_and_steps():
+    step = SimpleNamespace(id="step-1", status="completed", step_details=None)
+    message = SimpleNamespace(id="msg-1", role="assistant")
+    completed = SimpleNamespace(id="run-1", status="completed")
+    runs = StreamingRuns(events=[
+        ("thread.run.step.created", SimpleNamespace(id="step-1", status="in_progress"), None),
+        ("thread.run.step.completed", step, None),
+        ("thread.message.completed", message, None),
+        ("thread.run.completed", completed, None),
+    ])
+
+    result = StreamingRunWaiter(runs, timeout=5).execute("thread-1", "agent-1")
+
+    assert result.run is completed
+    assert result.stream_complete is True
+    assert result.messages == [message]
+    assert result.steps == {"step-1": step}
+
+
+def test_streaming_waiter_falls_back_to_polling():
+    runs = StreamingRuns(
+        events=[("thread.run.in_progress", SimpleNamespace(id="run-1", status="in_progress"), None)],
+        statuses=["completed"],
+    )
+    waiter = StreamingRunWaiter(runs, fallback=PollingRunWaiter(runs, initial_interval=0.01, timeout=5), timeout=5)
+
+    result = waiter.execute("thread-1", "agent-1")
+
+    assert result.run.status == "completed"
+    assert result.strategy == "stream+poll"
+    assert result.polls == 1
+
+
+def test_streaming_fallback_does_not_repeat_tool_calls_handled_on_the_stream():
+    action = requires_action_run("call-1")
+    runs = StreamingRuns(
+        events=[("thread.run.requires_action", action, None)],
+        statuses=[action, "completed"],
+    )
+    handled = []
+    waiter = StreamingRunWaiter(runs, fallback=PollingRunWaiter(runs, initial_interval=0.01, timeout=5), timeout=5)
+
+    result = waiter.execute(
+        "thread-1", "agent-1",
+        on_requires_action=lambda run: handled.append(run.id) or [{"tool_call_id": "call-1", "output": "{}"}],
+    )
+
+    assert result.run.status == "completed"
+    assert result.strategy == "stream+poll"
+    assert handled == ["run-1"]
+    assert len(runs.submitted) == 1
+
+
+class StallingStream(FakeStream):
+    """Sends its events, then blocks until closed, like a connection that stopped delivering."""
+
+    def __init__(self, runs, events):
+        super().__init__(runs, events)
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield from super().__iter__()
+        if not self.closed.wait(5):
+            raise AssertionError("stalled stream was never closed")
+        raise ConnectionError("stream closed")
+
+    def close(self):
+        self.closed.set()
+
+
+class StallingRuns(StreamingRuns):
+    def stream(self, thread_id, agent_id):
+        self.active_stream = StallingStream(self, self.events)
+        return self.active_stream
+
+
+def test_streaming_waiter_abandons_a_stalled_stream_for_polling():
+    runs = StallingRuns(
+        events=[("thread.run.in_progress", SimpleNamespace(id="run-1", status="in_progress"), None)],
+        statuses=["completed"],
+    )
+    waiter = StreamingRunWaiter(runs, fallback=PollingRunWaiter(runs, initial_interval=0.01, timeout=5),
+                                timeout=5, idle_timeout=0.05)
+
+    result = waiter.execute("thread-1", "agent-1")
+
+    assert runs.active_stream.closed.is_set()
+    assert result.run.status == "completed"
+    assert result.strategy == "stream+poll"
+
+
+def test_streaming_waiter_times_out_a_stalled_stream_at_the_deadline():
+    runs = StallingRuns(events=[("thread.run.queued", SimpleNamespace(id="run-1", status="queued"), None)])
+
+    result = StreamingRunWaiter(runs, timeout=0.05, idle_timeout=5).execute("thread-1", "agent-1")
+
+    assert result.timed_out is True
+    assert result.run.status == "queued"
+
+
+def test_create_run_waiter_prefers_streaming_when_available():
+    assert isinstance(create_run_waiter(StreamingRuns(events=[])), StreamingRunWaiter)
+    assert isinstance(create_run_waiter(StreamingRuns(events=[]), strategy="poll"), PollingRunWaiter)
+    assert isinstance(create_run_waiter(ScriptedRuns([])), PollingRunWaiter)
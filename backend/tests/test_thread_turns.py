@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.services.admission import LimitExceededError
+from backend.services.request_context import current_turn, turn_context
+from backend.services.thread_turns import AsyncThreadTurnSerializer, ThreadTurnSerializer
+
+
+def run_in_threads(*targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(2)
+
+
+def test_turns_on_one_thread_run_in_arrival_order():
+    serializer = ThreadTurnSerializer(queue_depth=4)
+    log = []
+
+    def turn(name):
+        def call():
+            log.append(f"{name}:start")
+            time.sleep(0.03)
+            log.append(f"{name}:end")
+        return lambda: serializer.run("thread-1", call)
+
+    run_in_threads(turn("a"), turn("b"), turn("c"))
+
+    assert log == ["a:start", "a:end", "b:start", "b:end", "c:start", "c:end"]
+    assert serializer.get_stats()["queued"] == 2
+    assert serializer.get_stats()["active_threads"] == 0
+
+
+def test_turns_on_different_threads_stay_parallel():
+    serializer = ThreadTurnSerializer()
+    barrier = threading.Barrier(2, timeout=1)
+    met = []
+
+    def turn(thread_id):
+        return lambda: met.append(serializer.run(thread_id, barrier.wait))
+
+    run_in_threads(turn("t1"), turn("t2"))
+
+    assert sorted(met) == [0, 1]
+
+
+def test_duplicate_turns_share_one_result():
+    serializer = ThreadTurnSerializer()
+    calls, results = [], []
+
+    def slow_answer():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"response": "answer"}
+
+    run_in_threads(*[lambda: results.append(serializer.run("thread-1", slow_answer, coalesce_key="q"))] * 2)
+
+    assert calls == [1]
+    assert results == [{"response": "answer"}] * 2
+    assert serializer.get_stats()["coalesced"] == 1
+
+
+def test_duplicate_turn_gets_its_own_metadata_and_the_leaders_catalog_searches():
+    serializer = ThreadTurnSerializer()
+    results, searches = {}, {}
+
+    def slow_answer():
+        current_turn().record_catalog("sales", {"results": [{"asset_id": "a1"}]})
+        time.sleep(0.05)
+        return {"response": "answer", "metadata": {"trace_id": "leader"}}
+
+    def turn(name):
+        def call():
+            with turn_context("q", "thread-1") as context:
+                results[name] = serializer.run(
+                    "thread-1", slow_answer, coalesce_key="q",
+                    share=lambda result: {**result, "metadata": {"trace_id": name, "coalesced": True}}
+                )
+                searches[name] = (context.catalog_searches, list(context.catalog_results))
+        return call
+
+    run_in_threads(turn("leader"), turn("follower"))
+
+    assert results["leader"]["metadata"] == {"trace_id": "leader"}
+    assert results["follower"] == {"response": "answer", "metadata": {"trace_id": "follower", "coalesced": True}}
+    assert searches["follower"] == searches["leader"] == (1, ["sales"])
+
+
+def test_turns_beyond_queue_depth_are_rejected():
+    serializer = ThreadTurnSerializer(queue_depth=0)
+    started = threading.Event()
+    release = threading.Event()
+    holder = threading.Thread(target=lambda: serializer.run("thread-1", lambda: (started.set(), release.wait(2))))
+    holder.start()
+    started.wait(1)
+
+    with pytest.raises(LimitExceededError):
+        serializer.run("thread-1", lambda: None)
+
+    release.set()
+    holder.join()
+
+
+def test_async_serializer_orders_turns_and_skips_cancelled_waiters():
+    serializer = AsyncThreadTurnSerializer()
+    log = []
+
+    def turn(name):
+        async def call():
+            log.append(name)
+            await asyncio.sleep(0.01)
+            return name
+        return call
+
+    async def main():
+        first = asyncio.create_task(serializer.run("thread-1", turn("a")))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(serializer.run("thread-1", turn("b")))
+        await asyncio.sleep(0)
+        last = asyncio.create_task(serializer.run("thread-1", turn("c")))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await asyncio.gather(first, last)
+
+    assert asyncio.run(main()) == ["a", "c"]
+    assert log == ["a", "c"]
+    assert serializer.get_stats()["active_threads"] == 0
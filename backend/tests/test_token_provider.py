@@ -0,0 +1,69 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.token_provider import TokenProvider
+
+
+class CountingCredential:
+    def __init__(self, lifetime=3600):
+        self.lifetime = lifetime
+        self.calls = []
+
+    def get_token(self, *scopes, **kwargs):
+        self.calls.append((scopes, kwargs))
+        return SimpleNamespace(token=f"token-{len(self.calls)}", expires_on=int(time.time() + self.lifetime))
+
+
+@pytest.fixture
+def provider():
+    provider = TokenProvider(credential=CountingCredential(), refresh_margin=300)
+    yield provider
+    provider.close()
+
+
+def test_get_token_is_cached_per_scope(provider):
+    first = provider.get_token("scope-a")
+    assert provider.get_token("scope-a") is first
+    provider.get_token("scope-b")
+
+    assert len(provider.credential.calls) == 2
+    stats = provider.get_stats()
+    assert stats["acquisitions"] == 2 and stats["cache_hits"] == 1
+    assert set(stats["scopes"]) == {"scope-a", "scope-b"}
+
+
+def test_expired_token_is_reacquired(provider):
+    provider.get_token("scope-a")
+    provider._tokens[("scope-a",)] = SimpleNamespace(token="old", expires_on=int(time.time()) - 1)
+
+    assert provider.get_token("scope-a").token == "token-2"
+
+
+def test_claims_bypass_cache(provider):
+    provider.get_token("scope-a")
+    provider.get_token("scope-a", claims="challenge")
+
+    assert provider.credential.calls[-1][1]["claims"] == "challenge"
+    assert provider.acquisitions == 1
+
+
+def test_background_refresh_replaces_token_before_expiry():
+    credential = CountingCredential(lifetime=2)
+    provider = TokenProvider(credential=credential, refresh_margin=1.9)
+    try:
+        provider.get_token("scope-a")
+        deadline = time.time() + 3
+        while provider.refreshes == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        assert provider.refreshes >= 1
+        assert provider._tokens[("scope-a",)].token != "token-1"
+    finally:
+        provider.close()
+
+
+def test_async_view_serves_cached_token(provider):
+    token = provider.get_token("scope-a")
+    assert asyncio.run(provider.as_async().get_token("scope-a")) is token
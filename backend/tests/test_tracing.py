@@ -0,0 +1,83 @@
+import time
+
+from backend.services import tracing
+from backend.services.metrics import timed_stage
+from backend.services.tracing import record_span, request_trace, span, trace_metadata
+
+
+def test_spans_nest_under_the_current_span():
+    with request_trace() as trace:
+        with span("outer") as outer:
+            with span("inner", tool="search_catalog"):
+                pass
+            record_span("queue.genie", time.perf_counter(), 0.25)
+        report = trace.report()
+
+    spans = {entry["name"]: entry for entry in report["spans"]}
+    assert spans["outer"]["parent_id"] is None
+    assert spans["inner"]["parent_id"] == outer.span_id
+    assert spans["inner"]["tool"] == "search_catalog"
+    assert spans["queue.genie"]["parent_id"] == outer.span_id
+    assert spans["queue.genie"]["duration_seconds"] == 0.25
+    assert report["elapsed_seconds"] >= spans["outer"]["duration_seconds"]
+
+
+def test_nested_request_trace_joins_the_outer_one():
+    with request_trace() as outer:
+        with request_trace() as inner:
+            assert inner is outer
+        assert trace_metadata()["trace_id"] == outer.trace_id
+    assert trace_metadata() == {}
+
+
+def test_spans_are_skipped_outside_a_request():
+    with span("orphan") as record:
+        assert record is None
+    record_span("queue.genie", time.perf_counter(), 0.1)
+
+
+def test_timed_stage_labels_its_span():
+    with request_trace() as trace:
+        try:
+            with timed_stage("catalog_fetch", "purview"):
+                raise TimeoutError("slow")
+        except TimeoutError:
+            pass
+
+    (entry,) = trace.report()["spans"]
+    assert entry["name"] == "catalog_fetch"
+    assert entry["agent"] == "purview"
+    assert entry["outcome"] == "error"
+
+
+def test_finished_traces_are_exported_as_otlp(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing, "exporter", tracing.TraceExporter("http://collector/v1/traces", "router", 4))
+    monkeypatch.setattr(tracing.exporter, "submit", exported.append)
+
+    with request_trace() as trace:
+        with timed_stage("message_create", "router"):
+            pass
+
+    assert exported == [trace]
+    (otlp_span,) = trace.to_otlp("router")["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp_span["traceId"] == trace.trace_id
+    assert otlp_span["name"] == "message_create"
+    assert int(otlp_span["endTimeUnixNano"]) >= int(otlp_span["startTimeUnixNano"])
+    assert {"key": "agent", "value": {"stringValue": "router"}} in otlp_span["attributes"]
+
+
+def test_exporter_drops_traces_when_the_queue_is_full(monkeypatch):
+    exporter = tracing.TraceExporter("http://collector/v1/traces", "router", 1)
+    monkeypatch.setattr(exporter, "_run", lambda: None)
+    traces = []
+    for _ in range(2):
+        with request_trace() as trace:
+            with span("stage"):
+                pass
+        traces.append(trace)
+
+    for trace in traces:
+        exporter.submit(trace)
+    assert exporter.get_stats()["queued"] == 1
+    assert exporter.get_stats()["dropped"] == 1
@@ -0,0 +1,22 @@
+import random
+
+
+class Backoff:
+    """Exponential backoff with proportional jitter, capped at ``maximum``."""
+
+    def __init__(self, initial: float, maximum: float, multiplier: float = 2.0, jitter: float = 0.1):
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._current = initial
+
+    def next(self) -> float:
+        delay = self._current
+        self._current = min(self._current * self.multiplier, self.maximum)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, min(delay, self.maximum))
+
+    def reset(self) -> None:
+        self._current = self.initial